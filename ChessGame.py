@@ -1,33 +1,81 @@
-import copy
+import re
+from collections import namedtuple
+from itertools import chain
+
+from bitboard import (Bitboards, square_index, square_file_rank, iter_squares, slider_targets,
+                      PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, KNIGHT_TARGETS, KING_TARGETS, PAWN_TARGETS,
+                      ROOK_REACH, BISHOP_REACH, QUEEN_REACH, BETWEEN, LINE, ORTHOGONAL_RAYS, DIAGONAL_RAYS, QUEEN_RAYS)
+from evaluation import MG_TABLES, EG_TABLES, PHASES, full_eval, tapered
+from transposition import EXACT, LOWER, MATE_SCORE, TERMINAL_DEPTH
+from zobrist import (PIECE_KEYS, CASTLING_KEYS, PASSANT_KEYS, SIDE_KEY, position_key,
+                     WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)
 
 WHITE = "White"
 BLACK = "Black"
 
+# Index of each team's bitboards
+TEAM_INDEX = {WHITE: 0, BLACK: 1}
+
 FILES = {"A":1, "B":2, "C":3, "D":4, "E":5, "F":6,"G":7, "H":8}
 I_FILES = {j:i for i,j in FILES.items()}
 
-class Square(): # an empty spot on the board
+# Everything make_move changes, so that unmake_move can put the board back exactly as it was
+MoveRecord = namedtuple("MoveRecord", ["piece", "from_file", "from_rank", "to_file", "to_rank",
+                                       "captured", "first_move", "king_pos", "promoted", "passant", "key",
+                                       "halfmove_clock", "evaluation"])
 
-    def __init__(self, game, file, rank, square_colored):
-        if not isinstance(game, Chess):
-            raise TypeError("Game must be a Chess object")
-        self.game = game
-        self.file = file
-        self.rank = rank
-        # Using boolean for a positions color: True = black, False = white
-        self.square_colored = square_colored
-        self.passantable = False
+# The checking pieces and pinned pieces of the team to move in one position, see Chess.check_info
+CheckInfo = namedtuple("CheckInfo", ["key", "king_square", "checkers", "pinned"])
+
+# A move as produced by the move generators, ready to be passed to Chess.make_move(*move)
+Move = namedtuple("Move", ["piece", "file", "rank", "promotion"], defaults=[None])
+
+class Square(): # an empty spot on the board, every empty spot shares the one EMPTY square below
+    # No per-instance attributes, so the shared empty square can't be changed by accident
+    __slots__ = ()
+    passantable = False # only a Pawn that has just moved two squares can be taken en passant
 
     def __str__(self):
         return "    "
+
+EMPTY = Square()
+
+
+def square_colored(file, rank):
+    """
+    Works out the color of a square from where it is.
+
+    Args:
+        file: The file (column) coordinate of the square.
+        rank: The rank (row) coordinate of the square.
+
+    Returns:
+        True for a black (dark) square, False for a white one (a1 is black).
+    """
+    return (file + rank) % 2 == 0
+
     
 class Piece(Square): # the foundational class of all the following pieces
-    def __init__(self, game, file, rank, square_colored, team):
-        Square.__init__(self, game, file, rank, square_colored)
+    __slots__ = ("game", "file", "rank", "team", "first_move", "code", "passantable")
+
+    def __init__(self, game, file, rank, team):
+        if not isinstance(game, Chess):
+            raise TypeError("Game must be a Chess object")
+        self.game = game
+        self.file = file
+        self.rank = rank
         self.team = team
         self.first_move = True # used for pieces that have a special move condition given it is their first move
+        self.passantable = False
+        # Which of the game's bitboards this piece lives on (every subclass sets its kind)
+        self.code = self.kind + 6 * TEAM_INDEX[team]
+
+    @property
+    def square_colored(self):
+        # Using boolean for a positions color: True = black, False = white
+        return square_colored(self.file, self.rank)
 
-    def move_to(self, file, rank):
+    def move_to(self, file, rank, promotion=None):
         """
         Moves the piece to the specified file and rank on the board.
 
@@ -35,24 +83,16 @@ class Piece(Square): # the foundational class of all the following pieces
             self: The instance of the piece object.
             file: The target file (column) coordinate of the move.
             rank: The target rank (row) coordinate of the move.
+            promotion: Optional character (Q, B, R, K) for the piece a pawn becomes on the last rank.
 
         Returns:
             A string describing the move in a human-readable format (e.g., "White Pawn at E2 moved to E4").
         """
-        self.first_move = False # for pawn first move
-        # Create an empty square to replace this location after this piece moves
-        prev = Square(self.game, self.file, self.rank, self.square_colored)
         prev_file = self.file
         prev_rank = self.rank
 
-        # Move this piece to the new location
-        self.file = file
-        self.rank = rank
-        self.square_colored = self.game.board[file][rank].square_colored
-        self.game.board[file][rank] = self
-
-        # Set the empty square to replace the moved piece
-        self.game.board[prev_file][prev_rank] = prev
+        # The game does the actual board update (and the rook's half of a castle) and keeps it for takeback
+        self.game.push_move(self, file, rank, promotion)
 
         return (f"{self.team.title()} {self.__class__.__name__} at {I_FILES[prev_file]}{prev_rank} moved to {I_FILES[file]}{rank}")
         
@@ -107,7 +147,7 @@ class Piece(Square): # the foundational class of all the following pieces
         Returns:
             True if there is a piece belonging to the same team at the specified location, False otherwise.
         """
-        if (isinstance(self.game.board[file][rank], Piece) and self.game.board[file][rank].team == self.team):
+        if self.game.bitboards.occupied_by[TEAM_INDEX[self.team]] >> square_index(file, rank) & 1:
             #print(f"{self} cannot move to {file}{rank} because {self.game.board[file][rank]} is already there!")
             return True
         else:
@@ -127,9 +167,50 @@ class Piece(Square): # the foundational class of all the following pieces
         """
         pass
 
+    def targets(self):
+        """
+        Finds every square this piece could move to, ignoring whether the move would leave its king in check.
+
+        Args:
+        self: The instance of the class containing the piece's current position.
+
+        Returns:
+        Represents an abstract as every child piece has its own targets function, which returns a bitboard mask.
+        """
+        pass
+
+    def own_pieces(self):
+        """
+        Gets the squares of this piece's own team, which it can never move onto.
+
+        Args:
+            self: The instance of the piece object.
+
+        Returns:
+            A bitboard mask of every piece on this piece's team.
+        """
+        return self.game.bitboards.occupied_by[TEAM_INDEX[self.team]]
+
+    def can_slide_to(self, file, rank, reach):
+        """
+        Checks if a sliding piece (Rook, Bishop or Queen) can reach the given file and rank.
+
+        Args:
+            self: The instance of the piece object.
+            file: The target file (column) coordinate of the move.
+            rank: The target rank (row) coordinate of the move.
+            reach: The table of squares the piece could reach from each square on an empty board.
+
+        Returns:
+            True if the target is on one of the piece's lines and no piece stands between them, False otherwise.
+        """
+        start = square_index(self.file, self.rank)
+        target = square_index(file, rank)
+        return bool(reach[start] >> target & 1) and not BETWEEN[start][target] & self.game.bitboards.occupied
+
 class Pawn(Piece):
-    def __init__(self, game, file, rank, square_colored, team):
-        super().__init__(game, file, rank, square_colored, team)
+    __slots__ = ()
+    kind = PAWN
 
     def __str__(self):
         return " ♙  " if self.team == BLACK else " ♟  "
@@ -146,8 +227,9 @@ class Pawn(Piece):
         Returns:
             True if the piece can capture the opponent's piece at the given location, False otherwise.
         """
-        # Check if the target square has an opponent's piece to capture
-        if isinstance(self.game.board[file][rank], Piece):
+        # Check if the target square has an opponent's piece to capture, or a pawn that just jumped past it (en passant)
+        passed = self.game.board[file][self.rank]
+        if self.game.is_occupied(file, rank) or (passed.passantable and passed.team != self.team):
             if self.team == WHITE:
                 if rank == self.rank + 1 and abs(file - self.file) == 1:
                     return True
@@ -178,10 +260,10 @@ class Pawn(Piece):
             # First move: Can move 2 squares ahead, or 1 square ahead (without capture)
             if self.first_move:
                 # Moving two squares forward
-                if file == self.file and rank == self.rank + 2 and not isinstance(self.game.board[file][rank], Piece) and not isinstance(self.game.board[self.file][self.rank+1], Piece):
+                if file == self.file and rank == self.rank + 2 and not self.game.is_occupied(file, rank) and not self.game.is_occupied(self.file, self.rank+1):
                     return True
                 # Moving one square forward
-                elif file == self.file and rank == self.rank + 1 and not isinstance(self.game.board[file][rank], Piece):
+                elif file == self.file and rank == self.rank + 1 and not self.game.is_occupied(file, rank):
                     return True
                 # Diagonal captures
                 elif (file == self.file + 1 or file == self.file - 1) and rank == self.rank + 1 and self.can_capture(file, rank):
@@ -190,7 +272,7 @@ class Pawn(Piece):
                     return False
             else:
                 # After the first move, can move only 1 square forward
-                if file == self.file and rank == self.rank + 1 and not isinstance(self.game.board[file][rank], Piece):
+                if file == self.file and rank == self.rank + 1 and not self.game.is_occupied(file, rank):
                     return True
                 elif (file == self.file + 1 or file == self.file - 1) and rank == self.rank + 1 and self.can_capture(file, rank):
                     return True
@@ -200,16 +282,16 @@ class Pawn(Piece):
         # For Black pawns (moving downwards (rank - 1) on the board)
         elif self.team == BLACK:
             if self.first_move:
-                if file == self.file and rank == self.rank - 2 and not isinstance(self.game.board[file][rank], Piece) and not isinstance(self.game.board[self.file][self.rank-1], Piece):
+                if file == self.file and rank == self.rank - 2 and not self.game.is_occupied(file, rank) and not self.game.is_occupied(self.file, self.rank-1):
                     return True
-                elif file == self.file and rank == self.rank - 1 and not isinstance(self.game.board[file][rank], Piece):
+                elif file == self.file and rank == self.rank - 1 and not self.game.is_occupied(file, rank):
                     return True
                 elif (file == self.file + 1 or file == self.file - 1) and rank == self.rank - 1 and self.can_capture(file, rank):
                     return True
                 else:
                     return False
             else:
-                if file == self.file and rank == self.rank - 1 and not isinstance(self.game.board[file][rank], Piece):
+                if file == self.file and rank == self.rank - 1 and not self.game.is_occupied(file, rank):
                     return True
                 elif (file == self.file + 1 or file == self.file - 1) and rank == self.rank - 1 and self.can_capture(file, rank):
                     return True
@@ -217,51 +299,90 @@ class Pawn(Piece):
                     return False
         return False
     
-    def move_to(self, file, rank):
+    def targets(self):
+        """
+        Finds every square the pawn could move to.
+
+        Args:
+            self: The instance of the pawn object.
+
+        Returns:
+            A bitboard mask of the squares ahead (one, or two on its first move) that are free, the diagonal
+            squares holding an opponent's piece, and the square behind a pawn it can take en passant.
+        """
+        game = self.game
+        color = TEAM_INDEX[self.team]
+        square = square_index(self.file, self.rank)
+        occupied = game.bitboards.occupied
+        step = 8 if self.team == WHITE else -8
+        targets = PAWN_TARGETS[color][square] & game.bitboards.occupied_by[1 - color]
+        passant = game.passant_pawn
+        if passant is not None and passant.team != self.team and passant.rank == self.rank and abs(passant.file - self.file) == 1:
+            targets |= 1 << (square_index(passant.file, passant.rank) + step)
+        ahead = square + step
+        if 0 <= ahead < 64 and not occupied >> ahead & 1:
+            targets |= 1 << ahead
+            if self.first_move and not occupied >> (ahead + step) & 1:
+                targets |= 1 << (ahead + step)
+        return targets
+
+    def move_to(self, file, rank, promotion="Q"):
         """
         Moves the pawn to the specified file and rank. 
-        Promotes the pawn to a Queen if it reaches the opposite end of the board.
+        Promotes the pawn if it reaches the opposite end of the board.
 
         Args:
             self: The instance of the pawn object.
             file: The target file (column) coordinate of the move.
             rank: The target rank (row) coordinate of the move.
+            promotion: The character (Q, B, R, K) for the piece the pawn becomes on the last rank, a Queen by default.
 
         Returns:
             A string describing the move in a human-readable format. Calls the parent class's `move_to` method to handle 
-            the basic movement logic. If the pawn reaches the opposite end of the board (rank 1 or 8), promotes the pawn to a Queen.
+            the basic movement logic. If the pawn reaches the opposite end of the board (rank 1 or 8), it is promoted.
         """
-        response = super().move_to(file, rank)
+        response = super().move_to(file, rank, promotion)
         if rank == 8 or rank == 1:
-            self.promote()
+            response += f"\nPawn at {I_FILES[file]}{rank} promoted to a {PROMOTIONS[promotion.upper()].__name__}!"
         return response
 
-    def promote(self):
+    def promote(self, choice):
         """
         Promotes the pawn to a chosen piece.
 
-        This method allows the player to choose the piece to promote their pawn to 
-        when it reaches the opposite end of the board.
-
         Args:
-            self: The instance of the pawn object. Calls the `game.promote()` method to handle 
-            the actual promotion within the game logic.
+            self: The instance of the pawn object.
+            choice: The character representing the chosen piece (Q for Queen, B for Bishop, R for Rook, K for Knight).
+                Calls the `game.promote()` method to handle the actual promotion within the game logic.
+
+        Returns:
+            A string announcing the promotion.
         """
-        choice = input("Pawn promotion! Pick which piece (Q, B, R, K) you would like:\n")
-        while choice not in ["Q", "q", "B", "b", "R", "r", "K", "k"]:
-            print("Invalid choice! Try again:\n")
-            choice = input("Pawn promotion! Pick which piece (Q, B, R, K) you would like:\n")
-        self.game.promote(self, choice)
+        return self.game.promote(self, choice)
     
 
 class Rook(Piece):
-    def __init__(self, game, file, rank, square_colored, team):
-        super().__init__(game, file, rank, square_colored, team)
+    __slots__ = ()
+    kind = ROOK
 
     def __str__(self):
         return " ♖  " if self.team == BLACK else " ♜  "
     
 
+    def targets(self):
+        """
+        Finds every square the Rook could move to.
+
+        Args:
+            self: The instance of the Rook object.
+
+        Returns:
+            A bitboard mask of the squares along its rank and file up to and including the first piece in the way,
+            less any of its own pieces.
+        """
+        occupied = self.game.bitboards.occupied
+        return slider_targets(square_index(self.file, self.rank), occupied, ORTHOGONAL_RAYS) & ~self.own_pieces()
+
     def can_move_to(self, file, rank):
         """
         Checks if the piece can legally move to the specified file and rank.
@@ -278,27 +399,29 @@ class Rook(Piece):
         """
         if self.already_there(file, rank) or not self.on_board(file, rank) or self.your_piece_there(file, rank):
             return False
-        # Check vertical movement
-        if self.file == file:
-            step = 1 if rank > self.rank else -1
-            for r in range(self.rank + step, rank, step):
-                if isinstance(self.game.board[file][r], Piece):
-                    return False
-            return True
-        # Check horizontal movement
-        if self.rank == rank:
-            step = 1 if file > self.file else -1
-            for f in range(self.file + step, file, step):
-                if isinstance(self.game.board[f][rank], Piece):
-                    return False
-            return True
-        return False 
+        # Vertical or horizontal movement with nothing in the way
+        return self.can_slide_to(file, rank, ROOK_REACH)
 
 class Knight(Piece):
+    __slots__ = ()
+    kind = KNIGHT
+
 
     def __str__(self):
         return " ♘  " if self.team == BLACK else " ♞  "
     
+    def targets(self):
+        """
+        Finds every square the Knight could move to.
+
+        Args:
+            self: The instance of the Knight object.
+
+        Returns:
+            A bitboard mask of the squares a knight jump away that do not hold one of its own pieces.
+        """
+        return KNIGHT_TARGETS[square_index(self.file, self.rank)] & ~self.own_pieces()
+
     def can_move_to(self, file, rank):
         """
         Checks if the Knight can legally move to the specified file and rank.
@@ -313,22 +436,32 @@ class Knight(Piece):
         """
         if self.already_there(file, rank) or not self.on_board(file, rank) or self.your_piece_there(file, rank):
             return False
-        possible_moves = [(self.file+2, self.rank+1),
-                          (self.file+2, self.rank-1),
-                          (self.file+1, self.rank+2),
-                          (self.file+1, self.rank-2),
-                          (self.file-2, self.rank+1),
-                          (self.file-2, self.rank-1),
-                          (self.file-1, self.rank+2),
-                          (self.file-1, self.rank-2)]
-        return (file,rank) in possible_moves
+        possible_moves = KNIGHT_TARGETS[square_index(self.file, self.rank)]
+        return bool(possible_moves >> square_index(file, rank) & 1)
     
 
 class Bishop(Piece):
+    __slots__ = ()
+    kind = BISHOP
+
 
     def __str__(self):
         return " ♗  " if self.team == BLACK else " ♝  "
     
+    def targets(self):
+        """
+        Finds every square the Bishop could move to.
+
+        Args:
+            self: The instance of the Bishop object.
+
+        Returns:
+            A bitboard mask of the squares along its diagonals up to and including the first piece in the way,
+            less any of its own pieces.
+        """
+        occupied = self.game.bitboards.occupied
+        return slider_targets(square_index(self.file, self.rank), occupied, DIAGONAL_RAYS) & ~self.own_pieces()
+
     def can_move_to(self, file, rank):
         """
         Checks if the Bishop can legally move to the specified file and rank.
@@ -339,32 +472,17 @@ class Bishop(Piece):
             rank: The target rank (row) coordinate of the move.
 
         Returns:
-            True if the move is legal for the Bishop, False otherwise. While loops check all spaces the bishop
-            can move to in order to determine if a piece is in its path
+            True if the move is legal for the Bishop, False otherwise. The move has to be diagonal and no piece
+            can be in its path
         """
         if self.already_there(file, rank) or not self.on_board(file, rank) or self.your_piece_there(file, rank):
             return False
-        if abs(file - self.file) != abs(rank - self.rank):
-            return False # not a diagonal move
-        
-        # Calculate the change in position of the Bishop
-        step_file = 1 if file > self.file else -1
-        step_rank = 1 if rank > self.rank else -1
-        current_file = self.file + step_file
-        current_rank = self.rank + step_rank
-
-        # While loop to see if a space is occupied by a piece or not
-        while current_file != file and current_rank != rank:
-            if isinstance(self.game.board[current_file][current_rank], Piece):
-                return False
-            current_file += step_file
-            current_rank += step_rank
-        return True
+        return self.can_slide_to(file, rank, BISHOP_REACH)
     
 
 class King(Piece):
-    def __init__(self, game, file, rank, square_colored, team):
-        super().__init__(game, file, rank, square_colored, team)
+    __slots__ = ()
+    kind = KING
 
     def __str__(self):
         return " ♔  " if self.team == BLACK else " ♚  "
@@ -387,24 +505,29 @@ class King(Piece):
         else:
             rank = 8
 
+        # Moving the king two squares is a castle, make_move brings the rook across with it
         if left:
             if self.first_move and isinstance(self.game.board[1][rank], Rook) and self.game.board[1][rank].first_move:
                 self.move_to(3,rank)
-                rook = self.game.board[1][rank]
-                #prev = Square(rook.game, rook.file, rook.rank, rook.square_colored)
-                rook.move_to(4, rank)
-                #self.game.board[1][rank] = prev
                 return (f"{self.team} castled!")
         else:
             if self.first_move and isinstance(self.game.board[8][rank], Rook) and self.game.board[8][rank].first_move:
                 self.move_to(7,rank)
-                rook = self.game.board[8][rank]
-                #prev = Square(rook.game, rook.file, rook.rank, rook.square_colored)
-                rook.move_to(6, rank)
-                #self.game.board[1][rank] = prev
                 return (f"{self.team} castled!")
         return False
 
+    def targets(self):
+        """
+        Finds every square the King could step to (castling is handled by Chess.castling_moves).
+
+        Args:
+            self: The instance of the King object.
+
+        Returns:
+            A bitboard mask of the neighbouring squares that do not hold one of its own pieces.
+        """
+        return KING_TARGETS[square_index(self.file, self.rank)] & ~self.own_pieces()
+
     def can_move_to(self, file, rank):
         """
         Checks if the King can legally move to the specified file and rank.
@@ -420,17 +543,34 @@ class King(Piece):
         """
         if self.already_there(file, rank) or not self.on_board(file, rank) or self.your_piece_there(file, rank):
             return False
-        moves = [(i, j) for i in range(self.file-1, self.file +2) for j in range(self.rank-1, self.rank+2)]
-        return (file, rank) in moves
+        moves = KING_TARGETS[square_index(self.file, self.rank)]
+        return bool(moves >> square_index(file, rank) & 1)
 
 
         
 
 class Queen(Piece):
+    __slots__ = ()
+    kind = QUEEN
+
 
     def __str__(self):
         return " ♕  " if self.team == BLACK else " ♛  "
     
+    def targets(self):
+        """
+        Finds every square the Queen could move to.
+
+        Args:
+            self: The instance of the Queen object.
+
+        Returns:
+            A bitboard mask of the squares along its lines up to and including the first piece in the way,
+            less any of its own pieces.
+        """
+        occupied = self.game.bitboards.occupied
+        return slider_targets(square_index(self.file, self.rank), occupied, QUEEN_RAYS) & ~self.own_pieces()
+
     def can_move_to(self, file, rank):
         """
         Checks if the Queen can legally move to the specified file and rank.
@@ -446,222 +586,235 @@ class Queen(Piece):
         """
         if self.already_there(file, rank) or not self.on_board(file, rank) or self.your_piece_there(file, rank):
             return False
-        if self.file == file or self.rank == rank: # copied in rook movement
-            if self.file == file:
-                step = 1 if rank > self.rank else -1
-                for r in range(self.rank + step, rank, step):
-                    if isinstance(self.game.board[file][r], Piece):
-                        return False
-                return True
-            if self.rank == rank:
-                step = 1 if file > self.file else -1
-                for f in range(self.file + step, file, step):
-                    if isinstance(self.game.board[f][rank], Piece):
-                        return False
-                return True
-        else: # copied in bishop movement
-            if abs(file - self.file) != abs(rank - self.rank):
-                return False
-            step_file = 1 if file > self.file else -1
-            step_rank = 1 if rank > self.rank else -1
-            current_file = self.file + step_file
-            current_rank = self.rank + step_rank
-            while current_file != file and current_rank != rank:
-                if isinstance(self.game.board[current_file][current_rank], Piece):
-                    return False
-                current_file += step_file
-                current_rank += step_rank
-            return True
-        return False
+        # Moves like a rook or a bishop
+        return self.can_slide_to(file, rank, QUEEN_REACH)
     
 
 class Chess():
 
-    def __init__(self):
+    # When True every move checks the incrementally updated position key against a full recalculation
+    debug = False
+
+    def __init__(self, fen=None):
+        # Optional transposition.TranspositionTable shared by checkmate checks, hints and searches of this game
+        self.table = None
+        # Optional tablebase.Tablebases giving exact answers once only a few pieces are left
+        self.tablebases = None
+        # The instrumentation.Instruments counting this game's calls while it is instrumented
+        self.instruments = None
+        # The CheckInfo of the last position it was worked out for, reused while the position key stays the same
+        self.check_cache = None
+        # The MoveRecords of the moves played, and of the moves taken back that can be played again, latest last
+        self.history = []
+        self.future = []
+        if fen is not None:
+            self.load_fen(fen)
+            return
         self.board = self.make_board()
         self.white_turn = True
         self.turn_number = 1
+        # Moves since the last capture or pawn move (the fifty move rule counter of a FEN)
+        self.halfmove_clock = 0
         # using a list here because tuples are not mutable and that causes issues
         self.white_king_pos = (5, 1)
         self.black_king_pos = (5, 8)
+        # The pawn that just moved two squares and can be taken en passant this turn (its passantable flag is set)
+        self.passant_pawn = None
+        # The bitboards are the fast core, self.board is kept in step with them as the object view of the game
+        self.bitboards = Bitboards()
+        # Each piece code's pieces by square, so a team's pieces can be visited without looking at empty squares
+        self.piece_index = [{} for code in range(12)]
+        self.sync_bitboards()
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Creates a game from a FEN string.
+
+        Args:
+            cls: The Chess class (or a subclass) to create.
+            fen: The position in Forsyth-Edwards Notation. The move counters may be left off.
+
+        Returns:
+            A new game set up in that position, see load_fen.
+        """
+        return cls(fen)
 
     def __str__(self):
-        game_string = "\n"
-        for rank in range(8, 0, -1):
-            row = f"{rank}: " # adds rank numbers legend
-            for file in range(1, 9):
-                piece = self.board[file][rank]
-                if isinstance(piece, Piece):
-                    row += f"{str(piece)}"
-                else:
-                    row += " .  "
-            game_string += row + "\n\n" # seperates the lines by a new line for visuals
-        game_string += "    a   b   c   d   e   f   g   h\n" # adds files letters legend
-        return game_string
+        # Fills the 64 cells from the piece index in one pass, then joins each row once
+        cells = [" .  "] * 64
+        for code, pieces in enumerate(self.piece_index):
+            for square in pieces:
+                cells[square] = GLYPHS[code]
+        rows = [f"{rank}: " + "".join(cells[(rank - 1) * 8:rank * 8]) # adds rank numbers legend
+                for rank in range(8, 0, -1)]
+        # seperates the lines by a new line for visuals and adds files letters legend
+        return "\n" + "\n\n".join(rows) + "\n\n    a   b   c   d   e   f   g   h\n"
+
+    def instrument(self, callback=None):
+        """
+        Starts counting and timing this game's calls to its rules primitives and its turns.
+
+        Args:
+            self: The instance of the Game class.
+            callback: An optional function called with an instrumentation.TurnStats after every turn.
+
+        Returns:
+            The instrumentation.Instruments holding the counters. Until it is called the primitives are not
+            wrapped at all, so a game that is not instrumented pays nothing for it.
+        """
+        from instrumentation import instrument
+        return instrument(self, callback)
+
+    def uninstrument(self):
+        """
+        Stops counting this game's calls.
+
+        Args:
+            self: The instance of the Game class.
+        """
+        from instrumentation import uninstrument
+        uninstrument(self)
+
+    def stats(self):
+        """
+        Takes a snapshot of the counters of an instrumented game.
+
+        Args:
+            self: The instance of the Game class.
 
-    def play(self):
+        Returns:
+            A dictionary of turn and call counts, times and latency histograms (see Instruments.snapshot), or None
+            if the game is not instrumented.
+        """
+        return self.instruments.snapshot() if self.instruments is not None else None
+
+    def play(self, opponent=None, opponent_team=BLACK, log=None):
         """
         Plays a complete game of chess. This method handles the main game loop, alternating turns between players 
         until a winner is determined.
 
         Args:
             self: The instance of the Game class.
+            opponent: Optional engine.Engine that plays one side instead of a second person.
+            opponent_team: The team the opponent plays.
+            log: Optional gamelog.GameLog the game is recorded in.
 
         Returns:
             Alternates turns between White and Black players, increments the turn number for each turn, determines the winner of the game,
             and prints the final board state and the winner.
         """
+        # The prompts are only the front end, the session checks and plays the moves
+        session = GameSession(self, log)
         winner = None
         while not winner:
-            winner = self.turn()
-            self.white_turn = not self.white_turn
-            self.turn_number += 1
+            # Each move made switches whose turn it is and counts the turn
+            if opponent is not None and self.team_to_move() == opponent_team:
+                winner = self.computer_turn(session, opponent)
+            else:
+                winner = self.turn(session)
         print(self)
         print(winner)
 
-    def turn(self):
+    def turn(self, session=None):
         """
         Handles each turn in the game
 
         Prompts the user for an input, and handles translating that input into a location of their piece to be moved.
         This process is then repeated for the destination of the selected piece.
-        There are loops in place to handle invalid selections and the move is checked for legality.
-        The selected piece is then moved and the associated variables are updated.
+        There are loops in place to handle invalid selections, and the move is handed to the GameSession which checks
+        it for legality and plays it.
 
         Args:
             self: The instance of the Game class.
+            session: The GameSession playing this game, one is made if not given.
 
         Returns: A string announcing the winner if the game is over, otherwise None
             
         """
-        piece_selected = False
-        to_move_position = ()
-        destination_selected = False
-        piece = None
-        destination = None
-        moved = False
-        castled = False
+        if session is None:
+            session = GameSession(self)
         print(self)
-        while not moved:
-            while not (destination_selected and piece_selected):
-                piece_selected = False
-                color = BLACK
-                if self.white_turn:
-                    color = WHITE
-                # Loop to insure a piece is properly selected to move
-                while not piece_selected:
-                    to_move_input = input(f"It is {color}'s turn. Enter the location of the piece you would like to move: ")
-                    try:
-                        to_move_position = (FILES[to_move_input[0].upper()], int(to_move_input[1]))
-                        temp_piece = self.board[to_move_position[0]][to_move_position[1]]
-                        if not (isinstance(temp_piece, Piece) and temp_piece.team == color):
-                            print("Invalid location, try again!")
-                            continue
-                        else:
-                            piece = temp_piece
-                            piece_selected = True
-                    except:
-                        print("Invalid input, try again!")
-                        continue
-
-                # Loop to insure a destination is properly selected to move to
-                destination_selected = False
-                print(f"{color}'s {piece.__class__.__name__} at {to_move_input[0].upper()}{to_move_position[1]} selected, Enter the location of square you would like to move to:\n" +
-                "(Enter 'R' to change selected piece)")
-                while not destination_selected:
-                    move_to_input = input()
-                    try:
-                        if move_to_input == "R" or move_to_input == "r":
-                            # Break out of destination selection and return to piece selection
-                            break
-                        move_to_position = (FILES[move_to_input[0].upper()], int(move_to_input[1]))
-                        # Check if the King is attempting to castle
-                        if isinstance(piece, King) and isinstance(self.board[move_to_position[0]][move_to_position[1]], Rook) and self.board[move_to_position[0]][move_to_position[1]].team == piece.team:
-                            if piece.team == WHITE:
-                                other_team = BLACK
-                            else:
-                                other_team = WHITE
-
-                            if move_to_position[0] == 1 and not (self.is_checked(other_team, 3,move_to_position[1]) or self.is_checked(other_team, 4,move_to_position[1]) or self.is_checked(other_team, 5,move_to_position[1])) and not isinstance(self.board[2][move_to_position[1]], Piece) and not isinstance(self.board[3][move_to_position[1]], Piece) and not isinstance(self.board[4][move_to_position[1]], Piece):
-                                castled = piece.can_castle(True)
-                                print(castled)
-                                if not self.white_turn:
-                                    self.black_king_pos = (3, move_to_position[1])
-                                else:
-                                    self.white_king_pos = (3, move_to_position[1])
-                                return False
-                            elif move_to_position[0] == 8 and not (self.is_checked(other_team, 5,move_to_position[1]) or self.is_checked(other_team, 6,move_to_position[1]) or self.is_checked(other_team, 7,move_to_position[1])) and not isinstance(self.board[6][move_to_position[1]], Piece) and not isinstance(self.board[7][move_to_position[1]], Piece):
-                                castled = piece.can_castle(False)
-                                print(castled)
-                                if not self.white_turn:
-                                    self.black_king_pos = (7, move_to_position[1])
-                                else:
-                                    self.white_king_pos = (7, move_to_position[1])
-                                return False
-                            else:
-                                print("Cannot castle!")
-                        elif piece.can_move_to(move_to_position[0], move_to_position[1]):
-                            destination = move_to_position
-                            destination_selected = True
-                        else:
-                            print(f"{piece.__class__.__name__} at {to_move_input[0].upper()}{to_move_position[1]} cannot move to {move_to_input[0].upper()}{move_to_position[1]}, try again!")
-                    except Exception as e:
-                        print(f"Invalid input, try again! {e}")
-                        continue
-                if not destination_selected:
+        while True:
+            color = self.team_to_move()
+            # Loop to insure a piece is properly selected to move
+            while True:
+                to_move_input = input(f"It is {color}'s turn. Enter the location of the piece you would like to move: ")
+                try:
+                    to_move_position = (FILES[to_move_input[0].upper()], int(to_move_input[1]))
+                    piece = self.board[to_move_position[0]][to_move_position[1]]
+                except:
+                    print("Invalid input, try again!")
                     continue
-            
-
-            temp_board = copy.deepcopy(self.board)
-            wk_pos = self.white_king_pos
-            bk_pos = self.black_king_pos
+                if isinstance(piece, Piece) and piece.team == color:
+                    break
+                print("Invalid location, try again!")
+
+            # Loop to insure a destination is properly selected to move to
+            print(f"{color}'s {piece.__class__.__name__} at {to_move_input[0].upper()}{to_move_position[1]} selected, Enter the location of square you would like to move to:\n" +
+            "(Enter 'R' to change selected piece)")
+            while True:
+                move_to_input = input()
+                if move_to_input == "R" or move_to_input == "r":
+                    # Break out of destination selection and return to piece selection
+                    break
+                try:
+                    move_to_position = (FILES[move_to_input[0].upper()], int(move_to_input[1]))
+                except Exception as e:
+                    print(f"Invalid input, try again! {e}")
+                    continue
+                # Choosing your own Rook as the destination of the King asks to castle
+                result = session.play_move((to_move_position, move_to_position))
+                if result.status == PROMOTION_REQUIRED:
+                    choice = input("Pawn promotion! Pick which piece (Q, B, R, K) you would like:\n")
+                    while choice not in ["Q", "q", "B", "b", "R", "r", "K", "k"]:
+                        print("Invalid choice! Try again:\n")
+                        choice = input("Pawn promotion! Pick which piece (Q, B, R, K) you would like:\n")
+                    result = session.play_move((to_move_position, move_to_position), choice)
+                if result.status in (ILLEGAL, INVALID):
+                    print(result.message)
+                    continue
+                print(result.message)
+                if result.checkmate:
+                    print("CHECKMATE")
+                    return self.winner(result.winner)
+                if result.stalemate:
+                    print("STALEMATE")
+                    return STALEMATE_MESSAGE
+                if result.check:
+                    hint = self.hint()
+                    print(f"HINT! {hint.piece.__class__.__name__} to {I_FILES[hint.file]}{hint.rank} can save you!")
+                return None
+
+    def computer_turn(self, session, engine):
+        """
+        Lets an engine make the move for the team whose turn it is.
 
-            out = piece.move_to(destination[0], destination[1])
-            if isinstance(piece, King):
-                if self.white_turn:
-                    wk_pos = destination
-                else:
-                    bk_pos = destination
-
-            moved = True
-            if self.is_checked(WHITE, bk_pos[0], bk_pos[1]):
-                if not self.white_turn:
-                    print("Cannot do this move. Protect your king!")
-                    self.board = temp_board
-                    self.black_king_pos = bk_pos
-                    piece.file = to_move_position[0]
-                    piece.rank = to_move_position[1]
-                    # Restart the turn function
-                    moved = False
-                    destination_selected = False
-                    piece_selected = False
+        Args:
+            self: The instance of the Game class.
+            session: The GameSession playing this game.
+            engine: The engine.Engine choosing the move, within its time budget or from its opening book.
 
-                else:
-                    if self.is_checkmate(BLACK):
-                        return self.winner(WHITE)
-                    out += (f"\nBlack's king is checked!")
-            if self.is_checked(BLACK, wk_pos[0], wk_pos[1]):
-                if self.white_turn:
-                    print("Cannot do this move. Protect your king!")
-                    self.board = temp_board
-                    self.white_king_pos = wk_pos
-                    piece.file = to_move_position[0]
-                    piece.rank = to_move_position[1]
-                    # Restart the turn function
-                    moved = False
-                    destination_selected = False
-                    piece_selected = False
-                else:
-                    if self.is_checkmate(WHITE):
-                        return self.winner(BLACK)
-                    out += (f"\nWhite's king is checked!")
-        # If piece is a king, update its position
-        if isinstance(piece, King):
-            if not self.white_turn:
-                self.black_king_pos = destination
-            else:
-                self.white_king_pos = destination
-        print(out)
+        Returns: A string announcing the winner (or the draw) if the game is over, otherwise None
+        """
+        print(self)
+        color = self.team_to_move()
+        found = engine.search(self)
+        if found.move is None:
+            return f"{color} has no legal moves, the game is a draw!"
+        result = session.play_move(found.move)
+        if found.book:
+            print(f"{color} plays {result.san} (book)")
+        else:
+            print(f"{color} plays {result.san} (depth {found.depth}, {found.nodes} nodes, {found.nps} nodes/s)")
+        print(result.message)
+        if result.checkmate:
+            print("CHECKMATE")
+            return self.winner(result.winner)
+        if result.stalemate:
+            print("STALEMATE")
+            return STALEMATE_MESSAGE
+        return None
 
     def is_checked(self, by_team, file_to_check, rank_to_check):
         """
@@ -674,14 +827,180 @@ class Chess():
             rank_to_check: The rank (row) coordinate of the tile to check.
 
         Returns:
-            True if the tile at the given position is in check by the specified team, False otherwise.
+            True if the tile at the given position is in check by the specified team, False otherwise. Looks outwards
+            from the tile for knights, kings, pawns and the first piece along each line, and stops at the first attacker.
+        """
+        return self.bitboards.is_attacked(TEAM_INDEX[by_team], square_index(file_to_check, rank_to_check))
+
+    def attackers(self, by_team, file_to_check, rank_to_check):
+        """
+        Finds every piece of a team that attacks the tile at the given position.
+
+        Args:
+            self: The instance of the Game class.
+            by_team: The team of the pieces to check for attacks (e.g., "WHITE", "BLACK").
+            file_to_check: The file (column) coordinate of the tile to check.
+            rank_to_check: The rank (row) coordinate of the tile to check.
+
+        Returns:
+            A bitboard mask of the squares of the attacking pieces (0 if there are none), used when working out how
+            to get out of check. Use bitboard.iter_squares to walk through them.
+        """
+        return self.bitboards.attackers(TEAM_INDEX[by_team], square_index(file_to_check, rank_to_check))
+
+    def is_occupied(self, file, rank):
+        """
+        Checks if there is a piece of either team at the given file and rank.
+
+        Args:
+            self: The instance of the Game class.
+            file: The file (column) coordinate to check.
+            rank: The rank (row) coordinate to check.
+
+        Returns:
+            True if a piece is on the square, False otherwise.
+        """
+        return bool(self.bitboards.occupied >> square_index(file, rank) & 1)
+
+    def team_pieces(self, team, kind=None):
+        """
+        Lists the pieces a team has on the board.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team whose pieces are wanted.
+            kind: Optional piece kind (bitboard.PAWN ... bitboard.KING) to list only that kind.
+
+        Returns:
+            A list of the team's Piece objects, read from the piece index so only live pieces are visited. It is a
+            copy, so moves can be made while going through it.
+        """
+        base = 6 * TEAM_INDEX[team]
+        if kind is not None:
+            return list(self.piece_index[base + kind].values())
+        index = self.piece_index
+        return [piece for code in range(base, base + 6) for piece in index[code].values()]
+
+    def sync_bitboards(self):
+        """
+        Rebuilds the bitboards from the pieces on self.board.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            Replaces self.bitboards and the piece index and recalculates the position key and evaluation from them.
+            Only needed after the board has been edited directly, the move functions keep them all up to date
+            themselves.
         """
+        self.bitboards = Bitboards()
+        self.piece_index = [{} for code in range(12)]
         for file in range(1,9):
             for rank in range(1,9):
                 square = self.board[file][rank]
-                if isinstance(square, Piece) and square.team == by_team and square.can_move_to(file_to_check, rank_to_check):
-                    return True
-        return False
+                if isinstance(square, Piece):
+                    self.bitboards.put(square.code, square_index(file, rank))
+                    self.piece_index[square.code][square_index(file, rank)] = square
+        self.key = self.compute_key()
+        self.mg, self.eg, self.phase = full_eval(self.bitboards)
+
+    def castling_rights(self):
+        """
+        Works out which castles are still possible from the first_move flags of the Kings and corner Rooks.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            The rights as a combination of the zobrist WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE and
+            BLACK_QUEENSIDE bits (0 when neither team can castle).
+        """
+        rights = 0
+        for team, rank, kingside, queenside in ((WHITE, 1, WHITE_KINGSIDE, WHITE_QUEENSIDE), (BLACK, 8, BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            king = self.board[5][rank]
+            if not (isinstance(king, King) and king.team == team and king.first_move):
+                continue
+            for file, right in ((8, kingside), (1, queenside)):
+                rook = self.board[file][rank]
+                if isinstance(rook, Rook) and rook.team == team and rook.first_move:
+                    rights |= right
+        return rights
+
+    def passant_file(self):
+        """
+        Finds the file the position key holds for the en passant pawn.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            The file (1-8) of the pawn that has just moved two squares if a pawn of the other team stands beside it
+            to take it, otherwise None. Like Polyglot, the key only changes when a capture is possible, so the same
+            position reached with and without a double pawn push gets the same key.
+        """
+        pawn = self.passant_pawn
+        if pawn is None:
+            return None
+        square = square_index(pawn.file, pawn.rank)
+        beside = (1 << square - 1 if pawn.file > 1 else 0) | (1 << square + 1 if pawn.file < 8 else 0)
+        takers = self.bitboards.pieces[6 * (1 - TEAM_INDEX[pawn.team]) + PAWN]
+        return pawn.file if beside & takers else None
+
+    def compute_key(self):
+        """
+        Calculates the position key from scratch.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            The 64 bit Zobrist key of the pieces, castling rights, en passant file (when a capture is possible) and
+            side to move. The move functions keep self.key equal to this without recalculating it.
+        """
+        return position_key(self.bitboards, self.white_turn, self.castling_rights(), self.passant_file())
+
+    def check_key(self):
+        """
+        Compares the incrementally updated position key with a full recalculation (used in debug mode).
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            Raises a RuntimeError if the keys do not match.
+        """
+        expected = self.compute_key()
+        if self.key != expected:
+            raise RuntimeError(f"Position key out of step: {self.key:016x} should be {expected:016x}")
+
+    def evaluate(self):
+        """
+        Scores the position by material and piece-square tables.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            The score in centipawns from the point of view of the team whose turn it is, blended between the
+            middlegame and endgame values by how many pieces are left. Uses the totals kept up to date by the move
+            functions, so nothing is added up here.
+        """
+        score = tapered(self.mg, self.eg, self.phase)
+        return score if self.white_turn else -score
+
+    def check_evaluation(self):
+        """
+        Compares the incrementally updated evaluation with a full recalculation (used in debug mode).
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            Raises a RuntimeError if they do not match.
+        """
+        expected = full_eval(self.bitboards)
+        if (self.mg, self.eg, self.phase) != expected:
+            raise RuntimeError(f"Evaluation out of step: {(self.mg, self.eg, self.phase)} should be {expected}")
 
     def is_checkmate(self, team):
         """
@@ -692,16 +1011,71 @@ class Chess():
             team: The team to check for checkmate (e.g., "WHITE", "BLACK").
 
         Returns:
-            True if the given team is in checkmate, False otherwise.
+            True if the given team is in check and has no legal moves, False otherwise. A position in the game's
+            tablebases is answered by the table without looking at any moves.
         """
-        for file in range(1,9):
-            for rank in range(1,9):
-                square = self.board[file][rank]
-                if isinstance(square, Piece) and square.team == team:
-                    if self.any_valid_move(square):
-                        return False
-        print("CHECKMATE")
-        return True
+        if self.tablebases is not None and team == self.team_to_move():
+            result = self.tablebases.probe(self)
+            if result is not None:
+                return result.wdl < 0 and result.dtm == 0
+        if not self.in_check(team):
+            return False
+        # In check only the evasions are generated, and it stops at the first one found
+        return self.hint(team) is None
+
+    def is_stalemate(self, team):
+        """
+        Checks if the given team is in stalemate.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team to check for stalemate.
+
+        Returns:
+            True if the given team is not in check but has no legal moves (the game is a draw), False otherwise.
+        """
+        if self.in_check(team):
+            return False
+        return self.hint(team) is None
+
+    def in_check(self, team=None):
+        """
+        Checks if a team's King is in check.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team to check, defaults to the team whose turn it is.
+
+        Returns:
+            True if the team's King is attacked, False otherwise.
+        """
+        if team is None or team == self.team_to_move():
+            return self.check_info().checkers != 0
+        king_pos = self.white_king_pos if team == WHITE else self.black_king_pos
+        return self.is_checked(BLACK if team == WHITE else WHITE, king_pos[0], king_pos[1])
+
+    def check_info(self):
+        """
+        Finds the pieces giving check to, and the pieces pinned against, the King of the team whose turn it is.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            A CheckInfo with the position key, the King's square, a mask of the checking pieces and a mask of the
+            team's pinned pieces. It is worked out once per position and kept until the position key changes, so
+            every legality test in the same position shares it.
+        """
+        info = self.check_cache
+        if info is not None and info.key == self.key:
+            return info
+        index = 0 if self.white_turn else 1
+        king_pos = self.white_king_pos if self.white_turn else self.black_king_pos
+        king_square = square_index(king_pos[0], king_pos[1])
+        info = CheckInfo(self.key, king_square, self.bitboards.attackers(1 - index, king_square),
+                         self.bitboards.pinned(index, king_square))
+        self.check_cache = info
+        return info
     
     
     def any_valid_move(self, piece: Piece):
@@ -715,41 +1089,682 @@ class Chess():
         Returns:
             True if the piece has at least one legal move, False otherwise.
         """
-        if piece.team == WHITE:
-            other_team = BLACK
-            king_pos = self.white_king_pos
-        else:
-            other_team = WHITE
-            king_pos = self.black_king_pos
-        for file in range(1,9):
-            for rank in range(1,9):
-                # Determine if this move can save the king
+        # A move remembered for this position saves generating any
+        move = self.table_move(piece.team)
+        if move is not None and move.piece is piece:
+            return True
+        moves = self.piece_moves(piece)
+        if isinstance(piece, King):
+            moves = chain(moves, self.castling_moves(piece.team))
+        for move in moves:
+            # Determine if this move can save the king
+            if self.is_legal(move):
+                if self.table is not None and piece.team == self.team_to_move() and self.table.probe(self.key) is None:
+                    self.table.store(self.key, encode_move(move), 0, LOWER, -MATE_SCORE)
+                return True
+        return False
+
+    def hint(self, team=None):
+        """
+        Finds one legal move for a team, remembering it in the transposition table if the game has one.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team to find a move for, defaults to the team whose turn it is.
+
+        Returns:
+            A legal Move, or None if the team has no legal moves. Repeated calls for the same position are
+            answered from the table, including positions already known to have no moves.
+        """
+        if team is None:
+            team = self.team_to_move()
+        use_table = self.table is not None and team == self.team_to_move()
+        if use_table:
+            entry = self.table.probe(self.key)
+            if entry is not None:
+                move = self.decode_move(entry.move) if entry.move else None
+                if move is not None and self.is_legal(move):
+                    return move
+                if not entry.move and entry.depth == TERMINAL_DEPTH:
+                    return None
+                use_table = False # keep what a search stored here
+        move = next(self.legal_moves(team), None)
+        if use_table:
+            if move is not None:
+                # Only known to be no worse than being mated, but the move is what matters here
+                self.table.store(self.key, encode_move(move), 0, LOWER, -MATE_SCORE)
+            else:
+                king_pos = self.white_king_pos if team == WHITE else self.black_king_pos
+                in_check = self.is_checked(BLACK if team == WHITE else WHITE, king_pos[0], king_pos[1])
+                self.table.store(self.key, 0, TERMINAL_DEPTH, EXACT, -MATE_SCORE if in_check else 0)
+        return move
+
+    def table_move(self, team):
+        """
+        Gets the move stored in the transposition table for this position, if it is legal.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team the move is wanted for, only the team whose turn it is can have one.
+
+        Returns:
+            The stored Move, or None if there is no table, no entry, or the entry does not hold a legal move.
+        """
+        if self.table is None or team != self.team_to_move():
+            return None
+        entry = self.table.probe(self.key)
+        if entry is None or not entry.move:
+            return None
+        move = self.decode_move(entry.move)
+        if move is None or not self.is_legal(move):
+            return None
+        return move
+
+    def team_to_move(self):
+        """
+        Gets the team whose turn it is.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            WHITE or BLACK.
+        """
+        return WHITE if self.white_turn else BLACK
+
+    def decode_move(self, code):
+        """
+        Turns a move encoded by encode_move back into a Move for the current position.
+
+        Args:
+            self: The instance of the Game class.
+            code: The 16 bit encoded move.
+
+        Returns:
+            The Move if the piece on its start square belongs to the team whose turn it is and can make it
+            (ignoring check), otherwise None. Stored moves can come from another position with the same key
+            bucket, so they are always checked before being used.
+        """
+        from_file, from_rank = square_file_rank(code >> 6 & 63)
+        file, rank = square_file_rank(code & 63)
+        piece = self.board[from_file][from_rank]
+        if not (isinstance(piece, Piece) and piece.team == self.team_to_move()):
+            return None
+        promotion = PROMOTION_CHOICES.get(code >> 12 & 7)
+        if (promotion is not None) != (isinstance(piece, Pawn) and rank in (1, 8)):
+            return None
+        move = Move(piece, file, rank, promotion)
+        if piece.targets() >> square_index(file, rank) & 1:
+            return move
+        if isinstance(piece, King) and move in self.castling_moves(piece.team):
+            return move
+        return None
+
+    def san(self, move: Move, suffix=True):
+        """
+        Writes a move in Standard Algebraic Notation (e.g. e4, Nxf3, exd8=Q+, O-O).
 
-                # Store the location of the piece we are testing so we can undo the move later
-                temp_file = piece.file
-                temp_rank = piece.rank
+        Args:
+            self: The instance of the Game class.
+            move: A legal Move that has not been made yet.
+            suffix: Whether to add + for check and # for checkmate, which means trying the move.
 
-                if piece.can_move_to(file, rank):
-                    temp_board = copy.deepcopy(self.board)
-                    # Update the kings position if it moves
-                    if isinstance(piece, King):
-                        pos_to_test = (file, rank)
+        Returns:
+            The move as a SAN string, naming the start file and/or rank when another piece of the same kind could
+            also move to the target square.
+        """
+        piece = move.piece
+        if isinstance(piece, King) and abs(move.file - piece.file) == 2:
+            text = "O-O" if move.file == 7 else "O-O-O"
+        else:
+            target = f"{I_FILES[move.file].lower()}{move.rank}"
+            if isinstance(piece, Pawn):
+                text = target
+                if move.file != piece.file:
+                    text = f"{I_FILES[piece.file].lower()}x{target}"
+                if move.promotion is not None:
+                    text += "=" + SAN_LETTERS[PROMOTIONS[move.promotion.upper()]]
+            else:
+                capture = "x" if self.is_occupied(move.file, move.rank) else ""
+                # Other pieces of the same kind that can also get to the target square
+                rivals = []
+                for other in self.piece_index[piece.code].values():
+                    if (other is not piece and other.targets() >> square_index(move.file, move.rank) & 1
+                            and self.is_legal(Move(other, move.file, move.rank))):
+                        rivals.append(other)
+                start = ""
+                if rivals:
+                    if all(other.file != piece.file for other in rivals):
+                        start = I_FILES[piece.file].lower()
+                    elif all(other.rank != piece.rank for other in rivals):
+                        start = str(piece.rank)
                     else:
-                        pos_to_test = king_pos
-
-                    piece.move_to(file, rank)
-                    self.board[file][rank] = piece
-                    
-                    if not self.is_checked(other_team, pos_to_test[0], pos_to_test[1]):
-                        self.board = temp_board
-                        print(f"HINT! {piece.__class__.__name__} to {I_FILES[file]}{rank} can save you!")
-                        return True
-                    
-                    self.board = temp_board
-                    piece.file = temp_file
-                    piece.rank = temp_rank
+                        start = f"{I_FILES[piece.file].lower()}{piece.rank}"
+                text = f"{SAN_LETTERS[type(piece)]}{start}{capture}{target}"
+        if suffix:
+            record = self.make_move(*move)
+            other_team = self.team_to_move()
+            king_pos = self.white_king_pos if other_team == WHITE else self.black_king_pos
+            if self.is_checked(piece.team, king_pos[0], king_pos[1]):
+                text += "#" if next(self.legal_moves(other_team), None) is None else "+"
+            self.unmake_move(record)
+        return text
+
+    def parse_move(self, text):
+        """
+        Reads a move for the team whose turn it is from coordinates (e2e4, e2-e4, E2 E4, e7e8q) or from
+        Standard Algebraic Notation (e4, Nf3, exd8=Q+, O-O).
 
-        return False
+        Args:
+            self: The instance of the Game class.
+            text: The move as a string.
+
+        Returns:
+            The Move, which still has to be checked with is_legal. A pawn moving to the last rank without a
+            promotion choice gives a Move with promotion None. Returns None for a SAN move that matches no legal
+            move, and raises a ValueError if the text cannot be read or is ambiguous.
+        """
+        text = text.strip()
+        coordinates = COORDINATE_MOVE.match(text)
+        if coordinates:
+            start, end, promotion = coordinates.groups()
+            return self.coordinate_move((FILES[start[0].upper()], int(start[1])), (FILES[end[0].upper()], int(end[1])),
+                                        SAN_PROMOTIONS.get(promotion.upper()) if promotion else None)
+
+        san = text.rstrip("+#!?")
+        team = self.team_to_move()
+        if san.replace("0", "O") in ("O-O", "O-O-O"):
+            king_file = 7 if san.replace("0", "O") == "O-O" else 3
+            for move in self.castling_moves(team):
+                if move.file == king_file and self.is_legal(move):
+                    return move
+            return None
+        match = SAN_MOVE.match(san)
+        if not match:
+            raise ValueError(f"Cannot read the move {text!r}")
+        letter, from_file, from_rank, target, promotion = match.groups()
+        kind = SAN_PIECES[letter] if letter else Pawn
+        file, rank = FILES[target[0].upper()], int(target[1])
+        candidates = []
+        for move in self.legal_moves(team):
+            piece = move.piece
+            if type(piece) is not kind or move.file != file or move.rank != rank:
+                continue
+            if from_file and piece.file != FILES[from_file.upper()]:
+                continue
+            if from_rank and piece.rank != int(from_rank):
+                continue
+            if isinstance(piece, King) and abs(file - piece.file) == 2:
+                continue # castling is only written as O-O
+            if promotion and move.promotion != SAN_PROMOTIONS[promotion]:
+                continue
+            candidates.append(move)
+        # Without a promotion choice the four promotions of one pawn count as one move
+        if not promotion:
+            candidates = list({(move.piece, move.file, move.rank): move._replace(promotion=None) for move in candidates}.values())
+        if len(candidates) > 1:
+            raise ValueError(f"The move {text!r} is ambiguous")
+        return candidates[0] if candidates else None
+
+    def coordinate_move(self, start, end, promotion=None):
+        """
+        Builds a move from its start and end squares.
+
+        Args:
+            self: The instance of the Game class.
+            start: The (file, rank) of the piece to move, which must belong to the team whose turn it is.
+            end: The (file, rank) to move it to. A King moved onto its own Rook castles towards that Rook.
+            promotion: Optional character (Q, B, R, K) for the piece a pawn becomes on the last rank.
+
+        Returns:
+            The Move, which still has to be checked with is_legal. Raises a ValueError if the squares are off the
+            board, there is no piece of the team to move on the start square, or a promotion is given for a move
+            that is not a pawn reaching the last rank.
+        """
+        for file, rank in (start, end):
+            if not (1 <= file <= 8 and 1 <= rank <= 8):
+                raise ValueError(f"{file}, {rank} is not a square on the board")
+        piece = self.board[start[0]][start[1]]
+        if not (isinstance(piece, Piece) and piece.team == self.team_to_move()):
+            raise ValueError(f"There is no {self.team_to_move()} piece at {I_FILES[start[0]]}{start[1]}")
+        target = self.board[end[0]][end[1]]
+        if isinstance(piece, King) and isinstance(target, Rook) and target.team == piece.team:
+            end = (7 if end[0] == 8 else 3, end[1])
+        if promotion is not None and not (isinstance(piece, Pawn) and end[1] in (1, 8)):
+            raise ValueError("Only a pawn reaching the last rank can be promoted")
+        return Move(piece, end[0], end[1], promotion)
+
+    def pseudo_legal_moves(self, team=None):
+        """
+        Generates every move a team's pieces can make, without checking if it leaves their own king in check.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team to generate moves for, defaults to the team whose turn it is.
+
+        Returns:
+            A generator of Move tuples. Only squares each piece can actually reach are produced, a pawn reaching the
+            last rank produces one move per promotion choice, and castling is included when it is allowed.
+        """
+        if team is None:
+            team = WHITE if self.white_turn else BLACK
+        for piece in self.team_pieces(team):
+            yield from self.piece_moves(piece)
+        yield from self.castling_moves(team)
+
+    def legal_moves(self, team=None):
+        """
+        Generates every legal move for a team.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team to generate moves for, defaults to the team whose turn it is.
+
+        Returns:
+            A generator of Move tuples that do not leave the team's king in check. Moves are checked one at a time
+            as they are asked for, so stopping after the first one only pays for that one. In check only the moves
+            that get out of it are generated (see evasion_moves).
+        """
+        if team is None:
+            team = self.team_to_move()
+        if self.in_check(team):
+            yield from self.evasion_moves(team)
+            return
+        for move in self.pseudo_legal_moves(team):
+            if self.is_legal(move):
+                yield move
+
+    def evasion_moves(self, team):
+        """
+        Generates the moves that get a team's King out of check.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team in check.
+
+        Returns:
+            A generator of legal Move tuples. The checking pieces and the pinned pieces are found once, then only
+            King moves to safe squares, captures of the checking piece and moves onto the squares between it and
+            the King are produced, by pieces that are not pinned. In double check only the King can move.
+        """
+        index = TEAM_INDEX[team]
+        bitboards = self.bitboards
+        king_file, king_rank = self.white_king_pos if team == WHITE else self.black_king_pos
+        king_square = square_index(king_file, king_rank)
+        king = self.board[king_file][king_rank]
+        if team == self.team_to_move():
+            info = self.check_info()
+            checkers, pinned = info.checkers, info.pinned
+        else:
+            checkers = bitboards.attackers(1 - index, king_square)
+            pinned = bitboards.pinned(index, king_square)
+
+        # The King is lifted off the board, so stepping straight back along a checking line is seen as attacked
+        occupied = bitboards.occupied & ~(1 << king_square)
+        for square in iter_squares(KING_TARGETS[king_square] & ~bitboards.occupied_by[index]):
+            if not bitboards.is_attacked(1 - index, square, occupied):
+                file, rank = square_file_rank(square)
+                yield Move(king, file, rank)
+        if checkers & (checkers - 1):
+            return
+
+        checker = checkers.bit_length() - 1
+        targets = checkers | BETWEEN[king_square][checker]
+        passant = self.passant_pawn
+        if passant is not None and square_index(passant.file, passant.rank) == checker:
+            # A checking pawn that just moved two squares can also be taken en passant, behind where it stands
+            targets |= 1 << square_index(passant.file, passant.rank + (1 if team == WHITE else -1))
+        # A pinned piece can never get its King out of check, so only the others are tried
+        for piece in self.team_pieces(team):
+            file = piece.file
+            if piece is king or pinned >> square_index(file, piece.rank) & 1:
+                continue
+            pawn = isinstance(piece, Pawn)
+            for target in iter_squares(piece.targets() & targets):
+                target_file, target_rank = square_file_rank(target)
+                if pawn and target_file != file and not bitboards.occupied >> target & 1:
+                    # En passant takes a pawn from another square, so it is checked in full
+                    if self.is_legal(Move(piece, target_file, target_rank)):
+                        yield Move(piece, target_file, target_rank)
+                elif pawn and target_rank in (1, 8):
+                    for choice in PROMOTIONS:
+                        yield Move(piece, target_file, target_rank, choice)
+                else:
+                    yield Move(piece, target_file, target_rank)
+
+    def piece_moves(self, piece: Piece):
+        """
+        Generates the moves of a single piece, without checking if they leave its king in check.
+
+        Args:
+            self: The instance of the Game class.
+            piece: The Piece object to generate moves for.
+
+        Returns:
+            A generator of Move tuples, one per promotion choice for a pawn reaching the last rank. Castling is
+            produced by castling_moves instead.
+        """
+        promoting = isinstance(piece, Pawn) and piece.rank == (7 if piece.team == WHITE else 2)
+        for square in iter_squares(piece.targets()):
+            file, rank = square_file_rank(square)
+            if promoting:
+                for choice in PROMOTIONS:
+                    yield Move(piece, file, rank, choice)
+            else:
+                yield Move(piece, file, rank)
+
+    def castling_moves(self, team):
+        """
+        Generates the castling moves a team is allowed to make.
+
+        Args:
+            self: The instance of the Game class.
+            team: The team to generate castling moves for.
+
+        Returns:
+            A generator of Move tuples moving the King two files towards a Rook. Neither piece can have moved, the
+            squares between them must be empty, and the King cannot be in check or pass through or land on an
+            attacked square.
+        """
+        rank = 1 if team == WHITE else 8
+        king = self.board[5][rank]
+        if not (isinstance(king, King) and king.team == team and king.first_move):
+            return
+        other_team = BLACK if team == WHITE else WHITE
+        if self.is_checked(other_team, 5, rank):
+            return
+        # (rook file, king destination, squares that must be empty, squares the king crosses)
+        for rook_file, king_file, empty, crossed in ((8, 7, (6, 7), (6, 7)), (1, 3, (2, 3, 4), (4, 3))):
+            rook = self.board[rook_file][rank]
+            if not (isinstance(rook, Rook) and rook.team == team and rook.first_move):
+                continue
+            if any(self.is_occupied(file, rank) for file in empty):
+                continue
+            if any(self.is_checked(other_team, file, rank) for file in crossed):
+                continue
+            yield Move(king, king_file, rank)
+
+    def is_legal(self, move: Move):
+        """
+        Checks that a move does not leave the moving team's king in check.
+
+        Args:
+            self: The instance of the Game class.
+            move: The Move to test, which should come from one of the move generators or pass can_move_to.
+
+        Returns:
+            True if the move is legal, False otherwise. For the team whose turn it is this is a few mask tests
+            against the position's checking and pinned pieces (see check_info): a King cannot move onto an attacked
+            square, in check a move must take the checking piece or block it, and a pinned piece can only move
+            along its pin. En passant, castling and moves for the other team are made and taken straight back.
+        """
+        piece = move.piece
+        if piece.team == self.team_to_move() and not (isinstance(piece, Pawn) and move.file != piece.file and
+                                                      not self.is_occupied(move.file, move.rank)):
+            info = self.check_info()
+            start = square_index(piece.file, piece.rank)
+            target = square_index(move.file, move.rank)
+            if isinstance(piece, King):
+                if abs(move.file - piece.file) == 2:
+                    return move in self.castling_moves(piece.team)
+                # The King is lifted off the board so it cannot hide behind itself on a checking line
+                return not self.bitboards.is_attacked(1 - TEAM_INDEX[piece.team], target,
+                                                      self.bitboards.occupied & ~(1 << start))
+            checkers = info.checkers
+            if checkers:
+                if checkers & (checkers - 1):
+                    return False
+                if not (checkers | BETWEEN[info.king_square][checkers.bit_length() - 1]) >> target & 1:
+                    return False
+            if info.pinned >> start & 1:
+                return bool(LINE[info.king_square][start] >> target & 1)
+            return True
+        record = self.make_move(piece, move.file, move.rank, move.promotion)
+        # Read the king position after the move in case the king itself moved
+        king_pos = self.white_king_pos if piece.team == WHITE else self.black_king_pos
+        safe = not self.is_checked(BLACK if piece.team == WHITE else WHITE, king_pos[0], king_pos[1])
+        self.unmake_move(record)
+        return safe
+
+    def make_move(self, piece: Piece, file, rank, promotion=None):
+        """
+        Makes a move on the board that can be taken back exactly with unmake_move.
+
+        Args:
+            self: The instance of the Game class.
+            piece: The Piece object to be moved.
+            file: The target file (column) coordinate of the move.
+            rank: The target rank (row) coordinate of the move.
+            promotion: Optional character (Q, B, R, K) for the piece a pawn becomes on the last rank.
+
+        Returns:
+            A MoveRecord holding the captured square, the piece's previous first_move flag, the previous king
+            position, the promoted piece (if any), the pawn that could be taken en passant before the move, and the
+            position key, halfmove clock and evaluation totals to restore.
+            Moving a King two files also moves its Rook (castling), a Pawn moving diagonally onto an empty square
+            takes the pawn beside it (en passant), and the turn is handed to the other team.
+        """
+        from_file = piece.file
+        from_rank = piece.rank
+        captured = self.board[file][rank]
+        first_move = piece.first_move
+        king_pos = self.white_king_pos if piece.team == WHITE else self.black_king_pos
+        passant = self.passant_pawn
+        key = self.key
+        halfmove_clock = self.halfmove_clock
+        evaluation = (self.mg, self.eg, self.phase)
+        # Only moving a King or Rook, or taking a Rook, can change the castling rights
+        rights = self.castling_rights() if isinstance(piece, (King, Rook)) or isinstance(captured, Rook) else None
+        # Read before the move changes the pawns beside it
+        passant_file = self.passant_file()
+
+        if isinstance(piece, Pawn) and file != from_file and not isinstance(captured, Piece):
+            # En passant, the captured pawn is beside us rather than on the target square
+            captured = self.board[file][from_rank]
+            self.board[file][from_rank] = EMPTY
+        if isinstance(captured, Piece):
+            square = square_index(captured.file, captured.rank)
+            self.bitboards.remove(captured.code, square)
+            del self.piece_index[captured.code][square]
+            self.key ^= PIECE_KEYS[captured.code][square]
+            self.mg -= MG_TABLES[captured.code][square]
+            self.eg -= EG_TABLES[captured.code][square]
+            self.phase -= PHASES[captured.code]
+        self.relocate(piece, file, rank)
+        piece.first_move = False
+        self.halfmove_clock = 0 if isinstance(piece, Pawn) or isinstance(captured, Piece) else halfmove_clock + 1
+
+        # Only the pawn that has just moved two squares can be taken en passant
+        if passant is not None:
+            passant.passantable = False
+            self.passant_pawn = None
+        if passant_file is not None:
+            self.key ^= PASSANT_KEYS[passant_file - 1]
+        if isinstance(piece, Pawn) and abs(rank - from_rank) == 2:
+            piece.passantable = True
+            self.passant_pawn = piece
+            if self.passant_file() is not None:
+                self.key ^= PASSANT_KEYS[file - 1]
+
+        if isinstance(piece, King):
+            if piece.team == WHITE:
+                self.white_king_pos = (file, rank)
+            else:
+                self.black_king_pos = (file, rank)
+            # Castling, the rook jumps to the other side of the king
+            if abs(file - from_file) == 2:
+                rook_from, rook_to = (1, 4) if file < from_file else (8, 6)
+                self.relocate(self.board[rook_from][rank], rook_to, rank)
+
+        promoted = None
+        if promotion is not None and isinstance(piece, Pawn) and rank in (1, 8):
+            promoted = PROMOTIONS[promotion.upper()](self, file, rank, piece.team)
+            promoted.first_move = False
+            self.board[file][rank] = promoted
+            square = square_index(file, rank)
+            self.bitboards.remove(piece.code, square)
+            self.bitboards.put(promoted.code, square)
+            del self.piece_index[piece.code][square]
+            self.piece_index[promoted.code][square] = promoted
+            self.key ^= PIECE_KEYS[piece.code][square] ^ PIECE_KEYS[promoted.code][square]
+            self.mg += MG_TABLES[promoted.code][square] - MG_TABLES[piece.code][square]
+            self.eg += EG_TABLES[promoted.code][square] - EG_TABLES[piece.code][square]
+            self.phase += PHASES[promoted.code]
+
+        if rights is not None:
+            self.key ^= CASTLING_KEYS[rights] ^ CASTLING_KEYS[self.castling_rights()]
+        self.white_turn = not self.white_turn
+        self.key ^= SIDE_KEY
+        self.turn_number += 1
+        if self.debug:
+            self.check_key()
+            self.check_evaluation()
+        return MoveRecord(piece, from_file, from_rank, file, rank, captured, first_move, king_pos, promoted, passant, key,
+                          halfmove_clock, evaluation)
+
+    def unmake_move(self, record: MoveRecord):
+        """
+        Takes back a move made with make_move.
+
+        Args:
+            self: The instance of the Game class.
+            record: The MoveRecord returned by make_move. Moves must be taken back in the reverse order they were made.
+
+        Returns:
+            Restores the moved piece, any captured piece, the first_move flag, the king position, the en passant
+            pawn, the halfmove clock, the evaluation and the turn.
+        """
+        piece = record.piece
+        self.white_turn = not self.white_turn
+        self.turn_number -= 1
+        self.halfmove_clock = record.halfmove_clock
+
+        if self.passant_pawn is not None:
+            self.passant_pawn.passantable = False
+        self.passant_pawn = record.passant
+        if record.passant is not None:
+            record.passant.passantable = True
+
+        if record.promoted is not None:
+            square = square_index(record.to_file, record.to_rank)
+            self.bitboards.remove(record.promoted.code, square)
+            self.bitboards.put(piece.code, square)
+            del self.piece_index[record.promoted.code][square]
+            self.piece_index[piece.code][square] = piece
+
+        if isinstance(piece, King):
+            if piece.team == WHITE:
+                self.white_king_pos = record.king_pos
+            else:
+                self.black_king_pos = record.king_pos
+            if abs(record.to_file - record.from_file) == 2:
+                rook_from, rook_to = (1, 4) if record.to_file < record.from_file else (8, 6)
+                rook = self.board[rook_to][record.to_rank]
+                self.relocate(rook, rook_from, record.to_rank)
+                rook.first_move = True
+
+        # Put the piece back where it came from and whatever it captured back where that was
+        self.relocate(piece, record.from_file, record.from_rank)
+        piece.first_move = record.first_move
+        captured = record.captured
+        if isinstance(captured, Piece):
+            self.board[captured.file][captured.rank] = captured
+            self.bitboards.put(captured.code, square_index(captured.file, captured.rank))
+            self.piece_index[captured.code][square_index(captured.file, captured.rank)] = captured
+        else:
+            self.board[record.to_file][record.to_rank] = captured
+        self.key = record.key
+        self.mg, self.eg, self.phase = record.evaluation
+
+    def push_move(self, piece: Piece, file, rank, promotion=None):
+        """
+        Plays a move as part of the game, so it can be taken back with takeback.
+
+        Args:
+            self: The instance of the Game class.
+            piece: The Piece object to be moved.
+            file: The target file (column) coordinate of the move.
+            rank: The target rank (row) coordinate of the move.
+            promotion: Optional character (Q, B, R, K) for the piece a pawn becomes on the last rank.
+
+        Returns:
+            The MoveRecord of make_move, which is added to the history. The moves that were taken back can no longer
+            be played again with redo.
+        """
+        record = self.make_move(piece, file, rank, promotion)
+        self.history.append(record)
+        self.future.clear()
+        return record
+
+    def takeback(self, plies=1):
+        """
+        Takes back the last moves played with push_move (or through a GameSession).
+
+        Args:
+            self: The instance of the Game class.
+            plies: How many moves to take back.
+
+        Returns:
+            A list of the Moves taken back, latest first, shorter than plies if the history runs out. Each is undone
+            with unmake_move from its MoveRecord, which puts back the king positions, the first_move flags the
+            castling rights come from, promoted pawns, captured pieces and the turn number. The record is kept on
+            future so redo can play the move again.
+        """
+        taken = []
+        for ply in range(min(plies, len(self.history))):
+            record = self.history.pop()
+            self.unmake_move(record)
+            self.future.append(record)
+            taken.append(recorded_move(record))
+        return taken
+
+    def redo(self, plies=1):
+        """
+        Plays again the last moves taken back.
+
+        Args:
+            self: The instance of the Game class.
+            plies: How many moves to play again.
+
+        Returns:
+            A list of the Moves played, in the order they were played, shorter than plies if there are not that
+            many to redo.
+        """
+        played = []
+        for ply in range(min(plies, len(self.future))):
+            move = recorded_move(self.future.pop())
+            self.history.append(self.make_move(*move))
+            played.append(move)
+        return played
+
+    def relocate(self, piece: Piece, file, rank):
+        """
+        Places a piece on the given file and rank, leaving an empty square where it was.
+
+        Args:
+            self: The instance of the Game class.
+            piece: The Piece object to be placed.
+            file: The target file (column) coordinate.
+            rank: The target rank (row) coordinate.
+
+        Returns:
+            Updates the board and the piece's position. Whatever was on the target square is overwritten, so
+            callers that need it (captures) must keep hold of it first.
+        """
+        start = square_index(piece.file, piece.rank)
+        target = square_index(file, rank)
+        self.board[piece.file][piece.rank] = EMPTY
+        self.bitboards.remove(piece.code, start)
+        piece.file = file
+        piece.rank = rank
+        self.board[file][rank] = piece
+        self.bitboards.put(piece.code, target)
+        index = self.piece_index[piece.code]
+        del index[start]
+        index[target] = piece
+        self.key ^= PIECE_KEYS[piece.code][start] ^ PIECE_KEYS[piece.code][target]
+        self.mg += MG_TABLES[piece.code][target] - MG_TABLES[piece.code][start]
+        self.eg += EG_TABLES[piece.code][target] - EG_TABLES[piece.code][start]
 
     def promote(self, piece: Piece, choice):
         """
@@ -761,21 +1776,31 @@ class Chess():
             choice: The character representing the chosen piece (Q for Queen, B for Bishop, R for Rook, K for Knight).
 
         Returns:
-            Replaces the Pawn object on the board with the chosen piece. Prints a message indicating the successful promotion.
+            Replaces the Pawn object on the board with the chosen piece. Returns a message announcing the successful promotion.
         """
         if choice.upper() == "Q":
-            self.board[piece.file][piece.rank] = Queen(piece.game, piece.file, piece.rank, piece.square_colored, piece.team)
+            self.board[piece.file][piece.rank] = Queen(piece.game, piece.file, piece.rank, piece.team)
             msg = "Queen"
         elif choice.upper() == "B":
-            self.board[piece.file][piece.rank] = Bishop(piece.game, piece.file, piece.rank, piece.square_colored, piece.team)
+            self.board[piece.file][piece.rank] = Bishop(piece.game, piece.file, piece.rank, piece.team)
             msg = "Bishop"
         elif choice.upper() == "R":
-            self.board[piece.file][piece.rank] = Rook(piece.game, piece.file, piece.rank, piece.square_colored, piece.team)
+            self.board[piece.file][piece.rank] = Rook(piece.game, piece.file, piece.rank, piece.team)
             msg = "Rook"
         else:
-            self.board[piece.file][piece.rank] = Knight(piece.game, piece.file, piece.rank, piece.square_colored, piece.team)
+            self.board[piece.file][piece.rank] = Knight(piece.game, piece.file, piece.rank, piece.team)
             msg = "Knight"
-        print(f"Pawn at {I_FILES[piece.file]}{piece.rank} promoted to a {msg}!")
+        square = square_index(piece.file, piece.rank)
+        promoted = self.board[piece.file][piece.rank]
+        self.bitboards.remove(piece.code, square)
+        self.bitboards.put(promoted.code, square)
+        del self.piece_index[piece.code][square]
+        self.piece_index[promoted.code][square] = promoted
+        self.key ^= PIECE_KEYS[piece.code][square] ^ PIECE_KEYS[promoted.code][square]
+        self.mg += MG_TABLES[promoted.code][square] - MG_TABLES[piece.code][square]
+        self.eg += EG_TABLES[promoted.code][square] - EG_TABLES[piece.code][square]
+        self.phase += PHASES[promoted.code]
+        return f"Pawn at {I_FILES[piece.file]}{piece.rank} promoted to a {msg}!"
     
     def winner(self, team):
         """
@@ -788,7 +1813,8 @@ class Chess():
         Returns:
             A string announcing the winner and the number of moves played.
         """
-        return (f"{team} is the winner after {self.turn_number} moves!")
+        # turn_number has already moved on past the winning move
+        return (f"{team} is the winner after {self.turn_number - 1} moves!")
 
             
     def make_board(self):
@@ -808,46 +1834,462 @@ class Chess():
         board = [[None for i in range(0,9)] for j in range(0,9)]
 
         # Build white's back row
-        board [1][1] = Rook(self, 1, 1, True, WHITE)
-        board [2][1] = Knight(self, 2, 1, False, WHITE)
-        board [3][1] = Bishop(self, 3, 1, True, WHITE)
-        board [4][1] = Queen(self, 4, 1, False, WHITE)
-        board [5][1] = King(self, 5, 1, True, WHITE)
-        board [6][1] = Bishop(self, 6, 1, False, WHITE)
-        board [7][1] = Knight(self, 7, 1, True, WHITE)
-        board [8][1] = Rook(self, 8, 1, False, WHITE)
+        board [1][1] = Rook(self, 1, 1, WHITE)
+        board [2][1] = Knight(self, 2, 1, WHITE)
+        board [3][1] = Bishop(self, 3, 1, WHITE)
+        board [4][1] = Queen(self, 4, 1, WHITE)
+        board [5][1] = King(self, 5, 1, WHITE)
+        board [6][1] = Bishop(self, 6, 1, WHITE)
+        board [7][1] = Knight(self, 7, 1, WHITE)
+        board [8][1] = Rook(self, 8, 1, WHITE)
 
         # Build white's pawn row
-        color = False
         for i in range(1,9):
-            board[i][2] = Pawn(self, i, 2, color, WHITE)
-            color = not color
+            board[i][2] = Pawn(self, i, 2, WHITE)
         
-        # Build the empty middle section
-        for rank in range (3, 8):
-            color = not color
+        # Build the empty middle section, every empty square is the shared EMPTY square
+        for rank in range (3, 7):
             for file in range(1, 9):
-                board[file][rank] = Square(self, file, rank, color)
-                color = not color
+                board[file][rank] = EMPTY
         
         # Build black's pawn row
-        color = True
         for i in range(1,9):
-            board[i][7] = Pawn(self, i, 7, color, BLACK)
-            color = not color
+            board[i][7] = Pawn(self, i, 7, BLACK)
 
         # Build black's back row
-        board [1][8] = Rook(self, 1, 8, False, BLACK)
-        board [2][8] = Knight(self, 2, 8, True, BLACK)
-        board [3][8] = Bishop(self, 3, 8, False, BLACK)
-        board [4][8] = Queen(self, 4, 8, True, BLACK)
-        board [5][8] = King(self, 5, 8, False, BLACK)
-        board [6][8] = Bishop(self, 6, 8, True  , BLACK)
-        board [7][8] = Knight(self, 7, 8, False, BLACK)
-        board [8][8] = Rook(self, 8, 8, True, BLACK)
+        board [1][8] = Rook(self, 1, 8, BLACK)
+        board [2][8] = Knight(self, 2, 8, BLACK)
+        board [3][8] = Bishop(self, 3, 8, BLACK)
+        board [4][8] = Queen(self, 4, 8, BLACK)
+        board [5][8] = King(self, 5, 8, BLACK)
+        board [6][8] = Bishop(self, 6, 8, BLACK)
+        board [7][8] = Knight(self, 7, 8, BLACK)
+        board [8][8] = Rook(self, 8, 8, BLACK)
 
         return board
 
+    def load_fen(self, fen):
+        """
+        Sets the game up from a FEN string, replacing the position it had.
+
+        Args:
+            self: The instance of the Game class.
+            fen: The position in Forsyth-Edwards Notation. The halfmove clock and fullmove number may be left off,
+                they then default to 0 and 1.
+
+        Returns:
+            Builds the board directly from the placement field. Castling rights become the first_move flags of the
+            Kings and Rooks, the en passant square marks the pawn that just moved as passantable, and the move
+            counters set halfmove_clock and turn_number. Raises ValueError if the FEN is malformed.
+        """
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError(f"FEN must have 4 or 6 fields: {fen!r}")
+        placement, side, castling, passant = fields[:4]
+        rows = placement.split("/")
+        if len(rows) != 8 or side not in ("w", "b"):
+            raise ValueError(f"Malformed FEN: {fen!r}")
+
+        # The bitboards and piece index are filled in as the pieces are placed rather than rebuilt afterwards
+        board = [[None] * 9] + [[None] + [EMPTY] * 8 for file in range(8)]
+        bitboards = Bitboards()
+        piece_index = [{} for code in range(12)]
+        kings = {}
+        for row, pieces in enumerate(rows):
+            rank = 8 - row
+            file = 1
+            for char in pieces:
+                if char in "12345678":
+                    file += int(char)
+                    continue
+                if char not in FEN_PIECES or file > 8:
+                    raise ValueError(f"Malformed FEN: {fen!r}")
+                kind, team = FEN_PIECES[char]
+                piece = kind(self, file, rank, team)
+                # Only pawns still on their starting rank can move two squares, castling rights are set below
+                piece.first_move = kind is Pawn and rank == (2 if team == WHITE else 7)
+                if kind is King:
+                    if team in kings:
+                        raise ValueError(f"FEN has more than one {team} King: {fen!r}")
+                    kings[team] = (file, rank)
+                board[file][rank] = piece
+                bitboards.put(piece.code, square_index(file, rank))
+                piece_index[piece.code][square_index(file, rank)] = piece
+                file += 1
+            if file != 9:
+                raise ValueError(f"Malformed FEN: {fen!r}")
+        if len(kings) != 2:
+            raise ValueError(f"FEN must have a King for each team: {fen!r}")
+
+        # Castling rights mean neither the King nor that Rook has moved
+        if castling != "-":
+            for char in castling:
+                if char not in FEN_CASTLING:
+                    raise ValueError(f"Malformed FEN castling rights: {castling!r}")
+                file, rank = FEN_CASTLING[char]
+                king, rook = board[5][rank], board[file][rank]
+                team = WHITE if char.isupper() else BLACK
+                if not (isinstance(king, King) and king.team == team and isinstance(rook, Rook) and rook.team == team):
+                    raise ValueError(f"FEN castling right {char} without its King and Rook: {fen!r}")
+                king.first_move = True
+                rook.first_move = True
+
+        # The en passant square is the one the pawn skipped over, the pawn itself is just past it
+        passant_pawn = None
+        if passant != "-":
+            if len(passant) != 2 or passant[0].upper() not in FILES or passant[1] != ("6" if side == "w" else "3"):
+                raise ValueError(f"Malformed FEN en passant square: {passant!r}")
+            passant_pawn = board[FILES[passant[0].upper()]][5 if side == "w" else 4]
+            if not (isinstance(passant_pawn, Pawn) and passant_pawn.team == (BLACK if side == "w" else WHITE)):
+                raise ValueError(f"FEN en passant square {passant} without a pawn that just moved: {fen!r}")
+            passant_pawn.passantable = True
+
+        halfmove_clock, fullmove = (int(fields[4]), int(fields[5])) if len(fields) == 6 else (0, 1)
+        self.board = board
+        self.white_turn = side == "w"
+        self.turn_number = 2 * fullmove - (1 if self.white_turn else 0)
+        self.halfmove_clock = halfmove_clock
+        self.white_king_pos = kings[WHITE]
+        self.black_king_pos = kings[BLACK]
+        self.passant_pawn = passant_pawn
+        self.bitboards = bitboards
+        self.piece_index = piece_index
+        self.key = self.compute_key()
+        self.mg, self.eg, self.phase = full_eval(bitboards)
+        # The moves of the old position cannot be taken back in the new one
+        self.history = []
+        self.future = []
+
+    def to_fen(self):
+        """
+        Describes the position as a FEN string.
+
+        Args:
+            self: The instance of the Game class.
+
+        Returns:
+            The position in Forsyth-Edwards Notation, with castling rights taken from the first_move flags, the
+            en passant square behind the passantable pawn (if any), the halfmove clock and the fullmove number.
+        """
+        rows = []
+        for rank in range(8, 0, -1):
+            row = ""
+            empty = 0
+            for file in range(1, 9):
+                code = self.bitboards.piece_at(square_index(file, rank))
+                if code < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += FEN_LETTERS[code]
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        rights = self.castling_rights()
+        bits = (WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)
+        castling = "".join(char for char, right in zip(FEN_CASTLING, bits) if rights & right) or "-"
+        passant = "-"
+        if self.passant_pawn is not None:
+            pawn = self.passant_pawn
+            passant = f"{I_FILES[pawn.file].lower()}{3 if pawn.team == WHITE else 6}"
+        side = "w" if self.white_turn else "b"
+        return f"{'/'.join(rows)} {side} {castling} {passant} {self.halfmove_clock} {(self.turn_number + 1) // 2}"
+
+# How each piece code is drawn by Chess.__str__, in the same order as the bitboards
+GLYPHS = [" ♟  ", " ♞  ", " ♝  ", " ♜  ", " ♛  ", " ♚  ",
+          " ♙  ", " ♘  ", " ♗  ", " ♖  ", " ♕  ", " ♔  "]
+
+# FEN letter of each piece code, and the piece class and team of each letter
+FEN_LETTERS = "PNBRQKpnbrqk"
+FEN_PIECES = {letter: (kind, team) for letters, team in (("PNBRQK", WHITE), ("pnbrqk", BLACK))
+              for letter, kind in zip(letters, (Pawn, Knight, Bishop, Rook, Queen, King))}
+# Where the Rook of each FEN castling right starts, in the order rights are written
+FEN_CASTLING = {"K": (8, 1), "Q": (1, 1), "k": (8, 8), "q": (1, 8)}
+
+# Maps a promotion choice onto the piece a pawn becomes (K is the Knight)
+PROMOTIONS = {"Q": Queen, "B": Bishop, "R": Rook, "K": Knight}
+PROMOTION_LETTERS = {j:i for i,j in PROMOTIONS.items()}
+
+def recorded_move(record: MoveRecord):
+    """
+    Finds the move a MoveRecord was made for.
+
+    Args:
+        record: A MoveRecord from make_move.
+
+    Returns:
+        The Move, with the promotion letter of the piece a pawn became.
+    """
+    promotion = PROMOTION_LETTERS[type(record.promoted)] if record.promoted is not None else None
+    return Move(record.piece, record.to_file, record.to_rank, promotion)
+# The promotion bits of an encoded move (the same order as Polyglot opening books)
+PROMOTION_CODES = {"K": 1, "B": 2, "R": 3, "Q": 4}
+PROMOTION_CHOICES = {j:i for i,j in PROMOTION_CODES.items()}
+
+def encode_move(move: Move):
+    """
+    Packs a move into 16 bits: the target square, the start square and the promotion choice.
+
+    Args:
+        move: A Move that has not been made yet (its piece is still on the start square).
+
+    Returns:
+        The target square number in bits 0-5, the start square number in bits 6-11 and the promotion in
+        bits 12-14 (0 for none). Chess.decode_move turns it back into a Move.
+    """
+    code = square_index(move.file, move.rank) | square_index(move.piece.file, move.piece.rank) << 6
+    if move.promotion is not None:
+        code |= PROMOTION_CODES[move.promotion.upper()] << 12
+    return code
+
+# Piece letters used by Standard Algebraic Notation (N is the Knight, unlike the promotion choices)
+SAN_LETTERS = {Knight: "N", Bishop: "B", Rook: "R", Queen: "Q", King: "K"}
+SAN_PIECES = {j:i for i,j in SAN_LETTERS.items()}
+# SAN and coordinate promotion letters onto the game's promotion choices (both N and K are taken as the Knight)
+SAN_PROMOTIONS = {"Q": "Q", "B": "B", "R": "R", "N": "K", "K": "K"}
+COORDINATE_MOVE = re.compile(r"^([a-hA-H][1-8])\s*[-\s]?\s*([a-hA-H][1-8])\s*=?([qrbnkQRBNK])?$")
+SAN_MOVE = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+
+# Outcomes of GameSession.play_move
+OK = "ok"
+CHECK = "check"
+CHECKMATE = "checkmate"
+ILLEGAL = "illegal"
+INVALID = "invalid"
+PROMOTION_REQUIRED = "promotion required"
+GAME_OVER = "game over"
+STALEMATE = "stalemate"
+
+STALEMATE_MESSAGE = "The game is a draw by stalemate!"
+
+# What happened when a move was submitted to a GameSession
+MoveResult = namedtuple("MoveResult", ["status", "move", "san", "message", "check", "checkmate", "winner",
+                                       "stalemate", "start"],
+                        defaults=[None, None, "", False, False, None, False, None])
+
+
+class GameSession():
+    """
+    Drives a game of chess with moves given as data, without any input or printing, so games can be played or
+    replayed by other code. Chess.play is the interactive front end built on top of it.
+    """
+
+    def __init__(self, game=None, log=None):
+        """
+        Starts a session.
+
+        Args:
+            self: The instance of the GameSession object.
+            game: The Chess game to play, a new game in the starting position if not given.
+            log: Optional gamelog.GameLog every move played is recorded in, from the game's current position.
+        """
+        self.game = game if game is not None else Chess()
+        self.winner = None
+        self.draw = False
+        self.moves = [] # the SAN of every move played
+        # (san, winner, draw, MoveRecord) of each move taken back, latest last, for redo
+        self.undone = []
+        # The game's MoveRecord of each move in moves, to tell them from moves made on the game outside the session
+        self.records = []
+        # A move played without finding out if it ended the game: (move, san, message, check, start) until finish_move
+        self.unfinished = None
+        self.log = log
+        if log is not None:
+            log.begin(self)
+
+    @property
+    def over(self):
+        return self.winner is not None or self.draw
+
+    def legal_moves(self):
+        """
+        Lists the moves the team whose turn it is can make.
+
+        Args:
+            self: The instance of the GameSession object.
+
+        Returns:
+            A list of the legal moves written in SAN.
+        """
+        return [self.game.san(move) for move in self.game.legal_moves()]
+
+    def play_move(self, move, promotion=None, detect_end=True):
+        """
+        Checks and plays one move for the team whose turn it is.
+
+        Args:
+            self: The instance of the GameSession object.
+            move: A string in coordinates (e2e4, e7e8q) or SAN (Nf3, O-O), a ((file, rank), (file, rank)) pair of
+                squares, or a Move from the game's move generators.
+            promotion: The piece (Q, B, R, K) a pawn reaching the last rank becomes, if the move does not say. It is
+                ignored for any other move.
+            detect_end: False to leave out the checkmate and stalemate tests, so they can be run elsewhere (for
+                example in another process) and handed to finish_move. Until then no other move can be played.
+
+        Returns:
+            A MoveResult. Its status is OK, CHECK, CHECKMATE or STALEMATE when the move was played, and ILLEGAL,
+            INVALID, PROMOTION_REQUIRED or GAME_OVER when it was not (the message says why). The game is only changed
+            when the move is played, and then the result's start is the (file, rank) the piece moved from. Without
+            detect_end a played move's status is only OK or CHECK, and finish_move gives the final result.
+        """
+        game = self.game
+        if self.unfinished is not None:
+            return MoveResult(INVALID, message="The last move has not been finished yet")
+        if self.over:
+            return MoveResult(GAME_OVER, message=STALEMATE_MESSAGE if self.draw else game.winner(self.winner))
+        try:
+            if isinstance(move, Move):
+                parsed = move
+            elif isinstance(move, str):
+                parsed = game.parse_move(move)
+            else:
+                parsed = game.coordinate_move(move[0], move[1])
+        except ValueError as e:
+            return MoveResult(INVALID, message=f"Invalid input, try again! {e}")
+        if parsed is None:
+            return MoveResult(ILLEGAL, message=f"{move} is not a legal move, try again!")
+
+        piece = parsed.piece
+        promoting = isinstance(piece, Pawn) and parsed.rank in (1, 8)
+        if promotion is not None and parsed.promotion is None and promoting:
+            parsed = parsed._replace(promotion=promotion.upper())
+        if parsed.promotion is not None and not promoting:
+            return MoveResult(INVALID, parsed, message="Only a pawn reaching the last rank can be promoted, try again!")
+
+        piece_file, piece_rank = piece.file, piece.rank
+        start = f"{I_FILES[piece.file]}{piece.rank}"
+        castling = isinstance(piece, King) and abs(parsed.file - piece.file) == 2
+        if castling:
+            if parsed not in game.castling_moves(piece.team):
+                return MoveResult(ILLEGAL, parsed, message="Cannot castle!")
+        elif not piece.targets() >> square_index(parsed.file, parsed.rank) & 1:
+            return MoveResult(ILLEGAL, parsed, message=f"{piece.__class__.__name__} at {start} cannot move to {I_FILES[parsed.file]}{parsed.rank}, try again!")
+        if promoting:
+            if parsed.promotion is None:
+                return MoveResult(PROMOTION_REQUIRED, parsed, message="Pawn promotion! Pick which piece (Q, B, R, K) you would like")
+            if parsed.promotion.upper() not in PROMOTIONS:
+                return MoveResult(INVALID, parsed, message="Invalid choice! Try again")
+        if not game.is_legal(parsed):
+            return MoveResult(ILLEGAL, parsed, message="Cannot do this move. Protect your king!")
+
+        san = game.san(parsed, suffix=False)
+        if castling:
+            game.push_move(*parsed)
+            message = f"{piece.team} castled!"
+        else:
+            message = piece.move_to(parsed.file, parsed.rank, parsed.promotion)
+
+        other_team = game.team_to_move()
+        king_pos = game.white_king_pos if other_team == WHITE else game.black_king_pos
+        check = game.is_checked(piece.team, king_pos[0], king_pos[1])
+        self.unfinished = (parsed, san, message, check, (piece_file, piece_rank))
+        if not detect_end:
+            return MoveResult(CHECK if check else OK, parsed, san + "+" if check else san, message, check,
+                              start=(piece_file, piece_rank))
+        return self.finish_move(check and game.is_checkmate(other_team), not check and game.is_stalemate(other_team))
+
+    def finish_move(self, checkmate, stalemate):
+        """
+        Completes the move last played, once it is known whether it ended the game.
+
+        Args:
+            self: The instance of the GameSession object.
+            checkmate: True if the move checkmated the other team.
+            stalemate: True if it left the other team with no legal moves and not in check.
+
+        Returns:
+            The MoveResult of the move, as play_move would have given it. The SAN of the move is added to the
+            session's moves (and to its log), and the session's winner or draw is set if the game is over.
+        """
+        parsed, san, message, check, start = self.unfinished
+        self.unfinished = None
+        piece = parsed.piece
+        other_team = self.game.team_to_move()
+        status = OK
+        if checkmate:
+            self.winner = piece.team
+            status = CHECKMATE
+            san += "#"
+        elif check:
+            status = CHECK
+            san += "+"
+            message += f"\n{other_team}'s king is checked!"
+        elif stalemate:
+            self.draw = True
+            status = STALEMATE
+            message += f"\n{other_team} has no legal moves! {STALEMATE_MESSAGE}"
+        self.moves.append(san)
+        self.undone.clear()
+        self.records.append(self.game.history[-1])
+        result = MoveResult(status, parsed, san, message, check, checkmate, self.winner, stalemate, start)
+        if self.log is not None:
+            self.log.record(self, result)
+            if self.over:
+                self.log.end(self)
+        return result
+
+    def takeback(self, plies=1):
+        """
+        Takes back the last moves of the game.
+
+        Args:
+            self: The instance of the GameSession object.
+            plies: How many moves to take back.
+
+        Returns:
+            The number of moves taken back, fewer than plies if the game has not had that many. Only the session's
+            own moves are taken back, it stops at a move made on the game outside the session so its moves stay in
+            step with the board. A game that was over is played on from the earlier position, and a log starts the
+            game again from there as a new game if the moves taken back have already been written.
+        """
+        if self.unfinished is not None:
+            return 0
+        history = self.game.history
+        taken = 0
+        while taken < plies and self.records and history and history[-1] is self.records[-1]:
+            self.game.takeback()
+            self.undone.append((self.moves.pop(), self.winner, self.draw, self.records.pop()))
+            self.winner = None
+            self.draw = False
+            taken += 1
+        if taken and self.log is not None:
+            self.log.takeback(self, taken)
+        return taken
+
+    def redo(self, plies=1):
+        """
+        Plays again the last moves taken back.
+
+        Args:
+            self: The instance of the GameSession object.
+            plies: How many moves to play again.
+
+        Returns:
+            The number of moves played, fewer than plies if there are not that many to redo. Playing any other move
+            after a takeback forgets the moves taken back, and it stops at a move the game has to redo that the
+            session did not take back.
+        """
+        if self.unfinished is not None:
+            return 0
+        future = self.game.future
+        played = 0
+        while played < plies and self.undone and future and future[-1] is self.undone[-1][3]:
+            move = recorded_move(future[-1])
+            start = (move.piece.file, move.piece.rank)
+            self.game.redo()
+            self.records.append(self.game.history[-1])
+            san, self.winner, self.draw, record = self.undone.pop()
+            self.moves.append(san)
+            played += 1
+            if self.log is not None:
+                self.log.record(self, MoveResult(OK, move, san, start=start))
+                if self.over:
+                    self.log.end(self)
+        return played
+
 # Game initialization
-game = Chess()
-game.play()
\ No newline at end of file
+if __name__ == "__main__":
+    game = Chess()
+    game.play()
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+Attack maps, checks and mobility for many positions at once, using NumPy.
+
+A batch of N positions is an (N, 64) int8 array with one row per position and one column per square (a1 = 0, as on
+the bitboards). Each entry is 1-6 for a White Pawn, Knight, Bishop, Rook, Queen or King, -1 to -6 for the same Black
+pieces and 0 for an empty square. Along with it goes an (N,) bool array saying whether it is White's turn.
+
+The work is done on whole columns of 64 bit masks at once: the leaper shifts of bitboard.py run unchanged on NumPy
+uint64 arrays, and the sliding pieces are flooded seven steps in every position together. Nothing is looped over
+per position except reading the positions in.
+
+NumPy is only needed for this module, the rest of the game runs without it.
+"""
+
+try:
+    import numpy as np
+except ImportError: # only batch work needs NumPy
+    np = None
+
+from bitboard import (WHITE_INDEX, BLACK_INDEX, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, FULL, NOT_FILE_A, NOT_FILE_H,
+                      NOT_FILES_AB, NOT_FILES_GH, north, south, east, west, north_east, north_west, south_east,
+                      south_west, pawn_attacks, knight_attacks, king_attacks, ORTHOGONAL_SHIFTS, DIAGONAL_SHIFTS,
+                      KNIGHT_TARGETS, KING_TARGETS, iter_squares)
+
+# The single knight jumps, so each knight's attacks can be counted separately (the masks drop jumps off the board)
+KNIGHT_JUMPS = ((17, NOT_FILE_A), (15, NOT_FILE_H), (10, NOT_FILES_AB), (6, NOT_FILES_GH),
+                (-17, NOT_FILE_H), (-15, NOT_FILE_A), (-10, NOT_FILES_GH), (-6, NOT_FILES_AB))
+KING_STEPS = (north, south, east, west, north_east, north_west, south_east, south_west)
+
+FEN_VALUES = {"P": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6,
+              "p": -1, "n": -2, "b": -3, "r": -4, "q": -5, "k": -6}
+
+
+def require_numpy():
+    """
+    Checks that NumPy can be used.
+
+    Returns:
+        Raises an ImportError explaining that batch work needs NumPy if it is not installed.
+    """
+    if np is None:
+        raise ImportError("batch evaluation needs NumPy, install it with: pip install numpy")
+
+
+def pack(games):
+    """
+    Packs Chess games into a batch.
+
+    Args:
+        games: An iterable of Chess objects.
+
+    Returns:
+        A (boards, white_to_move) pair, an (N, 64) int8 array and an (N,) bool array. The pieces are read from each
+        game's piece index, so only occupied squares are visited.
+    """
+    require_numpy()
+    games = list(games)
+    boards = np.zeros((len(games), 64), dtype=np.int8)
+    white_to_move = np.zeros(len(games), dtype=bool)
+    for row, game in enumerate(games):
+        for code, pieces in enumerate(game.piece_index):
+            value = code + 1 if code < 6 else 5 - code
+            for square in pieces:
+                boards[row, square] = value
+        white_to_move[row] = game.white_turn
+    return boards, white_to_move
+
+
+def from_fens(fens):
+    """
+    Packs positions given as FEN strings into a batch, without setting up a Chess game for each.
+
+    Args:
+        fens: An iterable of FEN strings. Only the piece placement and side to move fields are read.
+
+    Returns:
+        A (boards, white_to_move) pair as returned by pack. Raises ValueError if a placement cannot be read.
+    """
+    require_numpy()
+    fens = list(fens)
+    boards = np.zeros((len(fens), 64), dtype=np.int8)
+    white_to_move = np.zeros(len(fens), dtype=bool)
+    for row, fen in enumerate(fens):
+        fields = fen.split()
+        ranks = fields[0].split("/")
+        if len(ranks) != 8:
+            raise ValueError(f"Malformed FEN: {fen!r}")
+        for rank, pieces in enumerate(reversed(ranks)):
+            square = rank * 8
+            for char in pieces:
+                if char in "12345678":
+                    square += int(char)
+                elif char in FEN_VALUES and square < rank * 8 + 8:
+                    boards[row, square] = FEN_VALUES[char]
+                    square += 1
+                else:
+                    raise ValueError(f"Malformed FEN: {fen!r}")
+        white_to_move[row] = len(fields) < 2 or fields[1] == "w"
+    return boards, white_to_move
+
+
+def piece_masks(boards):
+    """
+    Turns a batch into bitboards.
+
+    Args:
+        boards: An (N, 64) int8 array of positions.
+
+    Returns:
+        An (N, 12) uint64 array, column n being the bitboard of piece code n (White Pawn = 0 ... Black King = 11)
+        as in bitboard.Bitboards.
+    """
+    require_numpy()
+    bits = np.uint64(1) << np.arange(64, dtype=np.uint64)
+    masks = np.zeros((len(boards), 12), dtype=np.uint64)
+    for code in range(12):
+        value = code + 1 if code < 6 else 5 - code
+        masks[:, code] = np.bitwise_or.reduce(np.where(boards == value, bits, np.uint64(0)), axis=1)
+    return masks
+
+
+def unpack_masks(masks):
+    """
+    Spreads a column of bitboards out into one entry per square.
+
+    Args:
+        masks: An (N,) uint64 array.
+
+    Returns:
+        An (N, 64) bool array, True where the bit of that square is set.
+    """
+    return ((masks[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def slide(sliders, empty, shift):
+    # Floods one direction from every slider of every position, seven steps reach across any board
+    attacks = np.zeros_like(sliders)
+    reach = shift(sliders)
+    for step in range(7):
+        attacks |= reach
+        reach = shift(reach & empty)
+    return attacks
+
+
+def shift_by(masks, step):
+    return masks << np.uint64(step) if step > 0 else masks >> np.uint64(-step)
+
+
+def attack_masks(boards, color, masks=None):
+    """
+    Finds every square attacked by one team in every position of a batch.
+
+    Args:
+        boards: An (N, 64) int8 array of positions.
+        color: WHITE_INDEX or BLACK_INDEX, the attacking team.
+        masks: The piece_masks of the boards, if already worked out.
+
+    Returns:
+        An (N,) uint64 array of attack masks, the same masks Bitboards.attacks gives one position at a time.
+    """
+    require_numpy()
+    if masks is None:
+        masks = piece_masks(boards)
+    base = color * 6
+    empty = ~np.bitwise_or.reduce(masks, axis=1)
+    rooks = masks[:, base + ROOK] | masks[:, base + QUEEN]
+    bishops = masks[:, base + BISHOP] | masks[:, base + QUEEN]
+    attacks = (pawn_attacks(color, masks[:, base + PAWN]) | knight_attacks(masks[:, base + KNIGHT]) |
+               king_attacks(masks[:, base + KING]))
+    for shift in ORTHOGONAL_SHIFTS:
+        attacks |= slide(rooks, empty, shift)
+    for shift in DIAGONAL_SHIFTS:
+        attacks |= slide(bishops, empty, shift)
+    return attacks
+
+
+def attack_maps(boards, color):
+    """
+    Marks the squares one team attacks in every position of a batch.
+
+    Args:
+        boards: An (N, 64) int8 array of positions.
+        color: WHITE_INDEX or BLACK_INDEX, the attacking team.
+
+    Returns:
+        An (N, 64) bool array, True where the square is attacked.
+    """
+    return unpack_masks(attack_masks(boards, color))
+
+
+def attack_counts(boards, color):
+    """
+    Counts how many pieces of one team attack each square in every position of a batch.
+
+    Args:
+        boards: An (N, 64) int8 array of positions.
+        color: WHITE_INDEX or BLACK_INDEX, the attacking team.
+
+    Returns:
+        An (N, 64) uint8 array of attacker counts. Pieces behind another piece on the same line (x-rays) are not
+        counted, the same as Bitboards.attackers.
+    """
+    require_numpy()
+    masks = piece_masks(boards)
+    base = color * 6
+    empty = ~np.bitwise_or.reduce(masks, axis=1)
+    counts = np.zeros((len(boards), 64), dtype=np.uint8)
+    # Each single shift moves every piece a different way, so no square is reached twice by the same shift
+    pawns = masks[:, base + PAWN]
+    pawn_steps = (north_east, north_west) if color == WHITE_INDEX else (south_east, south_west)
+    for shift in pawn_steps:
+        counts += unpack_masks(shift(pawns))
+    knights = masks[:, base + KNIGHT]
+    for step, keep in KNIGHT_JUMPS:
+        counts += unpack_masks(shift_by(knights, step) & np.uint64(keep & FULL))
+    kings = masks[:, base + KING]
+    for shift in KING_STEPS:
+        counts += unpack_masks(shift(kings))
+    # Along one direction only the nearest slider reaches a square, the others are behind it
+    rooks = masks[:, base + ROOK] | masks[:, base + QUEEN]
+    bishops = masks[:, base + BISHOP] | masks[:, base + QUEEN]
+    for shift in ORTHOGONAL_SHIFTS:
+        counts += unpack_masks(slide(rooks, empty, shift))
+    for shift in DIAGONAL_SHIFTS:
+        counts += unpack_masks(slide(bishops, empty, shift))
+    return counts
+
+
+def in_check(boards, white_to_move):
+    """
+    Checks whether the team to move is in check in every position of a batch.
+
+    Args:
+        boards: An (N, 64) int8 array of positions.
+        white_to_move: An (N,) bool array, True where it is White's turn.
+
+    Returns:
+        An (N,) bool array, True where the King of the team to move is attacked.
+    """
+    require_numpy()
+    masks = piece_masks(boards)
+    white_king_attacked = (masks[:, KING] & attack_masks(boards, BLACK_INDEX, masks)) != 0
+    black_king_attacked = (masks[:, 6 + KING] & attack_masks(boards, WHITE_INDEX, masks)) != 0
+    return np.where(white_to_move, white_king_attacked, black_king_attacked)
+
+
+def neighbour_table(targets):
+    # Each square's target squares padded to 8 with square 64, a column that is never a legal destination
+    table = np.full((64, 8), 64, dtype=np.intp)
+    for square in range(64):
+        for column, target in enumerate(iter_squares(targets[square])):
+            table[square, column] = target
+    return table
+
+
+def mobility(boards):
+    """
+    Counts the moves of every piece in every position of a batch.
+
+    Args:
+        boards: An (N, 64) int8 array of positions.
+
+    Returns:
+        An (N, 64) uint8 array holding, for the piece on each square, the number of squares it could move to
+        (0 for empty squares). Like Piece.targets this does not check whether a move would leave its King in
+        check. A pawn counts on its starting rank for the two square move, promotions count once, and en passant
+        and castling are not counted as the batch does not record them.
+    """
+    require_numpy()
+    count = len(boards)
+    signs = np.sign(boards).astype(np.int8)
+    kinds = np.abs(boards)
+    # Square 64 stands for off the board, it holds a sign no piece has so it is never empty or capturable
+    padded = np.concatenate([signs, np.full((count, 1), 2, dtype=np.int8)], axis=1)
+    moves = np.zeros((count, 64), dtype=np.uint8)
+
+    for kind, table in ((KNIGHT, KNIGHT_TABLE), (KING, KING_TABLE)):
+        targets = padded[:, table] # (N, 64, 8)
+        free = (targets == 0) | (targets == -signs[:, :, None])
+        moves += np.where(kinds == kind + 1, free.sum(axis=2), 0).astype(np.uint8)
+
+    rook_like = (kinds == ROOK + 1) | (kinds == QUEEN + 1)
+    bishop_like = (kinds == BISHOP + 1) | (kinds == QUEEN + 1)
+    for direction in range(8):
+        # Empty squares in a row from each square along this direction, and the sign of the piece that ends them.
+        # Squares are filled in from the edge inwards, so the square each one looks at is always done already.
+        run = np.zeros((count, 64), dtype=np.uint8)
+        blocker = np.zeros((count, 64), dtype=np.int8)
+        for squares, following in SLIDE_LAYERS[direction]:
+            next_sign = padded[:, following]
+            next_empty = next_sign == 0
+            run[:, squares] = np.where(next_empty, 1 + run[:, following], 0)
+            blocker[:, squares] = np.where(next_empty, blocker[:, following], next_sign)
+        reach = run + (blocker == -signs)
+        sliding = rook_like if direction < 4 else bishop_like
+        moves += np.where(sliding, reach, 0).astype(np.uint8)
+
+    # Pawns: the squares ahead while they are empty, and the diagonals holding an opponent's piece
+    for sign, start_rank in ((1, 1), (-1, 6)):
+        pawns = boards == sign
+        one = padded[:, PAWN_AHEAD[sign]] == 0
+        two = one & (padded[:, PAWN_AHEAD2[sign]] == 0) & (np.arange(64) // 8 == start_rank)
+        takes = sum(padded[:, PAWN_CAPTURES[sign][column]] == -sign for column in range(2))
+        moves += np.where(pawns, one.astype(np.uint8) + two + takes, 0).astype(np.uint8)
+    return moves
+
+
+def _build_tables():
+    # Index tables for mobility (square 64 stands for off the board), kept as module constants so every batch
+    # reuses them
+    knight = neighbour_table(KNIGHT_TARGETS)
+    king = neighbour_table(KING_TARGETS)
+    following = np.full((8, 64), 64, dtype=np.intp)
+    distance = np.zeros((8, 64), dtype=np.intp) # steps to the edge of the board
+    for direction, shift in enumerate(KING_STEPS):
+        for square in range(64):
+            mask = shift(1 << square)
+            if mask:
+                following[direction, square] = mask.bit_length() - 1
+            while mask:
+                distance[direction, square] += 1
+                mask = shift(mask)
+    # Squares one step from the edge first, then two steps and so on, each with the square next to it
+    layers = [[(np.flatnonzero(distance[direction] == steps), following[direction][distance[direction] == steps])
+               for steps in range(1, 8)] for direction in range(8)]
+    ahead = {1: following[0], -1: following[1]}
+    ahead2 = {sign: np.append(ahead[sign], 64)[ahead[sign]] for sign in (1, -1)}
+    captures = {1: (following[4], following[5]), -1: (following[6], following[7])}
+    return knight, king, layers, ahead, ahead2, captures
+
+if np is not None:
+    KNIGHT_TABLE, KING_TABLE, SLIDE_LAYERS, PAWN_AHEAD, PAWN_AHEAD2, PAWN_CAPTURES = _build_tables()
@@ -0,0 +1,247 @@
+"""
+Perft (move path enumeration) and benchmark suite for the Chess rules engine.
+
+Perft counts every position reachable in a given number of moves. The counts for the standard test positions are
+published, so they check that move generation is correct, and the time taken measures how fast it is.
+
+Usage:
+    python -m benchmark perft "<fen>" <depth> [--divide] [--core fast|scan]
+    python -m benchmark suite [--depth N] [--core fast|scan|all] [--output results.json]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from ChessGame import Chess, Piece, Pawn, Move, PROMOTIONS, WHITE, BLACK, I_FILES
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Standard perft positions with their published node counts for depth 1, 2, 3, ...
+SUITE = [
+    {"name": "start", "fen": START_FEN,
+     "nodes": [20, 400, 8902, 197281, 4865609]},
+    {"name": "kiwipete", "fen": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     "nodes": [48, 2039, 97862, 4085603]},
+    {"name": "endgame-en-passant", "fen": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     "nodes": [14, 191, 2812, 43238, 674624]},
+    {"name": "promotions-castling", "fen": "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     "nodes": [6, 264, 9467, 422333]},
+    {"name": "promotion-checks", "fen": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     "nodes": [44, 1486, 62379, 2103487]},
+    {"name": "middlegame", "fen": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     "nodes": [46, 2079, 89890, 3894594]},
+]
+
+# Promotion choices are Q, B, R, K (Knight) in the game, but n is used for the knight in move names
+UCI_PROMOTIONS = {"Q": "q", "B": "b", "R": "r", "K": "n"}
+
+
+def scan_moves(game):
+    """
+    Generates legal moves by asking every piece if it can move to each of the 64 squares.
+
+    This measures the square by square scan against the move generators, not the original rules engine: the
+    can_move_to it calls already answers from the bitboard tables.
+
+    Args:
+        game: The Chess object to generate moves for.
+
+    Returns:
+        A generator of Move tuples for the team whose turn it is, in the same form as Chess.legal_moves.
+    """
+    team = WHITE if game.white_turn else BLACK
+    pieces = [game.board[file][rank] for file in range(1, 9) for rank in range(1, 9)
+              if isinstance(game.board[file][rank], Piece) and game.board[file][rank].team == team]
+    for piece in pieces:
+        for file in range(1, 9):
+            for rank in range(1, 9):
+                if not piece.can_move_to(file, rank):
+                    continue
+                if isinstance(piece, Pawn) and rank in (1, 8):
+                    moves = [Move(piece, file, rank, choice) for choice in PROMOTIONS]
+                else:
+                    moves = [Move(piece, file, rank)]
+                for move in moves:
+                    if game.is_legal(move):
+                        yield move
+    for move in game.castling_moves(team):
+        if game.is_legal(move):
+            yield move
+
+
+# The move generators that can be measured, by name
+CORES = {
+    "fast": Chess.legal_moves,
+    "scan": scan_moves,
+}
+
+
+def move_name(move):
+    """
+    Names a move by its start and end squares (e.g. e2e4, or e7e8q for a promotion).
+
+    Args:
+        move: A Move that has not been made yet.
+
+    Returns:
+        The move as a lower case string.
+    """
+    name = f"{I_FILES[move.piece.file]}{move.piece.rank}{I_FILES[move.file]}{move.rank}".lower()
+    if move.promotion is not None:
+        name += UCI_PROMOTIONS[move.promotion.upper()]
+    return name
+
+
+def perft(game, depth, generate=Chess.legal_moves):
+    """
+    Counts the positions reachable from a game in exactly depth moves.
+
+    Args:
+        game: The Chess object to start from, it is left as it was.
+        depth: The number of moves (plies) to look ahead.
+        generate: The move generator to use, one of the CORES.
+
+    Returns:
+        The number of leaf positions.
+    """
+    if depth == 0:
+        return 1
+    moves = list(generate(game))
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        record = game.make_move(*move)
+        nodes += perft(game, depth - 1, generate)
+        game.unmake_move(record)
+    return nodes
+
+
+def divide(game, depth, generate=Chess.legal_moves):
+    """
+    Splits a perft count up by the first move, which narrows down where two move generators disagree.
+
+    Args:
+        game: The Chess object to start from, it is left as it was.
+        depth: The number of moves (plies) to look ahead, at least 1.
+        generate: The move generator to use, one of the CORES.
+
+    Returns:
+        A dictionary of move name to the number of leaf positions under that move.
+    """
+    counts = {}
+    for move in list(generate(game)):
+        name = move_name(move)
+        record = game.make_move(*move)
+        counts[name] = perft(game, depth - 1, generate)
+        game.unmake_move(record)
+    return counts
+
+
+def run_suite(core="fast", max_depth=3, max_nodes=None, positions=SUITE):
+    """
+    Runs perft on the standard positions and times each depth.
+
+    Args:
+        core: The name of the move generator to measure, a key of CORES.
+        max_depth: The deepest depth to run for each position.
+        max_nodes: Skip any depth whose published count is above this, so slow cores can still be compared.
+        positions: The positions to run, in the same form as SUITE.
+
+    Returns:
+        A dictionary of results that can be written out as JSON and compared between versions.
+    """
+    generate = CORES[core]
+    results = {"core": core, "python": platform.python_version(), "positions": []}
+    total_nodes = 0
+    total_seconds = 0.0
+    for position in positions:
+        game = Chess.from_fen(position["fen"])
+        depths = []
+        for depth, expected in enumerate(position["nodes"][:max_depth], start=1):
+            if max_nodes is not None and expected > max_nodes:
+                break
+            start = time.perf_counter()
+            nodes = perft(game, depth, generate)
+            seconds = time.perf_counter() - start
+            total_nodes += nodes
+            total_seconds += seconds
+            depths.append({"depth": depth, "nodes": nodes, "expected": expected, "ok": nodes == expected,
+                           "seconds": round(seconds, 6), "nps": round(nodes / seconds) if seconds else None})
+        results["positions"].append({"name": position["name"], "fen": position["fen"], "depths": depths})
+    results["ok"] = all(d["ok"] for p in results["positions"] for d in p["depths"])
+    results["nodes"] = total_nodes
+    results["seconds"] = round(total_seconds, 6)
+    results["nps"] = round(total_nodes / total_seconds) if total_seconds else None
+    return results
+
+
+def print_suite(results):
+    """
+    Prints the results of run_suite as a table.
+
+    Args:
+        results: The dictionary returned by run_suite.
+    """
+    print(f"core: {results['core']}")
+    for position in results["positions"]:
+        for depth in position["depths"]:
+            status = "ok" if depth["ok"] else f"FAIL (expected {depth['expected']})"
+            print(f"{position['name']:<22} depth {depth['depth']}: {depth['nodes']:>10} nodes "
+                  f"{depth['seconds']:>9.3f}s {depth['nps'] or 0:>9} nps  {status}")
+    print(f"total: {results['nodes']} nodes in {results['seconds']:.3f}s, {results['nps']} nps")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    perft_parser = commands.add_parser("perft", help="count the positions reachable from a FEN")
+    perft_parser.add_argument("fen")
+    perft_parser.add_argument("depth", type=int)
+    perft_parser.add_argument("--divide", action="store_true", help="show the count under each first move")
+    perft_parser.add_argument("--core", choices=sorted(CORES), default="fast")
+
+    suite_parser = commands.add_parser("suite", help="run the standard positions and time them")
+    suite_parser.add_argument("--depth", type=int, default=3)
+    suite_parser.add_argument("--core", choices=sorted(CORES) + ["all"], default="fast")
+    suite_parser.add_argument("--max-nodes", type=int, default=None,
+                              help="skip depths with more nodes than this")
+    suite_parser.add_argument("--output", help="write the results to this JSON file")
+
+    args = parser.parse_args(argv)
+    if args.command == "perft":
+        try:
+            game = Chess.from_fen(args.fen)
+        except ValueError as e:
+            print(e)
+            return 1
+        generate = CORES[args.core]
+        start = time.perf_counter()
+        if args.divide:
+            counts = divide(game, args.depth, generate)
+            for name in sorted(counts):
+                print(f"{name}: {counts[name]}")
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(game, args.depth, generate)
+        seconds = time.perf_counter() - start
+        print(f"nodes: {nodes}")
+        print(f"time: {seconds:.3f}s ({nodes / seconds if seconds else 0:.0f} nps)")
+        return 0
+
+    cores = sorted(CORES) if args.core == "all" else [args.core]
+    runs = [run_suite(core, args.depth, args.max_nodes) for core in cores]
+    for results in runs:
+        print_suite(results)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(runs if len(runs) > 1 else runs[0], out, indent=2)
+    return 0 if all(results["ok"] for results in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
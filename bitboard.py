@@ -0,0 +1,428 @@
+"""
+Bitboard representation of a chess position.
+
+Squares are numbered 0-63 starting at A1 and running along each rank (A1 = 0, H1 = 7, A8 = 56, H8 = 63).
+A position is stored as twelve 64 bit integers, one for each kind of piece of each team, where bit n is set
+when that piece is on square n. Occupancy tests and attack sets are then integer mask operations instead of
+loops over Square objects.
+"""
+
+WHITE_INDEX = 0
+BLACK_INDEX = 1
+
+# Piece kinds, a piece's code is its kind plus 6 for Black (so White Pawn = 0 ... Black King = 11)
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+NOT_FILES_AB = NOT_FILE_A & (FULL ^ (FILE_A << 1))
+NOT_FILES_GH = NOT_FILE_H & (FULL ^ (FILE_H >> 1))
+
+
+def square_index(file, rank):
+    """
+    Converts a file and rank (both 1-8) into a square number.
+
+    Args:
+        file: The file (column) coordinate of the square.
+        rank: The rank (row) coordinate of the square.
+
+    Returns:
+        The square number 0-63 used as a bit position on the bitboards.
+    """
+    return (rank - 1) * 8 + file - 1
+
+
+def square_file_rank(square):
+    """
+    Converts a square number back into a file and rank.
+
+    Args:
+        square: The square number 0-63.
+
+    Returns:
+        A (file, rank) tuple using the 1-8 coordinates of the Chess board.
+    """
+    return (square % 8 + 1, square // 8 + 1)
+
+
+def iter_squares(mask):
+    """
+    Yields the square number of every set bit in a mask, lowest square first.
+
+    Args:
+        mask: A 64 bit integer.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def popcount(mask):
+    """
+    Counts the set bits in a mask.
+
+    Args:
+        mask: A 64 bit integer.
+
+    Returns:
+        The number of squares in the mask.
+    """
+    return bin(mask).count("1")
+
+
+# One step shifts of a whole mask, the file masks stop pieces wrapping around the edge of the board
+def north(mask):
+    return (mask << 8) & FULL
+
+def south(mask):
+    return mask >> 8
+
+def east(mask):
+    return (mask << 1) & NOT_FILE_A & FULL
+
+def west(mask):
+    return (mask >> 1) & NOT_FILE_H
+
+def north_east(mask):
+    return (mask << 9) & NOT_FILE_A & FULL
+
+def north_west(mask):
+    return (mask << 7) & NOT_FILE_H & FULL
+
+def south_east(mask):
+    return (mask >> 7) & NOT_FILE_A
+
+def south_west(mask):
+    return (mask >> 9) & NOT_FILE_H
+
+ORTHOGONAL_SHIFTS = (north, south, east, west)
+DIAGONAL_SHIFTS = (north_east, north_west, south_east, south_west)
+
+
+def pawn_attacks(color, pawns):
+    """
+    Finds every square attacked by a set of pawns.
+
+    Args:
+        color: WHITE_INDEX or BLACK_INDEX, the team the pawns belong to.
+        pawns: A mask of the pawns.
+
+    Returns:
+        A mask of the squares diagonally in front of the pawns.
+    """
+    if color == WHITE_INDEX:
+        return north_east(pawns) | north_west(pawns)
+    return south_east(pawns) | south_west(pawns)
+
+
+def knight_attacks(knights):
+    """
+    Finds every square attacked by a set of knights.
+
+    Args:
+        knights: A mask of the knights.
+
+    Returns:
+        A mask of the squares a knight jump away.
+    """
+    return (((knights << 17) & NOT_FILE_A) | ((knights << 15) & NOT_FILE_H) |
+            ((knights << 10) & NOT_FILES_AB) | ((knights << 6) & NOT_FILES_GH) |
+            ((knights >> 17) & NOT_FILE_H) | ((knights >> 15) & NOT_FILE_A) |
+            ((knights >> 10) & NOT_FILES_GH) | ((knights >> 6) & NOT_FILES_AB)) & FULL
+
+
+def king_attacks(kings):
+    """
+    Finds every square attacked by a set of kings.
+
+    Args:
+        kings: A mask of the kings.
+
+    Returns:
+        A mask of the squares one step away in any direction.
+    """
+    sideways = east(kings) | west(kings)
+    row = kings | sideways
+    return sideways | north(row) | south(row)
+
+
+def slider_attacks(sliders, occupied, shifts):
+    """
+    Finds every square attacked by a set of sliding pieces by flooding each direction until a piece blocks it.
+
+    Args:
+        sliders: A mask of the rooks, bishops or queens.
+        occupied: A mask of every piece on the board, the first piece in each direction stops the slide.
+        shifts: The one step shift functions for the directions the pieces slide in.
+
+    Returns:
+        A mask of the squares the pieces can reach, including the blocking squares.
+    """
+    empty = FULL ^ occupied
+    attacks = 0
+    for shift in shifts:
+        reach = shift(sliders)
+        while reach:
+            attacks |= reach
+            reach = shift(reach & empty)
+    return attacks
+
+
+class Bitboards():
+
+    __slots__ = ("pieces", "occupied_by", "occupied")
+
+    def __init__(self):
+        self.pieces = [0] * 12 # one mask per piece code
+        self.occupied_by = [0, 0] # every White piece, every Black piece
+        self.occupied = 0
+
+    def put(self, code, square):
+        """
+        Adds a piece to the bitboards.
+
+        Args:
+            self: The instance of the Bitboards object.
+            code: The piece code (kind plus 6 for Black).
+            square: The square number the piece is placed on.
+        """
+        mask = 1 << square
+        self.pieces[code] |= mask
+        self.occupied_by[code // 6] |= mask
+        self.occupied |= mask
+
+    def remove(self, code, square):
+        """
+        Removes a piece from the bitboards.
+
+        Args:
+            self: The instance of the Bitboards object.
+            code: The piece code (kind plus 6 for Black).
+            square: The square number the piece is taken off.
+        """
+        mask = FULL ^ (1 << square)
+        self.pieces[code] &= mask
+        self.occupied_by[code // 6] &= mask
+        self.occupied &= mask
+
+    def piece_at(self, square):
+        """
+        Finds which piece is on a square.
+
+        Args:
+            self: The instance of the Bitboards object.
+            square: The square number to look at.
+
+        Returns:
+            The code of the piece on the square, or -1 if the square is empty.
+        """
+        mask = 1 << square
+        if not self.occupied & mask:
+            return -1
+        for code in (range(6) if self.occupied_by[WHITE_INDEX] & mask else range(6, 12)):
+            if self.pieces[code] & mask:
+                return code
+        return -1
+
+    def attacks(self, color):
+        """
+        Finds every square attacked by one team.
+
+        Args:
+            self: The instance of the Bitboards object.
+            color: WHITE_INDEX or BLACK_INDEX.
+
+        Returns:
+            A mask of every square a piece of that team attacks.
+        """
+        base = color * 6
+        pieces = self.pieces
+        rooks = pieces[base + ROOK] | pieces[base + QUEEN]
+        bishops = pieces[base + BISHOP] | pieces[base + QUEEN]
+        return (pawn_attacks(color, pieces[base + PAWN]) |
+                knight_attacks(pieces[base + KNIGHT]) |
+                king_attacks(pieces[base + KING]) |
+                slider_attacks(rooks, self.occupied, ORTHOGONAL_SHIFTS) |
+                slider_attacks(bishops, self.occupied, DIAGONAL_SHIFTS))
+
+    def is_attacked(self, color, square, occupied=None):
+        """
+        Checks if a square is attacked by one team, looking outwards from the square itself.
+
+        Args:
+            self: The instance of the Bitboards object.
+            color: WHITE_INDEX or BLACK_INDEX, the attacking team.
+            square: The square number to check.
+            occupied: Optional occupancy mask to use instead of the real one (e.g. with a king lifted off the board).
+
+        Returns:
+            True as soon as one attacker is found, False otherwise. Knight, king and pawn attackers are single table
+            lookups, sliders only need the first piece along each of the 8 rays.
+        """
+        pieces = self.pieces
+        base = color * 6
+        if KNIGHT_TARGETS[square] & pieces[base + KNIGHT]:
+            return True
+        if PAWN_TARGETS[1 - color][square] & pieces[base + PAWN]:
+            return True
+        if KING_TARGETS[square] & pieces[base + KING]:
+            return True
+        if occupied is None:
+            occupied = self.occupied
+        rooks = pieces[base + ROOK] | pieces[base + QUEEN]
+        if rooks & ROOK_REACH[square]:
+            for ray, positive in ORTHOGONAL_RAYS:
+                blocker = first_blocker(ray[square] & occupied, positive)
+                if blocker >= 0 and rooks >> blocker & 1:
+                    return True
+        bishops = pieces[base + BISHOP] | pieces[base + QUEEN]
+        if bishops & BISHOP_REACH[square]:
+            for ray, positive in DIAGONAL_RAYS:
+                blocker = first_blocker(ray[square] & occupied, positive)
+                if blocker >= 0 and bishops >> blocker & 1:
+                    return True
+        return False
+
+    def attackers(self, color, square, occupied=None):
+        """
+        Finds every piece of one team that attacks a square.
+
+        Args:
+            self: The instance of the Bitboards object.
+            color: WHITE_INDEX or BLACK_INDEX, the attacking team.
+            square: The square number to check.
+            occupied: Optional occupancy mask to use instead of the real one.
+
+        Returns:
+            A mask of the squares of all the attacking pieces, 0 if there are none.
+        """
+        pieces = self.pieces
+        base = color * 6
+        if occupied is None:
+            occupied = self.occupied
+        found = ((KNIGHT_TARGETS[square] & pieces[base + KNIGHT]) |
+                 (PAWN_TARGETS[1 - color][square] & pieces[base + PAWN]) |
+                 (KING_TARGETS[square] & pieces[base + KING]))
+        rooks = pieces[base + ROOK] | pieces[base + QUEEN]
+        bishops = pieces[base + BISHOP] | pieces[base + QUEEN]
+        for rays, sliders in ((ORTHOGONAL_RAYS, rooks), (DIAGONAL_RAYS, bishops)):
+            if not sliders:
+                continue
+            for ray, positive in rays:
+                blocker = first_blocker(ray[square] & occupied, positive)
+                if blocker >= 0 and sliders >> blocker & 1:
+                    found |= 1 << blocker
+        return found
+
+    def pinned(self, color, square):
+        """
+        Finds the pieces of one team that are pinned against a square (normally their King).
+
+        Args:
+            self: The instance of the Bitboards object.
+            color: WHITE_INDEX or BLACK_INDEX, the team whose pieces may be pinned.
+            square: The square number they are pinned against.
+
+        Returns:
+            A mask of every piece of the team that is the only piece between the square and an enemy Rook, Bishop
+            or Queen lined up with it, 0 if there are none.
+        """
+        pieces = self.pieces
+        base = (1 - color) * 6
+        snipers = ((ROOK_REACH[square] & (pieces[base + ROOK] | pieces[base + QUEEN])) |
+                   (BISHOP_REACH[square] & (pieces[base + BISHOP] | pieces[base + QUEEN])))
+        found = 0
+        for sniper in iter_squares(snipers):
+            blockers = BETWEEN[square][sniper] & self.occupied
+            # Exactly one piece in the way, and it is one of ours
+            if blockers and not blockers & (blockers - 1) and blockers & self.occupied_by[color]:
+                found |= blockers
+        return found
+
+
+def first_blocker(blockers, positive):
+    """
+    Finds the piece nearest to the start of a ray.
+
+    Args:
+        blockers: The pieces on the ray (the ray mask and the occupancy).
+        positive: True for rays that run towards higher square numbers (north, east, north east, north west).
+
+    Returns:
+        The square number of the nearest piece, or -1 if the ray is empty.
+    """
+    if not blockers:
+        return -1
+    if positive:
+        return (blockers & -blockers).bit_length() - 1
+    return blockers.bit_length() - 1
+
+
+def slider_targets(square, occupied, rays):
+    """
+    Finds every square a single sliding piece can reach, stopping each ray at the first piece in the way.
+
+    Args:
+        square: The square number the piece is on.
+        occupied: A mask of every piece on the board.
+        rays: ORTHOGONAL_RAYS, DIAGONAL_RAYS or QUEEN_RAYS.
+
+    Returns:
+        A mask of the reachable squares, including the squares of the blocking pieces.
+    """
+    targets = 0
+    for ray, positive in rays:
+        reach = ray[square]
+        blocker = first_blocker(reach & occupied, positive)
+        if blocker >= 0:
+            # Cut the ray off behind the blocker
+            reach ^= ray[blocker]
+        targets |= reach
+    return targets
+
+
+def _build_lines():
+    """
+    Builds the BETWEEN and LINE tables for every pair of squares on the same rank, file or diagonal.
+
+    Returns:
+        A (between, line) tuple of 64x64 tables. between[a][b] holds the squares strictly between a and b, and
+        line[a][b] holds the whole line across the board through a and b. Both are 0 when a and b are not lined up.
+    """
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for forward, backward in ((north, south), (east, west), (north_east, south_west), (north_west, south_east)):
+        for a in range(64):
+            full_line = slider_attacks(1 << a, 0, (forward, backward)) | 1 << a
+            for shift in (forward, backward):
+                passed = 0
+                step = shift(1 << a)
+                while step:
+                    b = step.bit_length() - 1
+                    between[a][b] = passed
+                    line[a][b] = full_line
+                    passed |= step
+                    step = shift(step)
+    return between, line
+
+
+# Lookup tables built once at import, indexed by square number
+KNIGHT_TARGETS = [knight_attacks(1 << square) for square in range(64)]
+KING_TARGETS = [king_attacks(1 << square) for square in range(64)]
+PAWN_TARGETS = [[pawn_attacks(color, 1 << square) for square in range(64)] for color in (WHITE_INDEX, BLACK_INDEX)]
+# Everywhere a slider could reach on an empty board
+ROOK_REACH = [slider_attacks(1 << square, 0, ORTHOGONAL_SHIFTS) for square in range(64)]
+BISHOP_REACH = [slider_attacks(1 << square, 0, DIAGONAL_SHIFTS) for square in range(64)]
+QUEEN_REACH = [ROOK_REACH[square] | BISHOP_REACH[square] for square in range(64)]
+BETWEEN, LINE = _build_lines()
+# The squares along each of the 8 rays from a square, paired with whether the ray runs towards higher squares
+ORTHOGONAL_RAYS = [([slider_attacks(1 << square, 0, (shift,)) for square in range(64)], positive)
+                   for shift, positive in ((north, True), (east, True), (south, False), (west, False))]
+DIAGONAL_RAYS = [([slider_attacks(1 << square, 0, (shift,)) for square in range(64)], positive)
+                 for shift, positive in ((north_east, True), (north_west, True), (south_east, False), (south_west, False))]
+QUEEN_RAYS = ORTHOGONAL_RAYS + DIAGONAL_RAYS
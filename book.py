@@ -0,0 +1,262 @@
+"""
+Opening book stored as a sorted binary file and read through a memory map.
+
+A book is a file of 16 byte records laid out like a Polyglot book: the position key (8 bytes), the move (2 bytes),
+its weight (2 bytes) and a spare learn field (4 bytes), all big endian and sorted by key. The keys are this
+game's own Zobrist keys (see zobrist.py) and the moves are packed by encode_move, so a book is read by this game
+rather than by other Polyglot programs.
+
+Looking a position up is a binary search over the records straight from the memory map, so the file is never read
+into memory as a whole. Every process that opens the same book shares the same pages of the operating system's
+file cache, however many workers are running.
+
+Usage:
+    python -m book build games.pgn book.bin [--plies N] [--min-games N]
+    python -m book probe book.bin [FEN]
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from collections import defaultdict
+
+from ChessGame import Chess, GameSession, WHITE, encode_move
+from pgn import read_games, PLAYED
+
+RECORD = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+RECORD_BYTES = RECORD.size
+MAX_WEIGHT = 0xFFFF
+
+# Points for the team that played a move by the game's result, a win counts twice a draw
+RESULT_POINTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1), "*": (1, 1)}
+
+
+class OpeningBook():
+
+    def __init__(self, path):
+        """
+        Opens a book for reading.
+
+        Args:
+            self: The instance of the OpeningBook object.
+            path: The path of the book file. It is mapped read only, nothing is read until a position is looked up.
+        """
+        self.path = os.fspath(path)
+        self.file = open(self.path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        if size % RECORD_BYTES:
+            self.file.close()
+            raise ValueError(f"{self.path} is not an opening book (its size is not a multiple of {RECORD_BYTES})")
+        self.count = size // RECORD_BYTES
+        # An empty file cannot be mapped, and has nothing to look up anyway
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __reduce__(self):
+        # Sent to another process as its path, so each process maps the file instead of being sent a copy of it
+        return (OpeningBook, (self.path,))
+
+    def close(self):
+        """
+        Unmaps and closes the book file.
+
+        Args:
+            self: The instance of the OpeningBook object.
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def first_index(self, key):
+        """
+        Finds where a key's records start.
+
+        Args:
+            self: The instance of the OpeningBook object.
+            key: A position key.
+
+        Returns:
+            The index of the first record whose key is not below the given key (the number of records if there is
+            none), found by binary search.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) >> 1
+            if KEY.unpack_from(self.map, middle * RECORD_BYTES)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, key):
+        """
+        Reads the records of one position.
+
+        Args:
+            self: The instance of the OpeningBook object.
+            key: The position key.
+
+        Returns:
+            A list of (encoded move, weight) pairs, empty if the position is not in the book.
+        """
+        found = []
+        index = self.first_index(key)
+        while index < self.count:
+            record_key, move, weight, learn = RECORD.unpack_from(self.map, index * RECORD_BYTES)
+            if record_key != key:
+                break
+            found.append((move, weight))
+            index += 1
+        return found
+
+    def moves(self, game):
+        """
+        Lists the book moves for the position of a game.
+
+        Args:
+            self: The instance of the OpeningBook object.
+            game: The Chess game, the team whose turn it is moves.
+
+        Returns:
+            A list of (Move, weight) pairs, highest weight first. Moves that are not legal in the position (a
+            different position with the same key) are left out.
+        """
+        found = []
+        for code, weight in self.entries(game.key):
+            move = game.decode_move(code)
+            if move is not None and game.is_legal(move):
+                found.append((move, weight))
+        found.sort(key=lambda entry: entry[1], reverse=True)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found
+
+    def choose(self, game, best=False):
+        """
+        Picks a book move for the position of a game.
+
+        Args:
+            self: The instance of the OpeningBook object.
+            game: The Chess game, the team whose turn it is moves.
+            best: True to always take the move with the highest weight, False to pick at random in proportion to
+                the weights so the engine does not always play the same opening.
+
+        Returns:
+            The Move, or None if the position is not in the book.
+        """
+        found = self.moves(game)
+        if not found:
+            return None
+        if best or len(found) == 1:
+            return found[0][0]
+        weights = [weight for move, weight in found]
+        if not any(weights):
+            return found[0][0]
+        return random.choices([move for move, weight in found], weights)[0]
+
+
+def build_book(source, path, plies=20, min_games=1):
+    """
+    Compiles an opening book from the games of a PGN archive.
+
+    Args:
+        source: A path to a PGN file, or an open text file.
+        path: Where to write the book, any existing file is replaced.
+        plies: How many moves from the start of each game go into the book.
+        min_games: Moves played in fewer games than this are left out.
+
+    Returns:
+        The number of records written. A move's weight is 2 for each game won by the team that played it and 1 for
+        each draw or unfinished game, scaled down for a position whose weights do not fit in 16 bits. Games with a
+        FEN tag are skipped, and a game stops counting at its first illegal move.
+    """
+    weights = defaultdict(int)
+    games = defaultdict(int)
+    for pgn_game in read_games(source):
+        if "FEN" in pgn_game.tags:
+            continue
+        points = RESULT_POINTS.get(pgn_game.result, (1, 1))
+        session = GameSession()
+        game = session.game
+        for san in pgn_game.moves[:plies]:
+            try:
+                move = game.parse_move(san)
+            except ValueError:
+                break
+            if move is None:
+                break
+            entry = (game.key, encode_move(move))
+            mover = game.team_to_move()
+            if session.play_move(move).status not in PLAYED:
+                break
+            weights[entry] += points[0 if mover == WHITE else 1]
+            games[entry] += 1
+
+    by_key = defaultdict(list)
+    for (key, move), weight in weights.items():
+        if games[key, move] >= min_games:
+            by_key[key].append((move, weight))
+    count = 0
+    with open(path, "wb") as file:
+        for key in sorted(by_key):
+            entries = sorted(by_key[key])
+            top = max(weight for move, weight in entries)
+            for move, weight in entries:
+                if top > MAX_WEIGHT:
+                    weight = weight * MAX_WEIGHT // top
+                file.write(RECORD.pack(key, move, weight, 0))
+                count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m book", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a book from a PGN archive")
+    build.add_argument("archive", help="the PGN file to read")
+    build.add_argument("book", help="the book file to write")
+    build.add_argument("--plies", type=int, default=20, help="moves from the start of each game to keep")
+    build.add_argument("--min-games", type=int, default=1, help="games a move must be played in to be kept")
+    probe = commands.add_parser("probe", help="list the book moves of a position")
+    probe.add_argument("book", help="the book file to read")
+    probe.add_argument("fen", nargs="?", help="the position (the starting position if not given)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_book(args.archive, args.book, args.plies, args.min_games)
+        print(f"{count} moves written to {args.book}")
+        return 0
+    try:
+        game = Chess(args.fen)
+    except ValueError as e:
+        print(e)
+        return 1
+    with OpeningBook(args.book) as book:
+        found = book.moves(game)
+        total = sum(weight for move, weight in found)
+        for move, weight in found:
+            print(f"{game.san(move):8} {weight:6} {100 * weight / total if total else 0:5.1f}%")
+        if not found:
+            print("The position is not in the book")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+"""
+Alpha-beta search engine, so the game can be played against the computer.
+
+The search is a negamax alpha-beta with iterative deepening inside a hard time budget. Moves are tried in the
+order most likely to cut the search short: the move stored in the transposition table for the position, captures
+by most valuable victim and least valuable attacker (MVV-LVA), killer moves, then quiet moves by their history
+score. At the end of the main search only captures are followed (quiescence search), so positions are not scored
+in the middle of an exchange. Positions are scored by Chess.evaluate, which the game keeps up to date as it moves.
+An engine given an opening book plays its moves without searching while the game is still in the book, and one
+given endgame tablebases scores the positions they cover exactly instead of searching them.
+
+Usage:
+    python -m engine [--white] [--time MS] [--book BOOK] [--tablebases DIRECTORY]
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+from bitboard import iter_squares, square_index, square_file_rank, PAWN, KING
+from book import OpeningBook
+from ChessGame import Chess, Piece, Pawn, Move, BLACK, WHITE, encode_move
+from tablebase import Tablebases
+from transposition import TranspositionTable, EMPTY, EXACT, LOWER, UPPER, MATE_SCORE
+
+INFINITY = MATE_SCORE + 1
+MAX_PLY = 64
+# The longest distance to mate a tablebase can give, its DTM is stored in a byte
+MAX_DTM = 255
+# Scores this close to MATE_SCORE are mates, counted in plies from the position they were found in. A tablebase
+# win found at the deepest ply still has to fall inside, so the band covers MAX_PLY plus the longest DTM
+MATE_BOUND = MATE_SCORE - MAX_PLY - MAX_DTM
+
+# Move ordering bands, the table move first, then captures and promotions, then killers, then history
+TABLE_MOVE = 1 << 30
+CAPTURE = 1 << 24
+KILLER = 1 << 22
+HISTORY_LIMIT = 1 << 20
+
+# The result of a search: the best move, its score for the side to move, the deepest completed depth, the
+# principal variation in SAN, how many positions were searched in how long, and whether the move came from the book
+SearchResult = namedtuple("SearchResult", ["move", "score", "depth", "pv", "nodes", "seconds", "nps", "book"],
+                          defaults=[False])
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out."""
+
+
+def capture_moves(game):
+    """
+    Generates the captures and queen promotions of the team whose turn it is, for the quiescence search.
+
+    Args:
+        game: The Chess game to generate moves for.
+
+    Returns:
+        A generator of Move tuples, without checking if they leave the team's king in check.
+    """
+    index = 0 if game.white_turn else 1
+    enemy = game.bitboards.occupied_by[1 - index]
+    for piece in game.team_pieces(game.team_to_move()):
+        file = piece.file
+        if isinstance(piece, Pawn):
+            for target in iter_squares(piece.targets()):
+                target_file, target_rank = square_file_rank(target)
+                if target_rank in (1, 8):
+                    yield Move(piece, target_file, target_rank, "Q")
+                elif target_file != file: # diagonal, a capture or en passant
+                    yield Move(piece, target_file, target_rank)
+        else:
+            for target in iter_squares(piece.targets() & enemy):
+                target_file, target_rank = square_file_rank(target)
+                yield Move(piece, target_file, target_rank)
+
+
+class Engine():
+
+    def __init__(self, max_time_ms=1000, max_depth=MAX_PLY, table_mb=16, book=None, tablebases=None):
+        """
+        Creates an engine.
+
+        Args:
+            self: The instance of the Engine object.
+            max_time_ms: The default time budget of a search in milliseconds.
+            max_depth: The deepest a search goes, however much time is left.
+            table_mb: The size of the transposition table made for a game that does not have one yet.
+            book: An optional book.OpeningBook, its moves are played without searching.
+            tablebases: Optional tablebase.Tablebases, probed instead of searching the positions they hold.
+        """
+        self.max_time_ms = max_time_ms
+        self.book = book
+        self.tablebases = tablebases
+        self.max_depth = max_depth
+        self.table_mb = table_mb
+        self.game = None
+        self.table = None
+        self.deadline = 0.0
+        self.nodes = 0
+        self.killers = [[0, 0] for ply in range(MAX_PLY + 1)]
+        # Indexed by piece code and target square, raised by quiet moves that cause a cutoff
+        self.history = [[0] * 64 for code in range(12)]
+        # Move records of the moves made during the search, so a timeout can put the board back
+        self.records = []
+        # Keys of the positions on the path to the current one, for spotting repetitions
+        self.path = []
+        # The best move found so far at the root of the search
+        self.root_move = None
+
+    def search(self, position, max_time_ms=None):
+        """
+        Finds the best move for the team whose turn it is.
+
+        Args:
+            self: The instance of the Engine object.
+            position: The Chess game to search. It is left exactly as it was, and is given a transposition table
+                if it does not have one (the table is kept between searches and shared with its checkmate checks).
+            max_time_ms: The time budget in milliseconds, the engine's default if not given. The search stops as
+                soon as it runs out, keeping the result of the last depth it completed.
+
+        Returns:
+            A SearchResult. The move is None if the team has no legal moves. A book move, or the best move of a
+            position in the tablebases, is returned straight away with a depth and node count of 0.
+        """
+        if max_time_ms is None:
+            max_time_ms = self.max_time_ms
+        start = time.perf_counter()
+        if self.book is not None:
+            move = self.book.choose(position)
+            if move is not None:
+                return SearchResult(move, 0, 0, [position.san(move)], 0, time.perf_counter() - start, 0, True)
+        if self.tablebases is not None:
+            found = self.tablebases.best_move(position)
+            if found is not None:
+                move, result = found
+                return SearchResult(move, tablebase_score(result, 0), 0, [position.san(move)], 0,
+                                    time.perf_counter() - start, 0)
+        self.deadline = start + max_time_ms / 1000
+        if position.table is None:
+            position.table = TranspositionTable(self.table_mb)
+        self.game = position
+        self.table = position.table
+        self.table.new_search()
+        self.nodes = 0
+        self.killers = [[0, 0] for ply in range(MAX_PLY + 1)]
+        for scores in self.history:
+            for square in range(64):
+                scores[square] >>= 1
+
+        result = None
+        self.root_move = None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score = self.negamax(depth, -INFINITY, INFINITY, 0)
+            except SearchTimeout:
+                while self.records:
+                    position.unmake_move(self.records.pop())
+                self.path = []
+                break
+            seconds = time.perf_counter() - start
+            move = self.root_move
+            pv = self.principal_variation(depth)
+            if move is not None and (not pv or pv[0][0] != move):
+                pv = [(move, position.san(move))]
+            result = SearchResult(move, score, depth, [san for pv_move, san in pv], self.nodes, seconds,
+                                  round(self.nodes / seconds) if seconds else 0)
+            # A forced mate cannot be improved on, and the next depth would not finish in the time left
+            if move is None or abs(score) >= MATE_BOUND or seconds * 2 > max_time_ms / 1000:
+                break
+
+        seconds = time.perf_counter() - start
+        if result is None:
+            # Not even depth 1 finished, any legal move is better than none
+            move = position.table_move(position.team_to_move()) or next(position.legal_moves(), None)
+            result = SearchResult(move, 0, 0, [position.san(move)] if move else [], self.nodes, seconds,
+                                  round(self.nodes / seconds) if seconds else 0)
+        else:
+            result = result._replace(nodes=self.nodes, seconds=seconds,
+                                     nps=round(self.nodes / seconds) if seconds else 0)
+        return result
+
+    def negamax(self, depth, alpha, beta, ply):
+        """
+        Searches a position to the given depth.
+
+        Args:
+            self: The instance of the Engine object.
+            depth: How many more moves to search before only following captures.
+            alpha: The score the side to move is already sure of.
+            beta: The score the opponent will not allow the side to move to go above.
+            ply: How many moves from the root of the search this position is.
+
+        Returns:
+            The score of the position for the side to move. Scores outside alpha-beta are only bounds.
+        """
+        game = self.game
+        self.nodes += 1
+        if self.nodes & 63 == 0 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        key = game.key
+        if ply:
+            if game.halfmove_clock >= 100 or key in self.path:
+                return 0
+            if ply >= MAX_PLY:
+                return game.evaluate()
+            if self.tablebases is not None:
+                result = self.tablebases.probe(game)
+                if result is not None:
+                    return tablebase_score(result, ply)
+
+        in_check = game.in_check()
+        if in_check:
+            depth += 1 # never stop searching while in check
+        if depth <= 0:
+            return self.quiesce(alpha, beta, ply)
+
+        entry = self.table.probe(key)
+        table_move = 0
+        if entry is not None:
+            table_move = entry.move
+            if ply and entry.depth >= depth and entry.bound != EMPTY:
+                score = from_table(entry.score, ply)
+                if (entry.bound == EXACT or (entry.bound == LOWER and score >= beta)
+                        or (entry.bound == UPPER and score <= alpha)):
+                    return score
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        legal = 0
+        self.path.append(key)
+        # Every move is tested against the position's pins and checks before any of them is made
+        for code, move in self.ordered_moves(game.legal_moves(), table_move, ply):
+            piece = move.piece
+            legal += 1
+            record = game.make_move(piece, move.file, move.rank, move.promotion)
+            self.records.append(record)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            game.unmake_move(self.records.pop())
+            if score > best_score:
+                best_score = score
+                best_move = code
+                if not ply:
+                    self.root_move = move
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        if not isinstance(record.captured, Piece) and record.promoted is None:
+                            self.remember_cutoff(code, piece.code, move, depth, ply)
+                        break
+        self.path.pop()
+
+        if not legal:
+            return -MATE_SCORE + ply if in_check else 0
+        bound = LOWER if best_score >= beta else EXACT if best_score > original_alpha else UPPER
+        self.table.store(key, best_move, depth, bound, to_table(best_score, ply))
+        return best_score
+
+    def quiesce(self, alpha, beta, ply):
+        """
+        Follows the captures from a position until it is quiet, so it is not scored in the middle of an exchange.
+
+        Args:
+            self: The instance of the Engine object.
+            alpha: The score the side to move is already sure of.
+            beta: The score the opponent will not allow the side to move to go above.
+            ply: How many moves from the root of the search this position is.
+
+        Returns:
+            The score of the position for the side to move, which can choose not to capture (stand pat).
+        """
+        game = self.game
+        self.nodes += 1
+        if self.nodes & 63 == 0 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        stand_pat = game.evaluate()
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = (move for move in capture_moves(game) if game.is_legal(move))
+        for code, move in self.ordered_moves(captures, 0, ply):
+            self.records.append(game.make_move(move.piece, move.file, move.rank, move.promotion))
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            game.unmake_move(self.records.pop())
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def ordered_moves(self, moves, table_move, ply):
+        """
+        Sorts moves so the ones most likely to be best are searched first.
+
+        Args:
+            self: The instance of the Engine object.
+            moves: An iterable of Move tuples for the current position.
+            table_move: The encoded move stored in the transposition table for the position, or 0.
+            ply: How many moves from the root of the search the position is, for its killer moves.
+
+        Returns:
+            A list of (encoded move, Move) pairs: the table move, then captures and promotions by MVV-LVA, then
+            the killer moves, then the other moves by history score.
+        """
+        bitboards = self.game.bitboards
+        killers = self.killers[ply]
+        history = self.history
+        scored = []
+        for move in moves:
+            piece = move.piece
+            target = square_index(move.file, move.rank)
+            code = target | square_index(piece.file, piece.rank) << 6
+            if move.promotion is not None:
+                code = encode_move(move)
+            if code == table_move:
+                order = TABLE_MOVE
+            else:
+                victim = bitboards.piece_at(target)
+                if victim < 0 and piece.kind == PAWN and move.file != piece.file:
+                    victim = PAWN # en passant
+                if victim >= 0:
+                    order = CAPTURE + (victim % 6) * 8 + (KING - piece.kind)
+                elif move.promotion is not None:
+                    order = CAPTURE + (4 if move.promotion.upper() == "Q" else 0)
+                elif code == killers[0]:
+                    order = KILLER + 1
+                elif code == killers[1]:
+                    order = KILLER
+                else:
+                    order = history[piece.code][target]
+            scored.append((order, code, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(code, move) for order, code, move in scored]
+
+    def remember_cutoff(self, code, piece_code, move, depth, ply):
+        """
+        Records a quiet move that caused a cutoff, as a killer move for its ply and in the history scores.
+
+        Args:
+            self: The instance of the Engine object.
+            code: The encoded move.
+            piece_code: The bitboard code of the piece that moved.
+            move: The Move.
+            depth: The depth it was searched to, deeper cutoffs count for more.
+            ply: How many moves from the root of the search it was made.
+        """
+        killers = self.killers[ply]
+        if killers[0] != code:
+            killers[1] = killers[0]
+            killers[0] = code
+        scores = self.history[piece_code]
+        target = square_index(move.file, move.rank)
+        scores[target] += depth * depth
+        if scores[target] >= HISTORY_LIMIT:
+            for scores in self.history:
+                for square in range(64):
+                    scores[square] >>= 1
+
+    def principal_variation(self, depth):
+        """
+        Reads the expected line of play out of the transposition table.
+
+        Args:
+            self: The instance of the Engine object.
+            depth: The most moves to read.
+
+        Returns:
+            A list of (Move, SAN) pairs, starting with the best move of the position. The game is left as it was.
+        """
+        game = self.game
+        line = []
+        records = []
+        seen = set()
+        while len(line) < depth and game.key not in seen:
+            seen.add(game.key)
+            entry = self.table.probe(game.key)
+            move = game.decode_move(entry.move) if entry is not None and entry.move else None
+            if move is None or not game.is_legal(move):
+                break
+            line.append((move, game.san(move)))
+            records.append(game.make_move(*move))
+        while records:
+            game.unmake_move(records.pop())
+        return line
+
+
+def to_table(score, ply):
+    # Mate scores are stored counted from the position rather than from the root, so they hold wherever it occurs
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def tablebase_score(result, ply):
+    # A tablebase result as a search score, mates counted from the root like the ones the search finds
+    if result.wdl > 0:
+        return MATE_SCORE - ply - result.dtm
+    if result.wdl < 0:
+        return -MATE_SCORE + ply + result.dtm
+    return 0
+
+
+def search(position, max_time_ms=1000):
+    """
+    Finds the best move for the team whose turn it is within a time budget.
+
+    Args:
+        position: The Chess game to search, it is left as it was.
+        max_time_ms: The time budget in milliseconds.
+
+    Returns:
+        A SearchResult with the move, score, depth reached, principal variation, nodes and nodes per second.
+    """
+    return Engine(max_time_ms).search(position)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m engine", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--white", action="store_true", help="let the engine play White (it plays Black by default)")
+    parser.add_argument("--time", type=int, default=1000, help="milliseconds the engine may think per move")
+    parser.add_argument("--book", help="an opening book built with python -m book build")
+    parser.add_argument("--tablebases", help="a directory of tables built with python -m tablebase generate")
+    args = parser.parse_args(argv)
+    book = OpeningBook(args.book) if args.book else None
+    tablebases = Tablebases(args.tablebases) if args.tablebases else None
+    game = Chess()
+    game.tablebases = tablebases
+    try:
+        game.play(Engine(args.time, book=book, tablebases=tablebases), WHITE if args.white else BLACK)
+    finally:
+        if book is not None:
+            book.close()
+        if tablebases is not None:
+            tablebases.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
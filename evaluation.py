@@ -0,0 +1,156 @@
+"""
+Position evaluation by material and piece-square tables, blended between the middlegame and the endgame.
+
+Each piece is worth its material value plus a bonus or penalty for the square it stands on, with one set of
+values for the middlegame and one for the endgame. The two totals are blended by the game phase, worked out from
+the pieces left on the board, so the score moves smoothly towards the endgame values as pieces come off.
+
+Every value depends on just one piece and its square, so a game can keep the totals up to date as pieces move
+(see Chess.relocate) instead of adding up the whole board for every position it scores.
+"""
+
+from bitboard import iter_squares
+
+# Material of each kind (Pawn, Knight, Bishop, Rook, Queen, King) in the middlegame and in the endgame
+MG_VALUES = [82, 337, 365, 477, 1025, 0]
+EG_VALUES = [94, 281, 297, 512, 936, 0]
+
+# How much each kind counts towards the game phase, the full starting set adds up to MAX_PHASE
+PHASE_WEIGHTS = [0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# Square bonuses from White's side of the board, written with rank 8 at the top as on a diagram
+_PAWN_MG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+_PAWN_EG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     20,  20,  20,  20,  20,  20,  20,  20,
+     10,  10,  10,  10,  10,  10,  10,  10,
+     10,  10,  10,  10,  10,  10,  10,  10,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+]
+_QUEEN = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+_KING_MG = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+]
+_KING_EG = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+_MG_SQUARES = [_PAWN_MG, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_MG]
+_EG_SQUARES = [_PAWN_EG, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_EG]
+
+
+def _build_tables(values, squares):
+    # Square 0 is a1 but the diagrams start at a8, so White reads them flipped (square ^ 56) and Black as written.
+    # Black's values are negative so every table adds up to a score from White's point of view.
+    tables = []
+    for sign, flip in ((1, 56), (-1, 0)):
+        for kind in range(6):
+            tables.append([sign * (values[kind] + squares[kind][square ^ flip]) for square in range(64)])
+    return tables
+
+# Indexed by piece code and square, the value of that piece standing there from White's point of view
+MG_TABLES = _build_tables(MG_VALUES, _MG_SQUARES)
+EG_TABLES = _build_tables(EG_VALUES, _EG_SQUARES)
+PHASES = PHASE_WEIGHTS * 2
+
+
+def full_eval(bitboards):
+    """
+    Adds up the evaluation of a position from scratch.
+
+    Args:
+        bitboards: The Bitboards of the position.
+
+    Returns:
+        A (middlegame, endgame, phase) tuple, the two scores from White's point of view. A game keeps the same
+        three numbers up to date as it is played, this is what they are checked against.
+    """
+    mg = eg = phase = 0
+    for code in range(12):
+        for square in iter_squares(bitboards.pieces[code]):
+            mg += MG_TABLES[code][square]
+            eg += EG_TABLES[code][square]
+            phase += PHASES[code]
+    return mg, eg, phase
+
+
+def tapered(mg, eg, phase):
+    """
+    Blends the middlegame and endgame scores by the game phase.
+
+    Args:
+        mg: The middlegame score.
+        eg: The endgame score.
+        phase: The game phase, MAX_PHASE with every piece on the board down to 0 with only kings and pawns.
+
+    Returns:
+        The blended score in centipawns. Extra phase from promoted pieces counts as a full middlegame.
+    """
+    phase = min(phase, MAX_PHASE)
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
@@ -0,0 +1,461 @@
+"""
+Append-only binary log of the games played, with checkpoints for jumping to any move.
+
+A log is a file of blocks. Each block starts with a 12 byte header: its kind (1 byte), the game's number (4 bytes),
+the ply it starts at (4 bytes), the length of its text (1 byte) and its number of moves (2 bytes), all little
+endian. A segment block's text is the position at its first ply as a FEN string, followed by its moves packed in
+2 bytes each by encode_move (the start square, the target square and the promotion choice). An end block's text is
+the game's result and it has no moves.
+
+A game is written as one segment every checkpoint_interval plies, so any position is found by setting up the FEN
+of its segment and replaying at most checkpoint_interval moves. Each move takes 2 bytes and each segment about 70
+more for its header and position, so with the default interval a game of typical length takes about three and a
+half bytes per ply. Blocks are gathered in memory and written in batches, and the moves of a game not yet filling
+a segment are written when it ends or the log is closed, so the file only ever grows.
+
+Reading a log maps it into memory and goes over the block headers once, so games can be looked up in any order
+however many there are.
+
+Usage:
+    python -m gamelog record games.pgn games.log [--checkpoint-interval N]
+    python -m gamelog info games.log
+    python -m gamelog show games.log GAME [PLY]
+"""
+
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+from bitboard import square_index
+from ChessGame import Chess, GameSession, WHITE, BLACK, PROMOTION_CODES
+from pgn import read_games, PLAYED
+
+HEADER = struct.Struct("<BIIBH")
+MOVE = struct.Struct("<H")
+SEGMENT = 1
+END = 2
+
+# Plies between the positions written to the log, the most moves replayed to reach any position
+CHECKPOINT_INTERVAL = 64
+# Bytes gathered before they are written to the file
+FLUSH_BYTES = 1 << 16
+
+# Result of a finished game by the team that won
+RESULTS = {WHITE: "1-0", BLACK: "0-1"}
+
+
+def blocks(data, size):
+    """
+    Goes over the blocks of a log.
+
+    Args:
+        data: The log's bytes, or a memory map of it.
+        size: The number of bytes.
+
+    Returns:
+        A generator of (offset, kind, game, ply, text, moves offset, count), where text is the block's text
+        decoded. It stops at a block that runs past the end, left half written if the program writing the log
+        was stopped.
+    """
+    offset = 0
+    while offset + HEADER.size <= size:
+        kind, game, ply, length, count = HEADER.unpack_from(data, offset)
+        moves = offset + HEADER.size + length
+        end = moves + count * MOVE.size
+        if end > size or kind not in (SEGMENT, END):
+            return
+        yield offset, kind, game, ply, bytes(data[moves - length:moves]).decode("ascii"), moves, count
+        offset = end
+
+
+def move_code(result):
+    """
+    Packs a played move like encode_move, from the square it was played from.
+
+    Args:
+        result: The MoveResult of the move.
+
+    Returns:
+        The 16 bit encoded move.
+    """
+    move = result.move
+    code = square_index(move.file, move.rank) | square_index(*result.start) << 6
+    if move.promotion is not None:
+        code |= PROMOTION_CODES[move.promotion.upper()] << 12
+    return code
+
+
+class GameLog():
+
+    def __init__(self, path, checkpoint_interval=CHECKPOINT_INTERVAL, flush_bytes=FLUSH_BYTES):
+        """
+        Opens a log for adding games, creating it if there is none.
+
+        Args:
+            self: The instance of the GameLog object.
+            path: The path of the log file. Games already in it are kept, and a block left half written at its
+                end is cut off.
+            checkpoint_interval: Plies in each segment, the most moves replayed to reach a position.
+            flush_bytes: Bytes gathered before they are written to the file.
+        """
+        self.path = os.fspath(path)
+        self.checkpoint_interval = checkpoint_interval
+        self.flush_bytes = flush_bytes
+        self.file = open(self.path, "a+b")
+        size = os.fstat(self.file.fileno()).st_size
+        end = 0
+        last_game = 0
+        if size:
+            with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset, kind, game, ply, text, moves, count in blocks(data, size):
+                    end = moves + count * MOVE.size
+                    last_game = max(last_game, game)
+        if end < size:
+            self.file.truncate(end)
+        self.next_game = last_game + 1
+        self.buffer = bytearray()
+        # GameSession -> [game number, ply of the segment being filled, its starting FEN, its moves, whether a
+        # segment of the game has been written]
+        self.games = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def begin(self, session):
+        """
+        Starts logging a game from its current position.
+
+        Args:
+            self: The instance of the GameLog object.
+            session: The GameSession playing the game.
+
+        Returns:
+            The number of the game in the log.
+        """
+        number = self.next_game
+        self.next_game += 1
+        self.games[session] = [number, len(session.moves), session.game.to_fen(), [], False]
+        return number
+
+    def record(self, session, result):
+        """
+        Adds a move to a game, doing nothing if the game is not being logged.
+
+        Args:
+            self: The instance of the GameLog object.
+            session: The GameSession the move was played in.
+            result: The finished MoveResult of the move.
+        """
+        entry = self.games.get(session)
+        if entry is None:
+            return
+        entry[3].append(move_code(result))
+        if len(entry[3]) >= self.checkpoint_interval:
+            self.write_segment(entry)
+            entry[1] += len(entry[3])
+            entry[2] = session.game.to_fen()
+            entry[3] = []
+
+    def end(self, session, result=None):
+        """
+        Finishes logging a game, doing nothing if it is not being logged.
+
+        Args:
+            self: The instance of the GameLog object.
+            session: The GameSession playing the game.
+            result: The result to write (1-0, 0-1, 1/2-1/2 or *), taken from the session if not given.
+        """
+        entry = self.games.pop(session, None)
+        if entry is None:
+            return
+        if result is None:
+            result = RESULTS.get(session.winner, "1/2-1/2" if session.draw else "*")
+        if entry[3] or not entry[4]:
+            self.write_segment(entry)
+        text = result.encode("ascii")
+        self.write(HEADER.pack(END, entry[0], len(session.moves), len(text), 0) + text)
+
+    def takeback(self, session, plies):
+        """
+        Takes the last moves of a game back out of the log. A game that had ended carries on as a new one.
+
+        Args:
+            self: The instance of the GameLog object.
+            session: The GameSession the moves were taken back in, its moves already shortened.
+            plies: How many moves were taken back.
+        """
+        entry = self.games.get(session)
+        if entry is None:
+            self.begin(session)
+            return
+        if plies <= len(entry[3]):
+            del entry[3][len(entry[3]) - plies:]
+        else:
+            # Those moves are already in the file, which is only added to, so the game carries on as a new one
+            self.end(session, "*")
+            self.begin(session)
+
+    def write_segment(self, entry):
+        # Adds the block of a segment to the buffer
+        number, ply, fen, moves, written = entry
+        entry[4] = True
+        text = fen.encode("ascii")
+        self.write(HEADER.pack(SEGMENT, number, ply, len(text), len(moves)) + text
+                   + struct.pack(f"<{len(moves)}H", *moves))
+
+    def write(self, block):
+        # Gathers a block, writing the buffer once it is large enough
+        self.buffer += block
+        if len(self.buffer) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the gathered blocks to the file.
+
+        Args:
+            self: The instance of the GameLog object.
+        """
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer.clear()
+
+    def close(self):
+        """
+        Writes the moves of the games still being played as unfinished games and closes the file.
+
+        Args:
+            self: The instance of the GameLog object.
+        """
+        for entry in self.games.values():
+            if entry[3] or not entry[4]:
+                self.write_segment(entry)
+        self.games.clear()
+        self.flush()
+        self.file.close()
+
+
+class GameLogReader():
+
+    def __init__(self, path):
+        """
+        Opens a log for reading.
+
+        Args:
+            self: The instance of the GameLogReader object.
+            path: The path of the log file. It is mapped read only and its block headers are read once.
+        """
+        self.path = os.fspath(path)
+        self.file = open(self.path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        # An empty file cannot be mapped, and has no games anyway
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        # Game -> ([first ply of each segment], [(FEN, moves offset, count) of each segment])
+        self.segments = {}
+        self.results = {}
+        for offset, kind, game, ply, text, moves, count in blocks(self.map, size) if size else ():
+            if kind == END:
+                self.results[game] = text
+            else:
+                plies, found = self.segments.setdefault(game, ([], []))
+                plies.append(ply)
+                found.append((text, moves, count))
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def __contains__(self, game):
+        return game in self.segments
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __reduce__(self):
+        # Sent to another process as its path, so each process maps the file instead of being sent a copy of it
+        return (GameLogReader, (self.path,))
+
+    def close(self):
+        """
+        Unmaps and closes the log file.
+
+        Args:
+            self: The instance of the GameLogReader object.
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def plies(self, game):
+        """
+        Counts the moves of a game.
+
+        Args:
+            self: The instance of the GameLogReader object.
+            game: The game's number.
+
+        Returns:
+            The ply reached by the game's last move.
+        """
+        plies, found = self.segments[game]
+        return plies[-1] + found[-1][2]
+
+    def result(self, game):
+        """
+        Finds how a game ended.
+
+        Args:
+            self: The instance of the GameLogReader object.
+            game: The game's number.
+
+        Returns:
+            1-0, 0-1, 1/2-1/2, or * for a game that was not finished.
+        """
+        return self.results.get(game, "*")
+
+    def moves(self, game):
+        """
+        Reads the moves of a game.
+
+        Args:
+            self: The instance of the GameLogReader object.
+            game: The game's number.
+
+        Returns:
+            A list of the moves packed by encode_move.
+        """
+        codes = []
+        for fen, offset, count in self.segments[game][1]:
+            codes.extend(struct.unpack_from(f"<{count}H", self.map, offset))
+        return codes
+
+    def position(self, game, ply):
+        """
+        Sets up the position of a game at a ply.
+
+        Args:
+            self: The instance of the GameLogReader object.
+            game: The game's number.
+            ply: The number of moves played.
+
+        Returns:
+            A Chess game in the position, reached by setting up the FEN of the segment holding the ply and replaying
+            at most one segment's moves.
+        """
+        plies, found = self.segments[game]
+        if not plies[0] <= ply <= self.plies(game):
+            raise ValueError(f"game {game} has no ply {ply}")
+        index = bisect.bisect_right(plies, ply) - 1
+        fen, offset, count = found[index]
+        position = Chess.from_fen(fen)
+        for code in struct.unpack_from(f"<{ply - plies[index]}H", self.map, offset):
+            move = position.decode_move(code)
+            if move is None:
+                raise ValueError(f"game {game} has a move that cannot be played in its position")
+            position.make_move(*move)
+        return position
+
+    def san_moves(self, game):
+        """
+        Writes out the moves of a game.
+
+        Args:
+            self: The instance of the GameLogReader object.
+            game: The game's number.
+
+        Returns:
+            A list of the moves in SAN, replayed from the position the game started from.
+        """
+        session = GameSession(Chess.from_fen(self.segments[game][1][0][0]))
+        for code in self.moves(game):
+            move = session.game.decode_move(code)
+            if move is None or session.play_move(move).status not in PLAYED:
+                raise ValueError(f"game {game} has a move that cannot be played in its position")
+        return session.moves
+
+
+def record_archive(source, path, checkpoint_interval=CHECKPOINT_INTERVAL):
+    """
+    Adds the games of a PGN archive to a log.
+
+    Args:
+        source: A path to a PGN file, or an open text file.
+        path: The log file, games are added after any already in it.
+        checkpoint_interval: Plies in each segment.
+
+    Returns:
+        The number of games added. A game stops at its first illegal move and keeps the result its PGN states.
+    """
+    count = 0
+    with GameLog(path, checkpoint_interval) as log:
+        for pgn_game in read_games(source):
+            try:
+                game = Chess(pgn_game.tags["FEN"]) if "FEN" in pgn_game.tags else Chess()
+            except ValueError:
+                continue
+            session = GameSession(game, log=log)
+            for san in pgn_game.moves:
+                if session.over or session.play_move(san).status not in PLAYED:
+                    break
+            log.end(session, pgn_game.result)
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gamelog", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="add the games of a PGN archive to a log")
+    record.add_argument("archive", help="the PGN file to read")
+    record.add_argument("log", help="the log file to add to")
+    record.add_argument("--checkpoint-interval", type=int, default=CHECKPOINT_INTERVAL,
+                        help="plies between the positions written")
+    info = commands.add_parser("info", help="count the games and moves of a log")
+    info.add_argument("log", help="the log file to read")
+    show = commands.add_parser("show", help="print a game's moves, or its position at a ply")
+    show.add_argument("log", help="the log file to read")
+    show.add_argument("game", type=int, help="the game's number")
+    show.add_argument("ply", type=int, nargs="?", help="the ply to show the position at")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        count = record_archive(args.archive, args.log, args.checkpoint_interval)
+        print(f"{count} games added to {args.log}")
+        return 0
+    with GameLogReader(args.log) as reader:
+        if args.command == "info":
+            plies = sum(reader.plies(game) for game in reader)
+            size = os.path.getsize(args.log)
+            print(f"{len(reader)} games, {plies} plies, {size} bytes ({size / plies if plies else 0:.2f} per ply)")
+            return 0
+        if args.game not in reader:
+            print(f"There is no game {args.game} in the log")
+            return 1
+        if args.ply is None:
+            print(" ".join(reader.san_moves(args.game)), reader.result(args.game))
+            return 0
+        try:
+            position = reader.position(args.game, args.ply)
+        except ValueError as e:
+            print(e)
+            return 1
+        print(position)
+        print(position.to_fen())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
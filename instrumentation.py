@@ -0,0 +1,316 @@
+"""
+Opt-in counters and timings for the rules engine's hot paths.
+
+Instrumenting a game wraps the primitives the rules are built from (can_move_to, move_to, is_checked, in_check,
+legal_moves, is_legal, is_checkmate, is_stalemate, any_valid_move, hint, and make_move/unmake_move, which took over
+from the old board snapshots) so every call is counted and timed, and every move played through a GameSession is
+timed as a turn (a move played without its end test, as the server does, is one turn together with the
+finish_move that completes it). Each turn's total and the time it spent in each primitive go into histograms, so a slow turn can be
+traced to the primitive it spent its time in (for example the checkmate test after a checking move, or the
+stalemate test after any other). A generator such as legal_moves is timed while it is being iterated over, and its
+call is recorded when it is finished with.
+
+The wrappers are only put on the classes while at least one game is instrumented, and taken off again when the last
+one stops or is garbage collected, so when nothing is measured the original methods run with no extra cost. While
+some game is measured the other games go through the wrappers too, which only look up the game's instruments
+before calling the original method.
+"""
+
+import functools
+import weakref
+from collections import namedtuple
+from time import perf_counter
+
+from ChessGame import Chess, GameSession, Piece, Pawn, Rook, Knight, Bishop, King, Queen
+
+# The methods timed, as (class, method name, how to get the game from the object the method is called on)
+PRIMITIVES = [(cls, "can_move_to", lambda piece: piece.game)
+              for cls in (Piece, Pawn, Rook, Knight, Bishop, King, Queen)]
+# Pawn.move_to goes through Piece.move_to, so wrapping Piece's alone counts every move once
+PRIMITIVES += [(Piece, "move_to", lambda piece: piece.game)]
+PRIMITIVES += [(Chess, name, lambda game: game)
+               for name in ("is_checked", "in_check", "legal_moves", "is_legal", "is_checkmate", "is_stalemate",
+                            "any_valid_move", "hint", "make_move", "unmake_move")]
+# The primitives that are generators, timed for as long as they are iterated over rather than when called
+GENERATORS = {"legal_moves"}
+
+# Histogram bucket n counts times from 2**(n-1) up to 2**n microseconds (bucket 0 is under a microsecond), the
+# last bucket holds everything slower
+BUCKETS = 32
+
+# What a callback is given after each turn: the game, the turn's number in the session, how long it took, and
+# {primitive: (calls, seconds)} for the primitives called during it
+TurnStats = namedtuple("TurnStats", ["game", "turn", "seconds", "primitives"])
+
+_instrumented = weakref.WeakKeyDictionary() # each game being measured -> the finalizer that stops measuring it
+_measured = 0 # how many games are measured, the wrappers are installed while it is not 0
+_originals = {} # (class, name) -> the method that was wrapped
+
+
+def bucket(seconds):
+    """
+    Finds the histogram bucket of a time.
+
+    Args:
+        seconds: The time in seconds.
+
+    Returns:
+        The bucket number, 0 for under a microsecond and one more for every doubling after that.
+    """
+    return min(BUCKETS - 1, int(seconds * 1_000_000).bit_length())
+
+
+class Instruments():
+
+    def __init__(self, callback=None):
+        """
+        Creates the counters of one game.
+
+        Args:
+            self: The instance of the Instruments object.
+            callback: An optional function called with a TurnStats after every turn.
+        """
+        self.callback = callback
+        self.calls = {}
+        self.seconds = {}
+        self.slowest = {}
+        self.turns = 0
+        self.turn_seconds = 0.0
+        self.turn_histogram = [0] * BUCKETS
+        # For each primitive, how many turns spent each bucket's worth of time in it
+        self.histograms = {}
+        # What the turn being played has called so far, None between turns
+        self.turn_calls = None
+        self.turn_times = None
+        # Time already spent on a turn that is waiting for its finish_move, None if no turn is waiting
+        self.turn_paused = None
+
+    def record(self, name, seconds):
+        """
+        Counts one call of a primitive.
+
+        Args:
+            self: The instance of the Instruments object.
+            name: The primitive's name.
+            seconds: How long the call took, including anything it called.
+        """
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        if seconds > self.slowest.get(name, 0.0):
+            self.slowest[name] = seconds
+        if self.turn_calls is not None:
+            self.turn_calls[name] = self.turn_calls.get(name, 0) + 1
+            self.turn_times[name] = self.turn_times.get(name, 0.0) + seconds
+
+    def start_turn(self):
+        """
+        Starts counting the primitives of a turn.
+
+        Args:
+            self: The instance of the Instruments object.
+
+        Returns:
+            False if a turn was already being counted (a turn inside a turn is part of the outer one), True
+            otherwise.
+        """
+        if self.turn_calls is not None:
+            return False
+        self.turn_calls = {}
+        self.turn_times = {}
+        return True
+
+    def pause_turn(self, seconds):
+        """
+        Keeps a turn open after its move was played without the end test, until finish_move completes it.
+
+        Args:
+            self: The instance of the Instruments object.
+            seconds: How long the turn has taken so far.
+        """
+        self.turn_paused = seconds
+
+    def end_turn(self, game, seconds):
+        """
+        Adds a finished turn to the histograms and passes it to the callback.
+
+        Args:
+            self: The instance of the Instruments object.
+            game: The Chess game the turn was played in.
+            seconds: How long the turn took.
+        """
+        calls, times = self.turn_calls, self.turn_times
+        self.turn_calls = self.turn_times = None
+        if self.turn_paused is not None:
+            seconds += self.turn_paused
+            self.turn_paused = None
+        self.turns += 1
+        self.turn_seconds += seconds
+        self.turn_histogram[bucket(seconds)] += 1
+        for name, spent in times.items():
+            self.histograms.setdefault(name, [0] * BUCKETS)[bucket(spent)] += 1
+        if self.callback is not None:
+            self.callback(TurnStats(game, self.turns, seconds,
+                                    {name: (calls[name], times[name]) for name in calls}))
+
+    def snapshot(self):
+        """
+        Copies the counters.
+
+        Args:
+            self: The instance of the Instruments object.
+
+        Returns:
+            A dictionary with the number of turns and their total seconds, {primitive: {"calls", "seconds", "max"}}
+            and the histograms of turn times and of each primitive's time per turn, as lists of BUCKETS counts.
+        """
+        return {
+            "turns": self.turns,
+            "turn_seconds": self.turn_seconds,
+            "primitives": {name: {"calls": self.calls[name], "seconds": self.seconds[name],
+                                  "max": self.slowest.get(name, 0.0)} for name in self.calls},
+            "histograms": {"turn": list(self.turn_histogram),
+                           **{name: list(counts) for name, counts in self.histograms.items()}},
+        }
+
+
+def timed(name, method, game_of):
+    # Wraps a primitive so calls on an instrumented game are counted, other games go straight to the original
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instruments = game_of(self).instruments
+        if instruments is None:
+            return method(self, *args, **kwargs)
+        start = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            instruments.record(name, perf_counter() - start)
+    return wrapper
+
+
+def timed_iteration(name, method, game_of):
+    # Wraps a generator so the time spent producing its items is counted as one call, when it is finished with
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instruments = game_of(self).instruments
+        if instruments is None:
+            return method(self, *args, **kwargs)
+        return iterate(instruments, name, method(self, *args, **kwargs))
+    return wrapper
+
+
+def iterate(instruments, name, items):
+    # Passes on the items of a generator, adding up the time it takes to make each of them
+    spent = 0.0
+    try:
+        while True:
+            start = perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                spent += perf_counter() - start
+            yield item
+    finally:
+        items.close()
+        instruments.record(name, spent)
+
+
+def timed_turn(method):
+    # Wraps GameSession.play_move so each move played is one turn
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        game = self.game
+        instruments = game.instruments
+        if instruments is None or not instruments.start_turn():
+            return method(self, *args, **kwargs)
+        start = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if self.unfinished is None:
+                instruments.end_turn(game, perf_counter() - start)
+            else:
+                # Played without its end test, the turn goes on until finish_move
+                instruments.pause_turn(perf_counter() - start)
+    return wrapper
+
+
+def timed_finish(method):
+    # Wraps GameSession.finish_move so the end test of a move is part of the turn that played it
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        game = self.game
+        instruments = game.instruments
+        if instruments is None or instruments.turn_paused is None:
+            return method(self, *args, **kwargs)
+        start = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            instruments.end_turn(game, perf_counter() - start)
+    return wrapper
+
+
+def install():
+    # Puts the wrappers on the classes, once however many games are instrumented
+    if _originals:
+        return
+    for cls, name, game_of in PRIMITIVES:
+        if name in cls.__dict__:
+            _originals[cls, name] = cls.__dict__[name]
+            wrap = timed_iteration if name in GENERATORS else timed
+            setattr(cls, name, wrap(name, cls.__dict__[name], game_of))
+    for name, wrap in (("play_move", timed_turn), ("finish_move", timed_finish)):
+        _originals[GameSession, name] = GameSession.__dict__[name]
+        setattr(GameSession, name, wrap(GameSession.__dict__[name]))
+
+
+def uninstall():
+    # Puts the original methods back
+    for (cls, name), method in _originals.items():
+        setattr(cls, name, method)
+    _originals.clear()
+
+
+def instrument(game, callback=None):
+    """
+    Starts measuring a game.
+
+    Args:
+        game: The Chess game.
+        callback: An optional function called with a TurnStats after every move played through a GameSession.
+
+    Returns:
+        The game's Instruments, its counters start from zero.
+    """
+    global _measured
+    game.instruments = Instruments(callback)
+    if game not in _instrumented:
+        # A game collected without being uninstrumented still stops being counted
+        _instrumented[game] = weakref.finalize(game, released)
+        _measured += 1
+    install()
+    return game.instruments
+
+
+def uninstrument(game):
+    """
+    Stops measuring a game. When no game is measured any more the original methods are put back.
+
+    Args:
+        game: The Chess game.
+    """
+    game.instruments = None
+    finalizer = _instrumented.pop(game, None)
+    if finalizer is not None:
+        finalizer()
+
+
+def released():
+    # One game fewer is measured, uninstrumented or garbage collected
+    global _measured
+    _measured -= 1
+    if not _measured:
+        uninstall()
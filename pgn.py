@@ -0,0 +1,264 @@
+"""
+Streaming PGN reader and parallel game replayer.
+
+Games are read one at a time from the archive, so files of any size can be processed, and every game is replayed
+move by move through GameSession, which checks each SAN move against the rules of the Chess engine. Games are
+sent to worker processes in chunks and the results come back in archive order or as soon as they are ready.
+
+Usage:
+    python -m pgn games.pgn [--workers N] [--chunk-size N] [--unordered] [--output results.jsonl]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from ChessGame import Chess, GameSession, OK, CHECK, CHECKMATE, STALEMATE, WHITE
+
+# A game as read from the archive: its position in the file, its tag pairs, its SAN moves and the result it states
+PgnGame = namedtuple("PgnGame", ["index", "tags", "moves", "result"])
+
+# The outcome of replaying a game: whether every move was legal, how many were played, the position reached (as a
+# FEN) and, for an invalid game, what went wrong
+ReplayResult = namedtuple("ReplayResult", ["index", "tags", "valid", "plies", "fen", "error"])
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+TAG = re.compile(r'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Comments, variations, NAGs, move numbers, results and moves, in that order of preference
+TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|1-0|0-1|1/2-1/2|\*|\d+\.+|[^\s{}();$.]+")
+
+# Statuses of GameSession.play_move for a move that was played
+PLAYED = (OK, CHECK, CHECKMATE, STALEMATE)
+
+
+def read_games(source):
+    """
+    Reads games from a PGN archive one at a time.
+
+    Args:
+        source: A path to a PGN file, or an open text file (or any iterable of lines).
+
+    Returns:
+        A generator of PgnGame tuples. Only the game being read is held in memory. Comments, variations, NAGs and
+        move numbers are dropped, so the moves are the bare SAN of the main line.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8", errors="replace") as file:
+            yield from read_games(file)
+        return
+
+    index = 0
+    tags = {}
+    movetext = []
+    in_comment = False
+    for line in source:
+        line = line.strip()
+        if not line or line.startswith("%"):
+            continue
+        if not in_comment and line.startswith("["):
+            tag = TAG.match(line)
+            if tag:
+                # A tag after moves starts the next game (the last one had no result)
+                if movetext:
+                    yield parse_game(index, tags, movetext)
+                    index += 1
+                    tags = {}
+                    movetext = []
+                tags[tag.group(1)] = tag.group(2).replace('\\"', '"').replace("\\\\", "\\")
+                continue
+        movetext.append(line)
+        # Brace comments can run over several lines, and a result inside one does not end the game
+        opened, closed = line.rfind("{"), line.rfind("}")
+        in_comment = opened > closed or (in_comment and closed < 0)
+        if not in_comment and line.split()[-1] in RESULTS:
+            yield parse_game(index, tags, movetext)
+            index += 1
+            tags = {}
+            movetext = []
+    if tags or movetext:
+        yield parse_game(index, tags, movetext)
+
+
+def parse_game(index, tags, movetext):
+    """
+    Pulls the main line moves and the result out of a game's movetext.
+
+    Args:
+        index: The position of the game in the archive, counting from 0.
+        tags: The game's tag pairs as a dictionary.
+        movetext: The lines of the game after its tags.
+
+    Returns:
+        A PgnGame. The result is the result token at the end of the moves, or the Result tag if there is none.
+    """
+    moves = []
+    result = tags.get("Result", "*")
+    depth = 0 # how deep inside variations the current token is
+    for token in TOKEN.findall("\n".join(movetext)):
+        first = token[0]
+        if first in "{;$" or first.isdigit() and token.endswith("."):
+            continue
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(0, depth - 1)
+        elif depth:
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return PgnGame(index, tags, moves, result)
+
+
+def replay_game(game):
+    """
+    Replays a game through the rules engine.
+
+    Args:
+        game: A PgnGame. A game with a FEN tag starts from that position, otherwise from the normal start.
+
+    Returns:
+        A ReplayResult. The game is invalid if its FEN cannot be read, a move is illegal or cannot be read, moves
+        carry on after checkmate or stalemate, or it ends in checkmate or stalemate but states another result.
+    """
+    try:
+        session = GameSession(Chess.from_fen(game.tags["FEN"]) if "FEN" in game.tags else None)
+    except ValueError as e:
+        return ReplayResult(game.index, game.tags, False, 0, None, str(e))
+
+    error = None
+    for ply, san in enumerate(game.moves, start=1):
+        result = session.play_move(san)
+        if result.status not in PLAYED:
+            number = (session.game.turn_number + 1) // 2
+            error = f"move {number}{'.' if session.game.white_turn else '...'} {san}: {result.message}"
+            break
+    if error is None and session.winner is not None and game.result in ("1-0", "0-1", "1/2-1/2"):
+        stated = "1-0" if session.winner == WHITE else "0-1"
+        if game.result != stated:
+            error = f"the game ends in checkmate ({stated}) but its result is {game.result}"
+    if error is None and session.draw and game.result in ("1-0", "0-1"):
+        error = f"the game ends in stalemate (1/2-1/2) but its result is {game.result}"
+    return ReplayResult(game.index, game.tags, error is None, len(session.moves), session.game.to_fen(), error)
+
+
+def replay_chunk(games):
+    """
+    Replays a list of games, the unit of work sent to each worker process.
+
+    Args:
+        games: A list of PgnGame tuples.
+
+    Returns:
+        A list of ReplayResult tuples in the same order.
+    """
+    return [replay_game(game) for game in games]
+
+
+def chunked(games, chunk_size):
+    """
+    Groups games into lists.
+
+    Args:
+        games: An iterable of games.
+        chunk_size: The most games in each list.
+
+    Returns:
+        A generator of lists, reading no further ahead than the list being built.
+    """
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_archive(source, workers=None, chunk_size=64, ordered=True):
+    """
+    Replays every game of a PGN archive across several processes.
+
+    Args:
+        source: A path to a PGN file, or an open text file.
+        workers: The number of worker processes, one per CPU if not given. With 1 the games are replayed in this
+            process.
+        chunk_size: How many games are sent to a worker at a time. Bigger chunks cost less to send, smaller ones
+            share the work out more evenly.
+        ordered: True to get the results in archive order, False to get each chunk's results as soon as they are
+            ready.
+
+    Returns:
+        A generator of ReplayResult tuples, one for each game. Only a few chunks per worker are read ahead of the
+        results, so memory use does not grow with the size of the archive.
+    """
+    chunks = chunked(read_games(source), chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield from replay_chunk(chunk)
+        return
+
+    limit = 2 * workers # chunks in flight, enough to keep every worker busy
+    with ProcessPoolExecutor(workers) as executor:
+        if ordered:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(replay_chunk, chunk))
+                if len(pending) >= limit:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(replay_chunk, chunk))
+                if len(pending) >= limit:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pgn", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("archive", help="the PGN file to check")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="games sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true", help="report games as they finish")
+    parser.add_argument("--output", help="write one JSON line per game to this file")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w") if args.output else None
+    games = invalid = 0
+    start = time.perf_counter()
+    try:
+        for result in replay_archive(args.archive, args.workers, args.chunk_size, not args.unordered):
+            games += 1
+            if not result.valid:
+                invalid += 1
+                print(f"game {result.index + 1} ({result.tags.get('White', '?')} - {result.tags.get('Black', '?')}): "
+                      f"{result.error}")
+            if out:
+                out.write(json.dumps(result._asdict()) + "\n")
+    finally:
+        if out:
+            out.close()
+    seconds = time.perf_counter() - start
+    print(f"{games} games, {games - invalid} valid, {invalid} invalid in {seconds:.3f}s "
+          f"({games / seconds if seconds else 0:.1f} games/s)")
+    return 0 if invalid == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""
+Asyncio game server hosting many games of chess over TCP in one event loop.
+
+Clients talk to it one line at a time. A connection plays one game at a time:
+
+    NEW [white|black]   start a game and wait for an opponent   -> GAME <id> <colour>
+    JOIN <id>           take the free side of a waiting game    -> GAME <id> <colour>, then START <id> to both
+    MOVE <move>         play a move, in SAN or coordinates      -> MOVED <san> <fen> to both players
+    MOVES               list the legal moves                    -> MOVES <san> ... (without + or #)
+    FEN                 get the position                        -> FEN <fen>
+    RESIGN              give the game up
+    WATCH <id>          follow a game as a spectator            -> KEYFRAME, then DELTA after each move
+    UNWATCH <id>        stop following it
+    QUIT                close the connection
+
+A game ends with OVER <result> <reason> to both players: checkmate, stalemate, resignation, timeout (a player who
+does not move within the move timeout loses) or disconnect (a player who leaves a game in progress loses it).
+Spectators, who may follow any number of games, are sent compact per move deltas instead (see spectators.py) and
+OVER <id> <result> <reason> at the end, with * abandoned for a game closed before it started.
+Errors are answered with ERROR <message>. Moves are checked in the event loop, but the checkmate and stalemate tests
+after each move run in a process pool so a slow one does not hold up the other games (if the pool fails they are
+run in the event loop instead).
+
+Usage:
+    python -m server [--host HOST] [--port PORT] [--move-timeout SECONDS] [--workers N]
+"""
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from ChessGame import Chess, GameSession, WHITE, BLACK, OK, CHECK
+from spectators import Audience
+
+# Results of a finished game, by the team that won (None for a draw)
+RESULTS = {WHITE: "1-0", BLACK: "0-1", None: "1/2-1/2"}
+COLOURS = {"white": WHITE, "black": BLACK}
+
+
+def game_end(fen):
+    """
+    Finds out whether a position is the end of the game, the work sent to the process pool after each move.
+
+    Args:
+        fen: The position as a FEN string.
+
+    Returns:
+        A (checkmate, stalemate) pair for the team whose turn it is.
+    """
+    game = Chess.from_fen(fen)
+    team = game.team_to_move()
+    in_check = game.in_check(team)
+    return in_check and game.is_checkmate(team), not in_check and game.is_stalemate(team)
+
+
+def end_test_pool(workers=None):
+    """
+    Creates the process pool for the end of game tests.
+
+    Args:
+        workers: The number of processes, one per CPU if not given.
+
+    Returns:
+        A ProcessPoolExecutor whose processes are started fresh rather than forked, so they do not hold copies of
+        the clients' sockets (a forked copy would keep a connection open after the server closes it).
+    """
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class HostedGame():
+    """
+    A game on the server: its session, the connections playing each side and watching it, and the clock of the move
+    being waited for.
+    """
+
+    def __init__(self, number):
+        self.number = number
+        self.session = GameSession()
+        self.players = {WHITE: None, BLACK: None}
+        self.audience = Audience(number)
+        # Held while a move is being played and its end tested, so moves are played one at a time
+        self.lock = asyncio.Lock()
+        self.timer = None
+        self.over = False
+
+    @property
+    def started(self):
+        return self.players[WHITE] is not None and self.players[BLACK] is not None
+
+
+class Connection():
+    """
+    One client's connection, the game it is playing and the games it is watching.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.game = None
+        self.team = None
+        self.watching = set()
+
+    @property
+    def closing(self):
+        return self.writer.is_closing()
+
+    @property
+    def backlog(self):
+        # Bytes written to the connection that have not been sent yet
+        return self.writer.transport.get_write_buffer_size()
+
+    def write(self, data):
+        """
+        Queues bytes to the client, so one encoded update can be written to many clients.
+
+        Args:
+            self: The instance of the Connection object.
+            data: The bytes, ending with a newline.
+        """
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def send(self, line):
+        """
+        Queues a line to the client.
+
+        Args:
+            self: The instance of the Connection object.
+            line: The line without its newline.
+        """
+        self.write(line.encode() + b"\n")
+
+
+class GameServer():
+
+    def __init__(self, move_timeout=60.0, executor=None):
+        """
+        Creates a server.
+
+        Args:
+            self: The instance of the GameServer object.
+            move_timeout: Seconds a player has for each move before losing the game on time, None for no limit.
+            executor: The executor the end of game tests run in, a process pool with one process per CPU if not
+                given.
+        """
+        self.move_timeout = move_timeout
+        self.executor = executor if executor is not None else end_test_pool()
+        self.games = {}
+        self.numbers = itertools.count(1)
+        self.connections = set()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """
+        Starts listening for clients.
+
+        Args:
+            self: The instance of the GameServer object.
+            host: The address to listen on.
+            port: The port to listen on, 0 for any free port.
+
+        Returns:
+            The asyncio Server, whose sockets give the address it listens on.
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        """
+        Serves one client until it quits or disconnects.
+
+        Args:
+            self: The instance of the GameServer object.
+            reader: The connection's StreamReader.
+            writer: The connection's StreamWriter.
+        """
+        connection = Connection(reader, writer)
+        self.connections.add(connection)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                words = line.decode(errors="replace").split()
+                if not words:
+                    continue
+                if words[0].upper() == "QUIT":
+                    break
+                await self.command(connection, words[0].upper(), words[1:])
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(connection)
+            self.leave(connection, "disconnect")
+            for watched in connection.watching:
+                watched.audience.leave(connection)
+            connection.watching.clear()
+            writer.close()
+
+    async def command(self, connection, name, args):
+        """
+        Carries out one command from a client.
+
+        Args:
+            self: The instance of the GameServer object.
+            connection: The Connection it came from.
+            name: The command, in capitals.
+            args: The words after it.
+        """
+        game = connection.game
+        if name == "NEW":
+            colour = COLOURS.get(args[0].lower()) if args else WHITE
+            if colour is None:
+                connection.send("ERROR the colour must be white or black")
+            elif game is not None:
+                connection.send("ERROR already in a game")
+            else:
+                game = HostedGame(next(self.numbers))
+                self.games[game.number] = game
+                self.seat(connection, game, colour)
+        elif name == "JOIN":
+            joined = self.games.get(int(args[0])) if args and args[0].isdigit() else None
+            if game is not None:
+                connection.send("ERROR already in a game")
+            elif joined is None or joined.started:
+                connection.send("ERROR no such game waiting for a player")
+            else:
+                self.seat(connection, joined, WHITE if joined.players[WHITE] is None else BLACK)
+                for player in joined.players.values():
+                    player.send(f"START {joined.number}")
+                self.start_clock(joined)
+        elif name in ("WATCH", "UNWATCH"):
+            self.watch(connection, name == "WATCH", args)
+        elif game is None:
+            connection.send("ERROR not in a game")
+        elif name == "MOVE":
+            await self.move(connection, " ".join(args))
+        elif name == "MOVES":
+            # Without the check suffixes, which would mean trying every move here in the event loop
+            board = game.session.game
+            connection.send(" ".join(["MOVES"] + [board.san(move, suffix=False) for move in board.legal_moves()]))
+        elif name == "FEN":
+            connection.send(f"FEN {game.session.game.to_fen()}")
+        elif name == "RESIGN":
+            self.leave(connection, "resignation")
+        else:
+            connection.send(f"ERROR unknown command {name}")
+
+    def seat(self, connection, game, colour):
+        # Puts a connection on one side of a game
+        game.players[colour] = connection
+        connection.game = game
+        connection.team = colour
+        connection.send(f"GAME {game.number} {colour.lower()}")
+
+    def watch(self, connection, start, args):
+        """
+        Starts or stops a connection following a game as a spectator.
+
+        Args:
+            self: The instance of the GameServer object.
+            connection: The Connection of the spectator.
+            start: True to start watching, False to stop.
+            args: The words after the command, the game's number.
+        """
+        game = self.games.get(int(args[0])) if args and args[0].isdigit() else None
+        if game is None:
+            connection.send("ERROR no such game")
+        elif not start:
+            game.audience.leave(connection)
+            connection.watching.discard(game)
+        elif connection not in game.audience:
+            session = game.session
+            game.audience.join(connection, len(session.moves), session.game.to_fen())
+            connection.watching.add(game)
+
+    async def move(self, connection, text):
+        """
+        Plays a move for a client, and ends the game if it was the last.
+
+        Args:
+            self: The instance of the GameServer object.
+            connection: The Connection of the player.
+            text: The move.
+        """
+        game = connection.game
+        if not game.started:
+            connection.send("ERROR the game has not started")
+            return
+        async with game.lock:
+            session = game.session
+            if game.over or session.game.team_to_move() != connection.team:
+                connection.send("ERROR it is not your turn")
+                return
+            result = session.play_move(text, detect_end=False)
+            if result.status not in (OK, CHECK):
+                connection.send(f"ERROR {result.message.splitlines()[0]}")
+                return
+            fen = session.game.to_fen()
+            try:
+                checkmate, stalemate = await asyncio.get_running_loop().run_in_executor(self.executor, game_end, fen)
+            except Exception:
+                # The pool failed (a worker died and broke it, or it was shut down), test the end here instead so
+                # the move is still finished
+                checkmate, stalemate = game_end(fen)
+            result = session.finish_move(checkmate, stalemate)
+            if game.over:
+                # The other player left while the end was being tested
+                return
+            for player in game.players.values():
+                player.send(f"MOVED {result.san} {fen}")
+            game.audience.move(len(session.moves), result, fen)
+            if result.checkmate:
+                self.finish(game, result.winner, "checkmate")
+            elif result.stalemate:
+                self.finish(game, None, "stalemate")
+            else:
+                self.start_clock(game)
+
+    def start_clock(self, game):
+        # Gives the player to move move_timeout seconds, cancelling the last player's clock
+        if game.timer is not None:
+            game.timer.cancel()
+        if self.move_timeout is not None:
+            team = game.session.game.team_to_move()
+            game.timer = asyncio.get_running_loop().call_later(self.move_timeout, self.time_out, game, team,
+                                                               len(game.session.moves))
+
+    def time_out(self, game, team, plies):
+        # The clock ran out, unless the move was played (or is being played) just in time
+        if game.over or len(game.session.moves) != plies or game.session.unfinished is not None:
+            return
+        self.finish(game, BLACK if team == WHITE else WHITE, "timeout")
+
+    def leave(self, connection, reason):
+        """
+        Takes a connection out of its game. Leaving a game in progress loses it, leaving a game still waiting for
+        an opponent closes it.
+
+        Args:
+            self: The instance of the GameServer object.
+            connection: The Connection leaving.
+            reason: Why, resignation or disconnect.
+        """
+        game = connection.game
+        if game is None:
+            return
+        if game.started and not game.over:
+            self.finish(game, BLACK if connection.team == WHITE else WHITE, reason)
+        else:
+            self.games.pop(game.number, None)
+            connection.game = None
+            if not game.started:
+                self.dismiss(game, "*", "abandoned")
+
+    def finish(self, game, winner, reason):
+        """
+        Ends a game and tells both players and its spectators.
+
+        Args:
+            self: The instance of the GameServer object.
+            game: The HostedGame.
+            winner: The team that won, None for a draw.
+            reason: How the game ended.
+        """
+        game.over = True
+        if game.timer is not None:
+            game.timer.cancel()
+            game.timer = None
+        self.games.pop(game.number, None)
+        for player in game.players.values():
+            if player is not None:
+                player.send(f"OVER {RESULTS[winner]} {reason}")
+                player.game = None
+        self.dismiss(game, RESULTS[winner], reason)
+
+    def dismiss(self, game, result, reason):
+        # Tells a game's spectators it is over and stops them watching it
+        audience = game.audience
+        audience.broadcast(f"OVER {game.number} {result} {reason}")
+        for connection in audience.spectators:
+            connection.watching.discard(game)
+        audience.spectators.clear()
+
+    def close(self):
+        """
+        Shuts the executor down once the server has stopped.
+
+        Args:
+            self: The instance of the GameServer object.
+        """
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def serve(host, port, move_timeout, workers):
+    game_server = GameServer(move_timeout, end_test_pool(workers))
+    server = await game_server.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving games on {address[0]}:{address[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m server", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="the address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="the port to listen on")
+    parser.add_argument("--move-timeout", type=float, default=60.0, help="seconds allowed for each move")
+    parser.add_argument("--workers", type=int, default=None, help="processes for end of game tests")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.move_timeout, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
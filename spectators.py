@@ -0,0 +1,170 @@
+"""
+Compact updates of a hosted game for the clients watching it.
+
+A spectator is not sent the board after every move, only what changed:
+
+    DELTA <id> <ply> <move> <flags>     the move as from and to squares with the promotion letter (e2e4, e7e8q)
+                                        and its flags: x capture, o castling, + check, # checkmate, = stalemate,
+                                        or - for none
+    KEYFRAME <id> <ply> <fen>           the whole position, to start from or to catch up with
+
+A spectator is sent a keyframe when it starts watching, and every keyframe_interval plies everyone watching is
+sent one as well, so a client that lost track (or fell so far behind it was skipped) can sync again. Each update
+is encoded once and the same bytes are written to every spectator.
+"""
+
+from ChessGame import I_FILES
+
+# Plies between the keyframes sent to everyone watching
+KEYFRAME_INTERVAL = 16
+# Bytes a spectator may have waiting to be sent before its deltas are skipped until the next keyframe
+MAX_BACKLOG = 64 * 1024
+
+# Coordinate letter of each promotion choice (a knight is K in this game, n in coordinates)
+PROMOTION_LETTERS = {"Q": "q", "R": "r", "B": "b", "K": "n"}
+
+
+def encode_delta(number, ply, result):
+    """
+    Encodes one move of a game as a delta.
+
+    Args:
+        number: The game's number.
+        ply: The number of moves played, counting this one.
+        result: The finished MoveResult of the move.
+
+    Returns:
+        The DELTA line as bytes, with its newline.
+    """
+    move = result.move
+    start_file, start_rank = result.start
+    text = f"{I_FILES[start_file]}{start_rank}{I_FILES[move.file]}{move.rank}".lower()
+    if move.promotion is not None:
+        text += PROMOTION_LETTERS[move.promotion.upper()]
+    flags = ""
+    if "x" in result.san:
+        flags += "x"
+    if result.san.startswith("O-O"):
+        flags += "o"
+    if result.checkmate:
+        flags += "#"
+    elif result.check:
+        flags += "+"
+    elif result.stalemate:
+        flags += "="
+    return f"DELTA {number} {ply} {text} {flags or '-'}\n".encode()
+
+
+def encode_keyframe(number, ply, fen):
+    """
+    Encodes the position of a game as a keyframe.
+
+    Args:
+        number: The game's number.
+        ply: The number of moves played.
+        fen: The position as a FEN string.
+
+    Returns:
+        The KEYFRAME line as bytes, with its newline.
+    """
+    return f"KEYFRAME {number} {ply} {fen}\n".encode()
+
+
+class Audience():
+    """
+    The connections watching one game, and the keyframe they join from.
+    """
+
+    def __init__(self, number, keyframe_interval=KEYFRAME_INTERVAL, max_backlog=MAX_BACKLOG):
+        """
+        Creates an empty audience.
+
+        Args:
+            self: The instance of the Audience object.
+            number: The number of the game being watched.
+            keyframe_interval: Plies between the keyframes sent to everyone.
+            max_backlog: Bytes a spectator may have queued before it is skipped until the next keyframe.
+        """
+        self.number = number
+        self.keyframe_interval = keyframe_interval
+        self.max_backlog = max_backlog
+        # Spectator connection -> whether it has every delta since its last keyframe
+        self.spectators = {}
+        # The encoded keyframe of the last position, shared by everyone who joins before the next move
+        self.keyframe = None
+        self.keyframe_ply = None
+
+    def __len__(self):
+        return len(self.spectators)
+
+    def __contains__(self, connection):
+        return connection in self.spectators
+
+    def current_keyframe(self, ply, fen):
+        # Encodes the position once per ply, however many spectators are sent it
+        if self.keyframe_ply != ply:
+            self.keyframe = encode_keyframe(self.number, ply, fen)
+            self.keyframe_ply = ply
+        return self.keyframe
+
+    def join(self, connection, ply, fen):
+        """
+        Adds a spectator and sends it the position to start from.
+
+        Args:
+            self: The instance of the Audience object.
+            connection: The spectator's Connection.
+            ply: The number of moves played so far.
+            fen: The position as a FEN string.
+        """
+        self.spectators[connection] = True
+        connection.write(self.current_keyframe(ply, fen))
+
+    def leave(self, connection):
+        """
+        Removes a spectator, if it was watching.
+
+        Args:
+            self: The instance of the Audience object.
+            connection: The spectator's Connection.
+        """
+        self.spectators.pop(connection, None)
+
+    def move(self, ply, result, fen):
+        """
+        Sends a move to everyone watching, and a keyframe as well every keyframe_interval plies.
+
+        Args:
+            self: The instance of the Audience object.
+            ply: The number of moves played, counting this one.
+            result: The finished MoveResult of the move.
+            fen: The position after it as a FEN string.
+        """
+        if not self.spectators:
+            return
+        delta = encode_delta(self.number, ply, result)
+        keyframe = self.current_keyframe(ply, fen) if ply % self.keyframe_interval == 0 else None
+        update = delta if keyframe is None else delta + keyframe
+        for connection, synced in list(self.spectators.items()):
+            if connection.closing:
+                del self.spectators[connection]
+            elif connection.backlog > self.max_backlog:
+                # Too slow to keep up, the deltas it misses are made up for by the next keyframe
+                self.spectators[connection] = False
+            elif synced:
+                connection.write(update)
+            elif keyframe is not None:
+                connection.write(keyframe)
+                self.spectators[connection] = True
+
+    def broadcast(self, line):
+        """
+        Sends a line to everyone watching.
+
+        Args:
+            self: The instance of the Audience object.
+            line: The line without its newline.
+        """
+        data = line.encode() + b"\n"
+        for connection in self.spectators:
+            connection.write(data)
@@ -0,0 +1,640 @@
+"""
+Endgame tablebases for a lone King against a King and one or two pieces, built by retrograde analysis.
+
+A table holds every placement of its pieces with either side to move, one byte per position. The position's index
+is its side to move (0 when the strong side moves) followed by the squares of the strong King, the lone King and
+the strong side's other pieces, read as digits in base 64. The tables are always built with White as the strong
+side; a position where Black has the pieces is looked up with the board turned around (every square ^ 56).
+
+Each table file holds two byte arrays of that size, one after the other: the result for the side to move (ILLEGAL,
+LOSS, DRAW or WIN) and the number of plies to mate (DTM) for a won or lost position. Probing maps the file and
+reads two bytes, so nothing is loaded into memory and processes using the same tables share them.
+
+Tables are built by working outwards from the mates one ply at a time: a position is won once one of its moves
+reaches a lost position, and lost once every one of its moves reaches a won position. What is never reached is a
+draw. Building needs NumPy; every ply is worked out for slices of the index space (by the strong King's square)
+that can run in separate processes. Probing does not need NumPy.
+
+Usage:
+    python -m tablebase generate DIRECTORY [--tables KQK KPK ...] [--workers N]
+    python -m tablebase probe DIRECTORY FEN
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError: # only building tables needs NumPy
+    np = None
+
+from bitboard import (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE_INDEX, KNIGHT_TARGETS, KING_TARGETS,
+                      PAWN_TARGETS, ROOK_REACH, BISHOP_REACH, QUEEN_REACH, BETWEEN, iter_squares)
+
+# The strong side's pieces besides its King in each table, in the order their squares are indexed. Tables are
+# built in this order, so a table a pawn promotes into is built before it.
+TABLES = {"KQK": (QUEEN,), "KRK": (ROOK,), "KPK": (PAWN,), "KBNK": (BISHOP, KNIGHT)}
+# The tables a pawn promoting to each kind moves into, the pawn's square becomes the new piece's square. The lone
+# King cannot win, so every other promotion leads to a draw.
+PROMOTION_TABLES = {"KPK": {QUEEN: "KQK", ROOK: "KRK"}}
+MAX_PIECES = 2 + max(len(pieces) for pieces in TABLES.values())
+
+# Results stored for the side to move
+ILLEGAL, LOSS, DRAW, WIN = range(4)
+NO_MATE = 255 # the exit value of a position with no move into a lost position in another table
+
+# Flags worked out once for every position before the plies are counted
+HAS_MOVE = 1 # the side to move has a legal move
+DRAW_EXIT = 2 # the side to move can reach a draw by leaving the table (a capture or an under-promotion)
+
+# A probed position: 1 if the side to move wins, 0 for a draw and -1 if it loses, and the plies to mate
+TablebaseResult = namedtuple("TablebaseResult", ["wdl", "dtm"])
+
+
+def table_size(name):
+    """
+    Counts the positions of a table.
+
+    Args:
+        name: The table name, a key of TABLES.
+
+    Returns:
+        The number of positions, both sides to move and every placement of the pieces (legal or not).
+    """
+    return 2 * 64 ** (2 + len(TABLES[name]))
+
+
+def table_index(strong_to_move, squares):
+    """
+    Works out the index of a position in a table.
+
+    Args:
+        strong_to_move: True if the side with the pieces is to move.
+        squares: The squares of the strong King, the lone King and the other pieces in table order, seen with the
+            strong side as White.
+
+    Returns:
+        The position's index in the table's byte arrays.
+    """
+    index = 0 if strong_to_move else 1
+    for square in squares:
+        index = index * 64 + square
+    return index
+
+
+class Tablebases():
+
+    def __init__(self, directory):
+        """
+        Opens the tables in a directory for probing.
+
+        Args:
+            self: The instance of the Tablebases object.
+            directory: The directory holding the table files (KQK.tb and so on). Each table is mapped the first
+                time a position needs it, and tables that are not there are skipped.
+        """
+        self.directory = os.fspath(directory)
+        self.tables = {}
+        self.materials = {tuple(sorted(pieces)): name for name, pieces in TABLES.items()}
+        self.probes = 0
+        self.hits = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __reduce__(self):
+        # Sent to another process as its directory, so each process maps the files instead of being sent a copy
+        return (Tablebases, (self.directory,))
+
+    def close(self):
+        """
+        Unmaps and closes every table opened so far.
+
+        Args:
+            self: The instance of the Tablebases object.
+        """
+        for table in self.tables.values():
+            if table is not None:
+                table[1].close()
+                table[0].close()
+        self.tables = {}
+
+    def table(self, name):
+        """
+        Maps a table file.
+
+        Args:
+            self: The instance of the Tablebases object.
+            name: The table name, a key of TABLES.
+
+        Returns:
+            The read-only memory map of the table, or None if its file is not in the directory. Raises ValueError
+            if the file is not the size of the table.
+        """
+        if name not in self.tables:
+            path = os.path.join(self.directory, name + ".tb")
+            if not os.path.exists(path):
+                self.tables[name] = None
+                return None
+            file = open(path, "rb")
+            if os.fstat(file.fileno()).st_size != 2 * table_size(name):
+                file.close()
+                raise ValueError(f"{path} is not a {name} table")
+            self.tables[name] = (file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        table = self.tables[name]
+        return table[1] if table is not None else None
+
+    def probe(self, game):
+        """
+        Looks up the position of a game.
+
+        Args:
+            self: The instance of the Tablebases object.
+            game: The Chess game.
+
+        Returns:
+            A TablebaseResult for the team whose turn it is, or None if there is no table for the position (other
+            material, castling still possible, or the table file is missing). The fifty move rule is not counted.
+        """
+        bitboards = game.bitboards
+        pieces = bitboards.pieces
+        if bin(bitboards.occupied).count("1") > MAX_PIECES:
+            return None
+        self.probes += 1
+        kinds = ([], [])
+        for code in range(12):
+            if code % 6 != KING:
+                kinds[code // 6].extend([code % 6] * bin(pieces[code]).count("1"))
+        if kinds[1] and not kinds[0]:
+            strong, flip = 1, 56
+        elif kinds[0] and not kinds[1]:
+            strong, flip = 0, 0
+        else:
+            return None
+        name = self.materials.get(tuple(sorted(kinds[strong])))
+        if name is None or game.castling_rights():
+            return None
+        table = self.table(name)
+        if table is None:
+            return None
+        squares = [(pieces[strong * 6 + KING].bit_length() - 1) ^ flip,
+                   (pieces[(1 - strong) * 6 + KING].bit_length() - 1) ^ flip]
+        squares.extend((pieces[strong * 6 + kind].bit_length() - 1) ^ flip for kind in TABLES[name])
+        index = table_index(game.white_turn == (strong == WHITE_INDEX), squares)
+        result = table[index]
+        if result == ILLEGAL:
+            return None
+        self.hits += 1
+        return TablebaseResult(result - DRAW, table[table_size(name) + index])
+
+    def best_move(self, game):
+        """
+        Picks the best move of a position in the tables.
+
+        Args:
+            self: The instance of the Tablebases object.
+            game: The Chess game, the team whose turn it is moves. It is left as it was.
+
+        Returns:
+            A (Move, TablebaseResult) pair, the result being that of the position before the move: the quickest
+            mate when winning, the slowest when losing, and a move that keeps the draw otherwise. None if the
+            position is not in the tables or has no legal moves.
+        """
+        result = self.probe(game)
+        if result is None:
+            return None
+        best = None
+        best_score = None
+        for move in game.legal_moves():
+            record = game.make_move(move.piece, move.file, move.rank, move.promotion)
+            # Moves out of the tables (captures of the last pieces, under-promotions) are draws
+            after = self.probe(game) or TablebaseResult(0, 0)
+            game.unmake_move(record)
+            # The opponent's result, turned round and ordered so that quicker wins and slower losses come first
+            if after.wdl < 0:
+                score = (2, -after.dtm)
+            elif after.wdl == 0:
+                score = (1, 0)
+            else:
+                score = (0, after.dtm)
+            if best_score is None or score > best_score:
+                best, best_score = move, score
+        return (best, result) if best is not None else None
+
+
+def require_numpy():
+    """
+    Checks that NumPy can be used.
+
+    Returns:
+        Raises an ImportError explaining that building tables needs NumPy if it is not installed.
+    """
+    if np is None:
+        raise ImportError("building tablebases needs NumPy, install it with: pip install numpy")
+
+
+def _reach_tables():
+    # Empty board reach of each kind from square to square, the pawn's being its captures as White
+    def table(targets):
+        reach = np.zeros((64, 64), dtype=bool)
+        for square in range(64):
+            reach[square, list(iter_squares(targets[square]))] = True
+        return reach
+    reach = {KNIGHT: table(KNIGHT_TARGETS), BISHOP: table(BISHOP_REACH), ROOK: table(ROOK_REACH),
+             QUEEN: table(QUEEN_REACH), KING: table(KING_TARGETS), PAWN: table(PAWN_TARGETS[WHITE_INDEX])}
+    between = np.zeros((64, 64, 64), dtype=bool)
+    for a in range(64):
+        for b in range(64):
+            between[a, b, list(iter_squares(BETWEEN[a][b]))] = True
+    return reach, between
+
+if np is not None:
+    REACH, BETWEEN_SQUARES = _reach_tables()
+
+
+class Layout():
+    """
+    The shape of a table's index space, with helpers for working on one slice of it at a time.
+
+    Square axes are numbered without the side to move: 0 is the strong King, 1 the lone King and 2 onwards the
+    strong side's other pieces.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.pieces = TABLES[name]
+        self.axes = 2 + len(self.pieces)
+        self.kinds = (KING, KING) + self.pieces
+        self.shape = (2,) + (64,) * self.axes
+        self.strong_axes = [axis for axis in range(self.axes) if axis != 1]
+        self.moves = self.move_list()
+
+    def move_list(self):
+        """
+        Lists every move a piece of the table could make on an empty board.
+
+        Args:
+            self: The instance of the Layout object.
+
+        Returns:
+            A list of (axis, start, target, path, promotion) tuples: the axis of the piece moving, its squares, the
+            squares that must be empty between them, and whether it is a pawn reaching the last rank.
+        """
+        moves = []
+        for axis, kind in enumerate(self.kinds):
+            for start in range(64):
+                if kind == PAWN:
+                    if not 8 <= start < 56:
+                        continue
+                    moves.append((axis, start, start + 8, (), start + 8 >= 56))
+                    if start < 16:
+                        moves.append((axis, start, start + 16, (start + 8,), False))
+                    continue
+                for target in np.flatnonzero(REACH[kind][start]):
+                    path = tuple(np.flatnonzero(BETWEEN_SQUARES[start, target]))
+                    moves.append((axis, start, int(target), path, False))
+        return moves
+
+    def coordinates(self, kings, fixed):
+        """
+        Builds the square of every axis over part of a slice.
+
+        Args:
+            self: The instance of the Layout object.
+            kings: The strong King squares of the slice, an array.
+            fixed: A dictionary of the axes held at one square.
+
+        Returns:
+            A list with each axis's square: an int for a fixed axis, otherwise an array along its own dimension,
+            so that together they broadcast over the axes that are not fixed, in order.
+        """
+        free = [axis for axis in range(self.axes) if axis not in fixed]
+        coordinates = []
+        for axis in range(self.axes):
+            if axis in fixed:
+                coordinates.append(fixed[axis])
+                continue
+            shape = [1] * len(free)
+            shape[free.index(axis)] = -1
+            coordinates.append((kings if axis == 0 else np.arange(64)).reshape(shape))
+        return coordinates
+
+    def view(self, side, fixed, kings, whole=False):
+        """
+        Builds the index of part of an array of positions.
+
+        Args:
+            self: The instance of the Layout object.
+            side: The side to move, 0 for the strong side.
+            fixed: A dictionary of the axes held at one square.
+            kings: The (first, last) range of strong King squares of the slice being worked on.
+            whole: True to index an array of the whole table, False an array of just the slice (whose first
+                axis starts at the slice's first square).
+
+        Returns:
+            A tuple for indexing the array.
+        """
+        index = [side]
+        for axis in range(self.axes):
+            if axis in fixed:
+                index.append(fixed[axis] - (kings[0] if axis == 0 and not whole else 0))
+            elif axis == 0 and whole:
+                index.append(slice(*kings))
+            else:
+                index.append(slice(None))
+        return tuple(index)
+
+    def attacked(self, coordinates, target, attackers, blockers):
+        """
+        Tests whether some of the strong side's pieces attack a square.
+
+        Args:
+            self: The instance of the Layout object.
+            coordinates: The squares of every axis, from coordinates.
+            target: The attacked square, an int or an array that broadcasts with the coordinates.
+            attackers: The axes of the pieces that may attack it.
+            blockers: The axes of the pieces that stand in the way of the sliding pieces.
+
+        Returns:
+            A boolean array that broadcasts with the coordinates.
+        """
+        attacked = False
+        for axis in attackers:
+            kind = self.kinds[axis]
+            hit = REACH[kind][coordinates[axis], target]
+            if kind in (BISHOP, ROOK, QUEEN):
+                for other in blockers:
+                    if other != axis:
+                        hit = hit & ~BETWEEN_SQUARES[coordinates[axis], target, coordinates[other]]
+            attacked = attacked | hit
+        return attacked
+
+    def clear(self, coordinates, axis, path):
+        # True where none of the other pieces stands on the squares a move passes over
+        if not path:
+            return True
+        on_path = np.zeros(64, dtype=bool)
+        on_path[list(path)] = True
+        clear = True
+        for other in range(self.axes):
+            if other != axis:
+                clear = clear & ~on_path[coordinates[other]]
+        return clear
+
+
+def _open(directory, name, suffix, shape, mode):
+    return np.memmap(os.path.join(directory, f"{name}.{suffix}"), dtype=np.uint8, mode=mode, shape=shape)
+
+
+def _legal_slice(name, directory, kings, current):
+    # Marks the legal positions of a slice as draws for now, and everything else as illegal
+    layout = Layout(name)
+    first, last = kings
+    coordinates = layout.coordinates(np.arange(first, last), {})
+    legal = ~REACH[KING][coordinates[0], coordinates[1]]
+    for a in range(layout.axes):
+        for b in range(a + 1, layout.axes):
+            legal = legal & (coordinates[a] != coordinates[b])
+        if layout.kinds[a] == PAWN:
+            legal = legal & (coordinates[a] >= 8) & (coordinates[a] < 56)
+    # The lone King cannot be in check when it is the strong side's turn
+    check = layout.attacked(coordinates, coordinates[1], layout.strong_axes, layout.strong_axes)
+    state = _open(directory, name, current, layout.shape, "r+")
+    state[0, first:last] = np.where(legal & ~check, DRAW, ILLEGAL)
+    state[1, first:last] = np.where(legal, DRAW, ILLEGAL)
+    state.flush()
+
+
+def _static_slice(name, directory, kings, current, following):
+    # Works out which positions of a slice have moves, their moves out of the table, and the mates
+    layout = Layout(name)
+    first, last = kings
+    slice_shape = (2, last - first) + (64,) * (layout.axes - 1)
+    state = _open(directory, name, current, layout.shape, "r")
+    has_move = np.zeros(slice_shape, dtype=bool)
+    draw_exit = np.zeros(slice_shape, dtype=bool)
+    exit_mate = np.full(slice_shape, NO_MATE, dtype=np.uint8)
+    king_range = np.arange(first, last)
+
+    for axis, start, target, path, promotion in layout.moves:
+        if axis == 0 and not first <= start < last:
+            continue
+        side = 1 if axis == 1 else 0
+        fixed = {axis: start}
+        source = layout.view(side, fixed, kings)
+        coordinates = layout.coordinates(king_range, fixed)
+        if promotion:
+            # The pawn leaves the table, so the square it moves to is checked here
+            clear = layout.clear(coordinates, axis, (target,))
+            for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                other = PROMOTION_TABLES.get(name, {}).get(kind)
+                if other is None:
+                    has_move[source] |= clear
+                    draw_exit[source] |= clear
+                    continue
+                other_layout = Layout(other)
+                size = table_size(other)
+                results = np.memmap(os.path.join(directory, other + ".tb"), dtype=np.uint8, mode="r",
+                                    shape=(2 * size,))
+                after = layout.view(1, {axis: target}, kings, True)
+                result = results[:size].reshape(other_layout.shape)[after]
+                mate = results[size:].reshape(other_layout.shape)[after]
+                has_move[source] |= clear & (result != ILLEGAL)
+                draw_exit[source] |= clear & (result == DRAW)
+                exit_mate[source] = np.where(clear & (result == LOSS), np.minimum(exit_mate[source], mate),
+                                             exit_mate[source])
+            continue
+        after = layout.view(1 - side, {axis: target}, kings, True)
+        has_move[source] |= layout.clear(coordinates, axis, path) & (state[after] != ILLEGAL)
+
+    # The lone King taking a piece leaves only a King, or a King and a minor piece: a draw if the piece is not
+    # protected
+    for axis, start, target, path, promotion in layout.moves:
+        if axis != 1:
+            continue
+        for taken in layout.strong_axes:
+            if taken == 0:
+                continue
+            fixed = {1: start, taken: target}
+            coordinates = layout.coordinates(king_range, fixed)
+            others = [other for other in layout.strong_axes if other != taken]
+            safe = ~layout.attacked(coordinates, target, others, others)
+            source = layout.view(1, fixed, kings)
+            has_move[source] |= safe
+            draw_exit[source] |= safe
+
+    coordinates = layout.coordinates(king_range, {})
+    in_check = layout.attacked(coordinates, coordinates[1], layout.strong_axes, layout.strong_axes)
+    flags = _open(directory, name, "flags", layout.shape, "r+")
+    flags[:, first:last] = has_move * HAS_MOVE + draw_exit * DRAW_EXIT
+    flags.flush()
+    exits = _open(directory, name, "exit", layout.shape, "r+")
+    exits[:, first:last] = exit_mate
+    exits.flush()
+    # Checkmate: the lone King is in check and has nowhere to go
+    mates = (state[1, first:last] == DRAW) & in_check & ~has_move[1]
+    result = _open(directory, name, following, layout.shape, "r+")
+    result[:, first:last] = state[:, first:last]
+    result[1, first:last][mates] = LOSS
+    result.flush()
+    return int(mates.sum())
+
+
+def _ply_slice(name, directory, kings, current, following, ply):
+    # Finds the positions of a slice won or lost in ply plies. The lone King never wins, so the strong side's
+    # positions are won in an odd number of plies and the lone King's are lost in an even number: each ply only
+    # has one side's positions to look at.
+    layout = Layout(name)
+    first, last = kings
+    side = 0 if ply % 2 else 1
+    state = _open(directory, name, current, layout.shape, "r")
+    own = np.array(state[:, first:last])
+    reaches_loss = np.zeros(own.shape, dtype=bool)
+    reaches_other = np.zeros(own.shape, dtype=bool) # a move to a position that is not (yet) won for the opponent
+    king_range = np.arange(first, last)
+    for axis, start, target, path, promotion in layout.moves:
+        if promotion or (axis == 1) != side or axis == 0 and not first <= start < last:
+            continue
+        fixed = {axis: start}
+        after = state[layout.view(1 - side, {axis: target}, kings, True)]
+        clear = layout.clear(layout.coordinates(king_range, fixed), axis, path)
+        source = layout.view(side, fixed, kings)
+        if side == 0:
+            reaches_loss[source] |= clear & (after == LOSS)
+        else:
+            reaches_other[source] |= clear & (after != WIN) & (after != ILLEGAL)
+
+    flags = np.array(_open(directory, name, "flags", layout.shape, "r")[side, first:last])
+    exits = np.array(_open(directory, name, "exit", layout.shape, "r")[side, first:last])
+    unresolved = own[side] == DRAW
+    if side == 0:
+        decided = unresolved & (reaches_loss[0] | (exits < ply))
+        own[0][decided] = WIN
+    else:
+        decided = (unresolved & (flags & HAS_MOVE != 0) & ~reaches_other[1] & (flags & DRAW_EXIT == 0)
+                   & (exits == NO_MATE))
+        own[1][decided] = LOSS
+    result = _open(directory, name, following, layout.shape, "r+")
+    result[:, first:last] = own
+    result.flush()
+    mates = _open(directory, name, "dtm", layout.shape, "r+")
+    mates[side, first:last][decided] = ply
+    mates.flush()
+    return int(decided.sum())
+
+
+def generate(name, directory, workers=1, slices=None, log=None):
+    """
+    Builds one table and writes it to a directory.
+
+    Args:
+        name: The table name, a key of TABLES.
+        directory: Where to write the table file (as name.tb) and its working files, which are removed at the end.
+        workers: The number of processes to share each ply between. With 1 the work is done in this process.
+        slices: How many slices of strong King squares the index space is split into, one per worker if not
+            given.
+        log: An optional function called with a line of progress after each ply.
+
+    Returns:
+        The path of the table file. Raises FileNotFoundError if a table the pawns promote into has not been
+        built in the directory yet.
+    """
+    require_numpy()
+    for other in PROMOTION_TABLES.get(name, {}).values():
+        if not os.path.exists(os.path.join(directory, other + ".tb")):
+            raise FileNotFoundError(f"{name} needs the {other} table, build it first")
+    layout = Layout(name)
+    slices = slices or workers
+    bounds = [round(64 * part / slices) for part in range(slices + 1)]
+    ranges = [(bounds[part], bounds[part + 1]) for part in range(slices) if bounds[part] < bounds[part + 1]]
+    for suffix in ("a", "b", "dtm", "flags", "exit"):
+        _open(directory, name, suffix, layout.shape, "w+").flush()
+
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    def run(function, *args):
+        if executor is None:
+            return [function(name, directory, kings, *args) for kings in ranges]
+        futures = [executor.submit(function, name, directory, kings, *args) for kings in ranges]
+        return [future.result() for future in futures]
+
+    try:
+        run(_legal_slice, "a")
+        found = sum(run(_static_slice, "a", "b"))
+        if log:
+            log(f"{name}: {found} mates")
+        exits = _open(directory, name, "exit", layout.shape, "r")
+        last_exit = max((int(value) for value in np.unique(exits) if value != NO_MATE), default=-1)
+        del exits
+        current, following = "b", "a"
+        ply = 1
+        while True:
+            found = sum(run(_ply_slice, current, following, ply))
+            if log:
+                log(f"{name}: {found} positions decided in {ply} plies")
+            current, following = following, current
+            # Nothing decided can still be followed by wins through the moves into another table
+            if not found and ply > last_exit:
+                break
+            ply += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    path = os.path.join(directory, name + ".tb")
+    state = _open(directory, name, current, layout.shape, "r")
+    mates = _open(directory, name, "dtm", layout.shape, "r")
+    with open(path, "wb") as file:
+        file.write(state.tobytes())
+        file.write(mates.tobytes())
+    del state, mates
+    for suffix in ("a", "b", "dtm", "flags", "exit"):
+        os.remove(os.path.join(directory, f"{name}.{suffix}"))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tablebase", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate", help="build tables")
+    build.add_argument("directory", help="where to write the tables")
+    build.add_argument("--tables", nargs="+", choices=list(TABLES), default=list(TABLES), help="tables to build")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes to build with")
+    probe = commands.add_parser("probe", help="look up a position")
+    probe.add_argument("directory", help="where the tables are")
+    probe.add_argument("fen", help="the position")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        os.makedirs(args.directory, exist_ok=True)
+        for name in TABLES:
+            if name in args.tables:
+                print(generate(name, args.directory, args.workers, log=print))
+        return 0
+
+    from ChessGame import Chess
+    try:
+        game = Chess(args.fen)
+    except ValueError as e:
+        print(e)
+        return 1
+    with Tablebases(args.directory) as tables:
+        found = tables.best_move(game)
+        if found is None:
+            print("The position is not in the tables")
+            return 1
+        move, result = found
+        outcome = {1: "win", 0: "draw", -1: "loss"}[result.wdl]
+        mate = f", mate in {result.dtm} plies" if result.wdl else ""
+        print(f"{game.team_to_move()} to move: {outcome}{mate}, best move {game.san(move)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import batch
+from ChessGame import Chess
+from benchmark import SUITE
+from bitboard import WHITE_INDEX, BLACK_INDEX
+
+
+def sample_games(count=20, seed=1):
+    # Positions reached by random moves from each suite position
+    rng = random.Random(seed)
+    games = []
+    for position in SUITE:
+        game = Chess.from_fen(position["fen"])
+        for ply in range(count):
+            moves = list(game.legal_moves())
+            if not moves:
+                break
+            game.make_move(*rng.choice(moves))
+            games.append(Chess.from_fen(game.to_fen()))
+    return games
+
+
+@pytest.fixture(scope="module")
+def games():
+    return sample_games()
+
+
+def test_pack_matches_from_fens(games):
+    boards, white_to_move = batch.pack(games)
+    fen_boards, fen_white_to_move = batch.from_fens([game.to_fen() for game in games])
+    assert np.array_equal(boards, fen_boards)
+    assert np.array_equal(white_to_move, fen_white_to_move)
+
+
+def test_attacks_match_the_bitboards(games):
+    boards, white_to_move = batch.pack(games)
+    for color in (WHITE_INDEX, BLACK_INDEX):
+        masks = batch.attack_masks(boards, color)
+        counts = batch.attack_counts(boards, color)
+        for row, game in enumerate(games):
+            assert int(masks[row]) == game.bitboards.attacks(color)
+            for square in range(64):
+                assert counts[row, square] == bin(game.bitboards.attackers(color, square)).count("1")
+
+
+def test_in_check_matches_the_game(games):
+    boards, white_to_move = batch.pack(games)
+    checks = batch.in_check(boards, white_to_move)
+    assert [bool(check) for check in checks] == [game.in_check() for game in games]
+
+
+def test_mobility_matches_the_piece_targets(games):
+    # The batch does not record en passant, so only positions without it are compared
+    games = [game for game in games if game.passant_pawn is None]
+    moves = batch.mobility(batch.pack(games)[0])
+    for row, game in enumerate(games):
+        for pieces in game.piece_index:
+            for square, piece in pieces.items():
+                assert moves[row, square] == bin(piece.targets()).count("1")
@@ -0,0 +1,53 @@
+import io
+
+from ChessGame import Chess
+from book import OpeningBook, build_book
+
+# The second game reaches the position after 1. e4 with a single pawn move, the queen losing a tempo on the way
+GAMES = """[Event "A"]
+[Result "1-0"]
+
+1. e4 c5 1-0
+
+[Event "B"]
+[Result "1/2-1/2"]
+
+1. e3 Nf6 2. Qe2 Ng8 3. Qf3 Nf6 4. Qd1 Ng8 5. e4 e5 1/2-1/2
+"""
+
+
+def build(tmp_path):
+    path = tmp_path / "book.bin"
+    assert build_book(io.StringIO(GAMES), path) == 12
+    return OpeningBook(path)
+
+
+def book_moves(book, game):
+    return [(game.san(move), weight) for move, weight in book.moves(game)]
+
+
+def test_probe_returns_the_moves_played(tmp_path):
+    with build(tmp_path) as book:
+        game = Chess()
+        assert book_moves(book, game) == [("e4", 2), ("e3", 1)]
+        game.push_move(*game.parse_move("e3"))
+        assert book_moves(book, game) == [("Nf6", 1)]
+        game.push_move(*game.parse_move("a6"))
+        assert book_moves(book, game) == []
+        assert (book.hits, book.misses) == (2, 1)
+
+
+def test_double_pawn_push_transposes_when_no_capture_is_possible(tmp_path):
+    with build(tmp_path) as book:
+        game = Chess()
+        game.push_move(*game.parse_move("e4"))
+        assert sorted(book_moves(book, game)) == [("c5", 0), ("e5", 1)]
+
+
+def test_passant_file_is_hashed_only_when_a_pawn_can_take():
+    takeable = Chess("rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1")
+    assert takeable.passant_file() == 5
+    assert takeable.key != Chess("rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1").key
+    alone = Chess("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1")
+    assert alone.passant_file() is None
+    assert alone.key == Chess("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1").key
@@ -0,0 +1,62 @@
+from ChessGame import GameSession
+from gamelog import GameLog, GameLogReader
+
+SCHOLARS_MATE = ["e4", "e5", "Bc4", "Nc6", "Qh5", "Nf6", "Qxf7#"]
+
+
+def play(session, moves):
+    fens = [session.game.to_fen()]
+    for move in moves:
+        session.play_move(move)
+        fens.append(session.game.to_fen())
+    return fens
+
+
+def test_game_round_trip(tmp_path):
+    path = tmp_path / "games.log"
+    with GameLog(path, checkpoint_interval=3) as log:
+        session = GameSession(log=log)
+        fens = play(session, SCHOLARS_MATE)
+    with GameLogReader(path) as reader:
+        assert list(reader) == [1]
+        assert reader.san_moves(1) == SCHOLARS_MATE
+        assert reader.result(1) == "1-0"
+        assert reader.plies(1) == len(SCHOLARS_MATE)
+        assert [reader.position(1, ply).to_fen() for ply in range(len(fens))] == fens
+
+
+def test_takeback_and_redo_are_logged(tmp_path):
+    path = tmp_path / "games.log"
+    with GameLog(path, checkpoint_interval=4) as log:
+        session = GameSession(log=log)
+        play(session, SCHOLARS_MATE[:3])
+        # Still in the segment being filled, so the game goes on as the same game
+        session.takeback(2)
+        session.redo(1)
+        play(session, ["d4", "d6"])
+        play(session, ["Nf3", "Nc6"])
+        # Behind a segment already written, so the game goes on as a new one
+        session.takeback(3)
+        session.redo(3)
+        session.play_move("Bb5")
+    with GameLogReader(path) as reader:
+        assert list(reader) == [1, 2]
+        assert reader.san_moves(1) == ["e4", "e5", "d4", "d6", "Nf3", "Nc6"]
+        assert reader.result(1) == "*"
+        assert reader.san_moves(2) == ["d6", "Nf3", "Nc6", "Bb5"]
+        assert reader.plies(2) == 7
+        assert reader.position(2, 6).to_fen() == reader.position(1, 6).to_fen()
+
+
+def test_reopened_log_drops_a_half_written_block(tmp_path):
+    path = tmp_path / "games.log"
+    with GameLog(path) as log:
+        play(GameSession(log=log), SCHOLARS_MATE)
+    with open(path, "ab") as file:
+        file.write(b"\x01\x02\x03")
+    with GameLog(path) as log:
+        play(GameSession(log=log), ["d4", "d5"])
+    with GameLogReader(path) as reader:
+        assert list(reader) == [1, 2]
+        assert reader.san_moves(2) == ["d4", "d5"]
+        assert reader.result(2) == "*"
@@ -0,0 +1,26 @@
+import pytest
+
+from ChessGame import Chess
+from benchmark import SUITE, CORES, perft
+
+# Deeper counts take too long for the test run, python -m benchmark suite runs them
+MAX_NODES = 10000
+
+
+@pytest.mark.parametrize("position", SUITE, ids=[position["name"] for position in SUITE])
+def test_suite_counts(position):
+    game = Chess.from_fen(position["fen"])
+    key = game.key
+    for depth, expected in enumerate(position["nodes"], start=1):
+        if expected > MAX_NODES:
+            break
+        assert perft(game, depth) == expected
+    # make_move and unmake_move leave the position as it was
+    assert game.to_fen() == position["fen"]
+    assert game.key == key
+
+
+@pytest.mark.parametrize("position", SUITE, ids=[position["name"] for position in SUITE])
+def test_scan_core_agrees(position):
+    game = Chess.from_fen(position["fen"])
+    assert perft(game, 2, CORES["scan"]) == position["nodes"][1]
@@ -0,0 +1,83 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from server import GameServer
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class Client():
+
+    async def connect(self, port):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        return self
+
+    async def send(self, line):
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+
+    async def receive(self):
+        return (await asyncio.wait_for(self.reader.readline(), 5)).decode().rstrip("\n")
+
+    async def quit(self):
+        await self.send("QUIT")
+        assert await asyncio.wait_for(self.reader.read(), 5) == b""
+        self.writer.close()
+
+
+async def hosted_game():
+    # The end of game tests run in a thread rather than the process pool, which is slow to start
+    game_server = GameServer(move_timeout=None, executor=ThreadPoolExecutor(1))
+    server = await game_server.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    white, black, spectator = [await Client().connect(port) for client in range(3)]
+    lines = {"white": [], "black": [], "spectator": []}
+
+    await white.send("NEW")
+    lines["white"].append(await white.receive())
+    await spectator.send("WATCH 1")
+    lines["spectator"].append(await spectator.receive())
+    await black.send("JOIN 1")
+    lines["black"] += [await black.receive(), await black.receive()]
+    lines["white"].append(await white.receive())
+    await white.send("MOVES")
+    lines["white"].append(await white.receive())
+    for ply, move in enumerate(["e4", "e5", "Bc4", "Nc6", "Qh5", "Nf6", "Qxf7#"]):
+        await (white if ply % 2 == 0 else black).send(f"MOVE {move}")
+        lines["white"].append(await white.receive())
+        lines["black"].append(await black.receive())
+        lines["spectator"].append(await spectator.receive())
+    lines["white"].append(await white.receive())
+    lines["black"].append(await black.receive())
+    lines["spectator"].append(await spectator.receive())
+
+    for client in (white, black, spectator):
+        await client.quit()
+    server.close()
+    await server.wait_closed()
+    game_server.close()
+    return lines, game_server
+
+
+def test_game_with_a_spectator():
+    lines, game_server = asyncio.run(hosted_game())
+    assert lines["white"][:3] == ["GAME 1 white", "START 1",
+                                  "MOVES a3 a4 b3 b4 c3 c4 d3 d4 e3 e4 f3 f4 g3 g4 h3 h4 Na3 Nc3 Nf3 Nh3"]
+    assert lines["black"][:2] == ["GAME 1 black", "START 1"]
+    assert lines["white"][3] == "MOVED e4 rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+    assert lines["white"][3:] == lines["black"][2:]
+    assert lines["white"][-2].startswith("MOVED Qxf7# ")
+    assert lines["white"][-1] == "OVER 1-0 checkmate"
+    assert lines["spectator"] == [
+        f"KEYFRAME 1 0 {START}",
+        "DELTA 1 1 e2e4 -",
+        "DELTA 1 2 e7e5 -",
+        "DELTA 1 3 f1c4 -",
+        "DELTA 1 4 b8c6 -",
+        "DELTA 1 5 d1h5 -",
+        "DELTA 1 6 g8f6 -",
+        "DELTA 1 7 h5f7 x#",
+        "OVER 1 1-0 checkmate",
+    ]
+    assert not game_server.games
+    assert not game_server.connections
@@ -0,0 +1,53 @@
+from ChessGame import GameSession, WHITE
+
+
+def test_redo_stops_at_a_move_the_session_did_not_take_back():
+    session = GameSession()
+    session.play_move("e4")
+    session.play_move("e5")
+    assert session.takeback(1) == 1
+    # Taking e4 back on the game itself leaves the session's e5 behind it on the redo stack
+    session.game.takeback()
+    assert session.redo(1) == 0
+    assert session.game.to_fen() == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    assert session.moves == ["e4"]
+
+
+def test_takeback_stops_at_a_move_made_outside_the_session():
+    session = GameSession()
+    session.play_move("e2e4")
+    session.game.board[7][8].move_to(6, 6)
+    assert session.takeback(2) == 0
+    assert session.moves == ["e4"]
+
+
+def test_takeback_and_redo_round_trip():
+    session = GameSession()
+    states = [(session.game.to_fen(), session.game.key)]
+    for move in ["e4", "e5", "Bc4", "Nc6", "Qh5", "Nf6", "Qxf7#"]:
+        session.play_move(move)
+        states.append((session.game.to_fen(), session.game.key))
+    moves = list(session.moves)
+    assert session.winner == WHITE
+    assert session.takeback(3) == 3
+    assert not session.over
+    assert (session.game.to_fen(), session.game.key) == states[4]
+    assert session.takeback(10) == 4
+    assert (session.game.to_fen(), session.game.key) == states[0]
+    assert session.takeback(1) == 0
+    for ply in range(1, 8):
+        assert session.redo(1) == 1
+        assert (session.game.to_fen(), session.game.key) == states[ply]
+    assert session.redo(1) == 0
+    assert session.moves == moves
+    assert session.winner == WHITE
+
+
+def test_new_move_forgets_the_moves_taken_back():
+    session = GameSession()
+    session.play_move("e4")
+    session.play_move("e5")
+    session.takeback(1)
+    session.play_move("c5")
+    assert session.redo(1) == 0
+    assert session.moves == ["e4", "c5"]
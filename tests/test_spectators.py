@@ -0,0 +1,41 @@
+from ChessGame import Chess, GameSession
+from spectators import Audience, encode_delta
+
+
+class FakeConnection():
+
+    def __init__(self):
+        self.closing = False
+        self.backlog = 0
+        self.sent = []
+
+    def write(self, data):
+        self.sent += data.decode().splitlines()
+
+
+def test_delta_flags():
+    session = GameSession(Chess("3r3k/4P3/8/8/8/8/8/4K2R w K - 0 1"))
+    assert encode_delta(1, 1, session.play_move("exd8=Q+")) == b"DELTA 1 1 e7d8q x+\n"
+    session = GameSession(Chess("7k/8/8/8/8/8/8/4K2R w K - 0 1"))
+    assert encode_delta(2, 5, session.play_move("O-O")) == b"DELTA 2 5 e1g1 o\n"
+
+
+def test_slow_spectator_catches_up_at_the_next_keyframe():
+    session = GameSession()
+    audience = Audience(1, keyframe_interval=2, max_backlog=100)
+    fast, slow = FakeConnection(), FakeConnection()
+    audience.join(fast, 0, session.game.to_fen())
+    audience.join(slow, 0, session.game.to_fen())
+    slow.backlog = 1000
+    result = session.play_move("e4")
+    audience.move(1, result, session.game.to_fen())
+    slow.backlog = 0
+    result = session.play_move("e5")
+    audience.move(2, result, session.game.to_fen())
+    keyframe = f"KEYFRAME 1 2 {session.game.to_fen()}"
+    assert fast.sent[1:] == ["DELTA 1 1 e2e4 -", "DELTA 1 2 e7e5 -", keyframe]
+    assert slow.sent[1:] == [keyframe]
+    fast.closing = True
+    audience.move(3, session.play_move("Nf3"), session.game.to_fen())
+    assert fast not in audience
+    assert slow.sent[-1] == "DELTA 1 3 g1f3 -"
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from ChessGame import Chess
+from tablebase import Tablebases, TablebaseResult, generate
+
+
+@pytest.fixture(scope="module")
+def tablebases(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tablebases")
+    for name in ("KQK", "KRK"):
+        generate(name, directory)
+    with Tablebases(directory) as tablebases:
+        yield tablebases
+
+
+def position(pieces, white_to_move):
+    # A FEN from a dictionary of square number (a1 = 0) to piece letter
+    rows = []
+    for rank in range(7, -1, -1):
+        row = ""
+        empty = 0
+        for file in range(8):
+            letter = pieces.get(rank * 8 + file)
+            if letter is None:
+                empty += 1
+                continue
+            row += (str(empty) if empty else "") + letter
+            empty = 0
+        rows.append(row + (str(empty) if empty else ""))
+    return "/".join(rows) + (" w" if white_to_move else " b") + " - - 0 1"
+
+
+def expected_result(tablebases, game):
+    # Works a result out from the results one move later
+    after = []
+    for move in game.legal_moves():
+        record = game.make_move(move.piece, move.file, move.rank, move.promotion)
+        after.append(tablebases.probe(game) or TablebaseResult(0, 0))
+        game.unmake_move(record)
+    if not after:
+        return TablebaseResult(-1, 0) if game.in_check() else TablebaseResult(0, 0)
+    wins = [result.dtm for result in after if result.wdl < 0]
+    if wins:
+        return TablebaseResult(1, min(wins) + 1)
+    if any(result.wdl == 0 for result in after):
+        return TablebaseResult(0, 0)
+    return TablebaseResult(-1, max(result.dtm for result in after) + 1)
+
+
+@pytest.mark.parametrize("piece", ["Q", "R"])
+def test_probe_agrees_with_the_positions_one_move_later(tablebases, piece):
+    rng = random.Random(piece)
+    checked = 0
+    while checked < 200:
+        squares = rng.sample(range(64), 3)
+        white_strong = rng.random() < 0.5
+        letters = "Kk" + piece if white_strong else "kK" + piece.lower()
+        try:
+            game = Chess(position(dict(zip(squares, letters)), rng.random() < 0.5))
+        except ValueError:
+            continue
+        result = tablebases.probe(game)
+        if result is None:
+            # Illegal positions, with the side not to move in check, are not in the tables
+            continue
+        assert result == expected_result(tablebases, game), game.to_fen()
+        checked += 1
+
+
+def test_best_move_mates(tablebases):
+    game = Chess("k7/8/1K6/8/8/8/8/7R w - - 0 1")
+    fen = game.to_fen()
+    move, result = tablebases.best_move(game)
+    assert result == TablebaseResult(1, 1)
+    assert game.to_fen() == fen
+    game.push_move(move.piece, move.file, move.rank, move.promotion)
+    assert game.to_fen().startswith("k6R/")
+    assert tablebases.probe(game) == TablebaseResult(-1, 0)
+
+
+def test_black_strong_side_is_looked_up_turned_around(tablebases):
+    white = tablebases.probe(Chess("8/8/8/3k4/8/8/5K2/7R b - - 0 1"))
+    black = tablebases.probe(Chess("7r/5k2/8/8/3K4/8/8/8 w - - 0 1"))
+    assert white is not None and white.wdl < 0
+    assert black == white
+
+
+def test_other_material_is_not_probed(tablebases):
+    assert tablebases.probe(Chess()) is None
+    assert tablebases.probe(Chess("8/8/8/3k4/8/8/5K2/7N w - - 0 1")) is None
@@ -0,0 +1,159 @@
+"""
+Fixed size transposition table keyed by Zobrist position keys.
+
+The table lives in preallocated arrays rather than a dictionary of objects, so its memory use is set once by the
+size given in MB and never grows. Positions are grouped in buckets of two entries: the first keeps whichever
+result was searched deepest (depth-preferred), the second is always replaced by the latest result.
+"""
+
+from array import array
+from collections import namedtuple
+
+# Bound types, what the stored score says about the real score of the position
+EMPTY = 0
+EXACT = 1
+LOWER = 2 # the real score is at least this (the search failed high)
+UPPER = 3 # the real score is at most this (the search failed low)
+
+# Score of being checkmated, and the depth stored for positions with no moves left (true at every depth)
+MATE_SCORE = 30000
+TERMINAL_DEPTH = 127
+
+# Bytes used per entry: key (8), score (4), move (2), depth (1), bound (1) and age (1)
+ENTRY_BYTES = 17
+
+Entry = namedtuple("Entry", ["move", "depth", "bound", "score"])
+
+
+class TranspositionTable():
+
+    def __init__(self, size_mb=16):
+        """
+        Allocates the table.
+
+        Args:
+            self: The instance of the TranspositionTable object.
+            size_mb: The amount of memory to use in megabytes. The number of buckets is rounded down to a power of
+                two so a key can be turned into a bucket with a mask.
+        """
+        buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        buckets = 1 << (buckets.bit_length() - 1)
+        self.mask = buckets - 1
+        entries = 2 * buckets
+        self.keys = array("Q", bytes(8 * entries))
+        self.scores = array("i", bytes(4 * entries))
+        self.moves = array("H", bytes(2 * entries))
+        self.depths = array("b", bytes(entries))
+        self.bounds = array("B", bytes(entries))
+        self.ages = array("B", bytes(entries))
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replaced = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def new_search(self):
+        """
+        Marks the start of a new search, so deep results left over from old searches can be replaced.
+
+        Args:
+            self: The instance of the TranspositionTable object.
+        """
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key):
+        """
+        Looks up a position.
+
+        Args:
+            self: The instance of the TranspositionTable object.
+            key: The Zobrist key of the position.
+
+        Returns:
+            An Entry with the stored move (0 if none), depth, bound type and score, or None if the position is
+            not in the table.
+        """
+        self.probes += 1
+        index = (key & self.mask) << 1
+        for slot in (index, index + 1):
+            if self.keys[slot] == key and self.bounds[slot] != EMPTY:
+                self.hits += 1
+                return Entry(self.moves[slot], self.depths[slot], self.bounds[slot], self.scores[slot])
+        return None
+
+    def store(self, key, move, depth, bound, score):
+        """
+        Saves the result of searching a position.
+
+        Args:
+            self: The instance of the TranspositionTable object.
+            key: The Zobrist key of the position.
+            move: The best move found, encoded as a 16 bit number (0 if there is none).
+            depth: How many moves deep the position was searched.
+            bound: EXACT, LOWER or UPPER.
+            score: The score found, from the point of view of the side to move.
+
+        Returns:
+            Writes the entry into the depth-preferred slot if it was searched at least as deep as what is there
+            (or that entry is from an older search), otherwise into the always-replace slot. A result without a
+            move keeps the move already stored for the same position.
+        """
+        self.stores += 1
+        index = (key & self.mask) << 1
+        # The same position searched less deeply does not take the slot either, it goes to the always-replace one
+        if self.bounds[index] == EMPTY or depth >= self.depths[index] or self.ages[index] != self.age:
+            slot = index
+        else:
+            slot = index + 1
+        if self.bounds[slot] != EMPTY:
+            if self.keys[slot] == key:
+                if not move:
+                    move = self.moves[slot]
+            else:
+                self.replaced += 1
+        self.keys[slot] = key
+        self.moves[slot] = move
+        self.depths[slot] = max(-128, min(depth, TERMINAL_DEPTH))
+        self.bounds[slot] = bound
+        self.scores[slot] = score
+        self.ages[slot] = self.age
+
+    def clear(self):
+        """
+        Empties the table and resets its statistics.
+
+        Args:
+            self: The instance of the TranspositionTable object.
+        """
+        entries = len(self.keys)
+        self.bounds = array("B", bytes(entries))
+        self.age = 0
+        self.probes = self.hits = self.stores = self.replaced = 0
+
+    def stats(self):
+        """
+        Reports how well the table is working.
+
+        Args:
+            self: The instance of the TranspositionTable object.
+
+        Returns:
+            A dictionary with the number of entries, memory used in bytes, probes, hits, hit rate, stores,
+            entries replaced by a different position, and how full the table is (sampled from the first 1000
+            entries).
+        """
+        sample = self.bounds[:1000]
+        return {
+            "entries": len(self.keys),
+            "memory_bytes": sum(a.itemsize * len(a) for a in (self.keys, self.scores, self.moves, self.depths,
+                                                               self.bounds, self.ages)),
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "replaced": self.replaced,
+            "fill": sum(1 for bound in sample if bound != EMPTY) / len(sample),
+        }
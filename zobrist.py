@@ -0,0 +1,62 @@
+"""
+Zobrist hashing for chess positions.
+
+Every (piece, square) pair, each castling right, each en passant file and the side to move get a fixed random
+64 bit number. A position's key is the XOR of the numbers for everything in it, so making a move only needs the
+numbers for what changed to be XORed in or out, and the same position always gets the same key.
+"""
+
+import random
+
+from bitboard import iter_squares
+
+# Castling rights as bits, so a position's rights are a number 0-15
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# A fixed seed keeps keys the same between runs, so they can be stored (opening books, logs, caches)
+_random = random.Random(0x2D5F0A1C)
+
+PIECE_KEYS = [[_random.getrandbits(64) for square in range(64)] for code in range(12)]
+_CASTLING_BITS = [_random.getrandbits(64) for right in range(4)]
+PASSANT_KEYS = [_random.getrandbits(64) for file in range(8)]
+SIDE_KEY = _random.getrandbits(64) # XORed in when it is Black's turn
+
+
+def _castling_key(rights):
+    key = 0
+    for bit in range(4):
+        if rights >> bit & 1:
+            key ^= _CASTLING_BITS[bit]
+    return key
+
+CASTLING_KEYS = [_castling_key(rights) for rights in range(16)]
+
+
+def position_key(bitboards, white_turn, castling, passant_file=None):
+    """
+    Builds a position key from scratch.
+
+    Args:
+        bitboards: The Bitboards of the position.
+        white_turn: True if it is White's turn.
+        castling: The castling rights as a combination of the WHITE_KINGSIDE ... BLACK_QUEENSIDE bits.
+        passant_file: The file (1-8) of a pawn that can be taken en passant, or None (also when no pawn stands
+            beside it to take it).
+
+    Returns:
+        The 64 bit key of the position.
+    """
+    key = 0
+    for code in range(12):
+        table = PIECE_KEYS[code]
+        for square in iter_squares(bitboards.pieces[code]):
+            key ^= table[square]
+    key ^= CASTLING_KEYS[castling]
+    if passant_file is not None:
+        key ^= PASSANT_KEYS[passant_file - 1]
+    if not white_turn:
+        key ^= SIDE_KEY
+    return key